@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks
+~~~~~~~~~~
+
+Performance benchmarks of mysolr hot paths. Run a benchmark module with
+``python -m benchmarks.<module>``; ``benchmarks.suite`` runs the client
+scenarios against the fake Solr server of ``benchmarks.server``.
+
+"""
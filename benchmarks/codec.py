@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.codec
+~~~~~~~~~~~~~~~~
+
+Compares the JSON codecs available in mysolr.codec parsing a large select
+response and serializing a large update message.
+
+    python -m benchmarks.codec --rows 50000
+
+"""
+import argparse
+import time
+
+from mysolr.codec import CODECS, JSONCodec
+
+
+def make_documents(rows):
+    return [{'id': str(i),
+             'name': u'Document number %d with some text' % i,
+             'price': i * 0.5,
+             'stock': i % 100,
+             'tags': ['tag%d' % (i % 7), 'tag%d' % (i % 13)]}
+            for i in range(rows)]
+
+
+def best_of(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(rows, repeat):
+    documents = make_documents(rows)
+    body = JSONCodec().dumps({
+        'responseHeader': {'status': 0, 'QTime': 1},
+        'response': {'numFound': rows, 'start': 0, 'docs': documents}
+    })
+    megabytes = len(body) / 1024.0 / 1024.0
+    print('%d documents, %.1f MB' % (rows, megabytes))
+    print('%-8s %12s %12s' % ('codec', 'parse MB/s', 'dumps MB/s'))
+    for codec_class in CODECS:
+        try:
+            codec = codec_class()
+        except ImportError:
+            print('%-8s %12s %12s' % (codec_class.name, '-', '-'))
+            continue
+        parse = best_of(lambda: codec.loads(body), repeat)
+        dumps = best_of(lambda: codec.dumps(documents), repeat)
+        print('%-8s %12.1f %12.1f' % (codec.name, megabytes / parse,
+                                      megabytes / dumps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
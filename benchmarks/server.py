@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.server
+~~~~~~~~~~~~~~~~~
+
+Local fake Solr server answering select, update, ping and admin/system
+requests with generated responses of configurable size, facet cardinality
+and latency. Select responses are written as JSON or, with wt=javabin, in
+the binary format of Solr, and can be gzip compressed. It runs in its own
+process so it does not compete with the client for the GIL.
+
+    python -m benchmarks.server --port 8983 --latency 0.005
+
+"""
+import argparse
+import json
+import multiprocessing
+import struct
+import time
+import zlib
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+
+
+class Config(object):
+    """Shape of the responses of the fake server."""
+
+    def __init__(self, num_found=100000, doc_size=100, facet_terms=1000,
+                 latency=0.0, qtime=1, gzip=False):
+        """
+        :param num_found: Number of documents of the fake index.
+        :param doc_size: Approximate size in bytes of each document.
+        :param facet_terms: Number of terms of every facet field.
+        :param latency: Seconds every request waits before answering.
+        :param qtime: QTime reported in the responses.
+        :param gzip: Compress the responses of clients accepting gzip.
+        """
+        self.num_found = num_found
+        self.doc_size = doc_size
+        self.facet_terms = facet_terms
+        self.latency = latency
+        self.qtime = qtime
+        self.gzip = gzip
+
+
+def make_document(i, doc_size):
+    text = ('lorem ipsum dolor sit amet ' * (doc_size // 27 + 1))[:doc_size]
+    return {'id': str(i), 'price': i * 0.5, 'stock': i % 100,
+            'cat': ['cat%d' % (i % 7), 'cat%d' % (i % 13)], 'text': text}
+
+
+def make_facet(field, terms):
+    counts = []
+    for i in range(terms):
+        counts.extend(['%s_term_%d' % (field, i), terms - i])
+    return counts
+
+
+class JavabinWriter(object):
+    """Writes responses in the javabin format, version 2, as Solr does:
+    names are extern strings, the documents section is a SolrDocumentList
+    and facet fields are NamedLists. Only used to feed the client."""
+
+    def __init__(self):
+        self.strings = {}
+        self.chunks = [b'\x02']
+
+    def write_size(self, tag, size):
+        if size < 0x1f:
+            self.chunks.append(struct.pack('B', tag | size))
+        else:
+            self.chunks.append(struct.pack('B', tag | 0x1f))
+            self.write_vint(size - 0x1f)
+
+    def write_vint(self, value):
+        while value > 0x7f:
+            self.chunks.append(struct.pack('B', (value & 0x7f) | 0x80))
+            value >>= 7
+        self.chunks.append(struct.pack('B', value))
+
+    def write_small(self, tag, value):
+        if value < 0x10:
+            self.chunks.append(struct.pack('B', tag | value))
+        else:
+            self.chunks.append(struct.pack('B', tag | 0x10 | (value & 0x0f)))
+            self.write_vint(value >> 4)
+
+    def write_name(self, name):
+        index = self.strings.get(name)
+        if index is not None:
+            self.write_size(0xe0, index)
+            return
+        self.write_size(0xe0, 0)
+        self.write_value(name)
+        self.strings[name] = len(self.strings) + 1
+
+    def write_map(self, value, path=()):
+        self.write_size(0xa0, len(value))
+        for name, item in value.items():
+            self.write_name(name)
+            self.write_value(item, path + (name, ))
+
+    def write_value(self, value, path=()):
+        if value is None:
+            self.chunks.append(b'\x00')
+        elif value is True or value is False:
+            self.chunks.append(b'\x01' if value else b'\x02')
+        elif isinstance(value, int):
+            if 0 <= value < 2 ** 31 and path[-1:] not in (('numFound', ),
+                                                          ('start', )):
+                self.write_small(0x40, value)
+            elif 0 <= value < 2 ** 56:
+                self.write_small(0x60, value)
+            else:
+                self.chunks.append(b'\x07' + struct.pack('>q', value))
+        elif isinstance(value, float):
+            self.chunks.append(b'\x05' + struct.pack('>d', value))
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            self.write_size(0x20, len(data))
+            self.chunks.append(data)
+        elif isinstance(value, list) and path[-2:-1] == ('facet_fields', ):
+            self.write_size(0xc0, len(value) // 2)
+            for i in range(0, len(value), 2):
+                self.write_name(value[i])
+                self.write_value(value[i + 1])
+        elif isinstance(value, list):
+            self.write_size(0x80, len(value))
+            for item in value:
+                self.write_value(item, path)
+        elif path == ('response', ):
+            self.chunks.append(b'\x0c')
+            self.write_value([value['numFound'], value['start'],
+                              value.get('maxScore')], ('numFound', ))
+            self.write_size(0x80, len(value['docs']))
+            for document in value['docs']:
+                self.chunks.append(b'\x0b')
+                self.write_map(document, ('doc', ))
+        else:
+            self.write_map(value, path)
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+
+def javabin_dumps(body):
+    """ Encodes a response body in the javabin format. """
+    writer = JavabinWriter()
+    writer.write_value(body)
+    return writer.getvalue()
+
+
+def select_body(config, params):
+    """ Builds the body of a select response for the given parameters. """
+    rows = int(params.get('rows', ['10'])[0])
+    start = int(params.get('start', ['0'])[0])
+    cursor_mark = params.get('cursorMark', [None])[0]
+    if cursor_mark is not None:
+        start = 0 if cursor_mark == '*' else int(cursor_mark)
+    end = min(start + rows, config.num_found)
+    body = {
+        'responseHeader': {'status': 0, 'QTime': config.qtime},
+        'response': {
+            'numFound': config.num_found,
+            'start': start,
+            'docs': [make_document(i, config.doc_size)
+                     for i in range(start, end)]
+        }
+    }
+    if cursor_mark is not None:
+        body['nextCursorMark'] = str(max(end, start))
+    if params.get('facet', [''])[0] == 'true':
+        body['facet_counts'] = {
+            'facet_queries': {},
+            'facet_fields': dict((field, make_facet(field,
+                                                    config.facet_terms))
+                                 for field in params.get('facet.field', []))
+        }
+    if params.get('wt', [''])[0] == 'javabin':
+        return javabin_dumps(body)
+    return json.dumps(body).encode('utf-8')
+
+
+def gzip_bytes(body):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class SolrHandler(BaseHTTPRequestHandler):
+    """ Answers like a Solr core. `config` is set by `serve`. """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this every response
+    # waits for the delayed ACK of the client.
+    disable_nagle_algorithm = True
+    config = Config()
+    #: Bodies already built, by request.
+    cache = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.answer(url.path, parse_qs(url.query))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        body = self.read_body()
+        content_type = self.headers.get('Content-Type') or ''
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            params.update(parse_qs(body.decode('utf-8')))
+        self.answer(url.path, params)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if not size:
+                    break
+            body = b''.join(chunks)
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        return body
+
+    def answer(self, path, params):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        gzip = self.config.gzip and \
+            'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if path.endswith('/select'):
+            key = (gzip, ) + tuple(sorted((k, tuple(v))
+                                          for k, v in params.items()))
+            body = self.cache.get(key)
+            if body is None:
+                body = select_body(self.config, params)
+                if gzip:
+                    body = gzip_bytes(body)
+                if len(self.cache) < 1000:
+                    self.cache[key] = body
+        elif path.endswith('/admin/system'):
+            body = json.dumps({
+                'responseHeader': {'status': 0, 'QTime': 0},
+                'lucene': {'solr-spec-version': '4.10.4'}
+            }).encode('utf-8')
+        else:
+            body = json.dumps({
+                'responseHeader': {'status': 0, 'QTime': self.config.qtime},
+                'status': 'OK'
+            }).encode('utf-8')
+        self.send_response(200)
+        if params.get('wt', [''])[0] == 'javabin' and \
+                path.endswith('/select'):
+            self.send_header('Content-Type', 'application/octet-stream')
+        else:
+            self.send_header('Content-Type',
+                             'application/json; charset=utf-8')
+        if gzip:
+            if not path.endswith('/select'):
+                body = gzip_bytes(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def serve(config, port=0, ready=None):
+    """ Serves forever. The port is sent through the `ready` queue. """
+    handler = type('ConfiguredSolrHandler', (SolrHandler, ),
+                   {'config': config, 'cache': {}})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    if ready is not None:
+        ready.put(server.server_port)
+    server.serve_forever()
+
+
+class FakeSolrServer(object):
+    """Fake Solr server running in a child process.
+
+    >>> with FakeSolrServer(Config(latency=0.001)) as url:
+    ...     solr = Solr(url, version=4)
+    """
+
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.process = None
+        self.url = None
+
+    def start(self):
+        """Starts the server and returns the url of its core."""
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=serve,
+                                               args=(self.config, 0, ready))
+        self.process.daemon = True
+        self.process.start()
+        port = ready.get(timeout=10)
+        self.url = 'http://127.0.0.1:%d/solr/' % port
+        return self.url
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--port', type=int, default=8983)
+    parser.add_argument('--num-found', type=int, default=100000)
+    parser.add_argument('--doc-size', type=int, default=100)
+    parser.add_argument('--facet-terms', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--gzip', action='store_true',
+                        help='Compress the responses.')
+    args = parser.parse_args()
+    config = Config(args.num_found, args.doc_size, args.facet_terms,
+                    args.latency, gzip=args.gzip)
+    print('Serving on http://127.0.0.1:%d/solr/' % args.port)
+    serve(config, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks.suite
+~~~~~~~~~~~~~~~~
+
+Runs client scenarios against a local fake Solr server and reports their
+throughput, latency percentiles and peak RSS. Each scenario runs in its own
+process so their peak RSS can be compared.
+
+    python -m benchmarks.suite --requests 200 --save results.json
+    python -m benchmarks.suite search cursor --baseline results.json
+
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from mysolr import Solr, SolrResponse
+from benchmarks.server import Config, FakeSolrServer, make_document, \
+    make_facet
+
+
+def scenario_search(solr, args):
+    def search():
+        solr.search(q='*:*', rows=args.rows)
+    return search
+
+
+def scenario_search_javabin(solr, args):
+    def search():
+        solr.search(q='*:*', rows=args.rows, wt='javabin')
+    return search
+
+
+def scenario_cursor(solr, args):
+    def fetch():
+        cursor = solr.search_cursor(q='*:*', unique_key='id')
+        for response in cursor.fetch(args.rows):
+            pass
+    return fetch
+
+
+def _documents(args):
+    return [make_document(i, args.doc_size) for i in range(args.rows)]
+
+
+def scenario_update_json(solr, args):
+    documents = _documents(args)
+
+    def update():
+        solr.update(documents, 'json', commit=False)
+    return update
+
+
+def scenario_update_xml(solr, args):
+    documents = _documents(args)
+
+    def update():
+        solr.update(documents, 'xml', commit=False)
+    return update
+
+
+def scenario_async_search(solr, args):
+    queries = [{'q': 'q%d' % i, 'rows': args.rows} for i in range(10)]
+
+    def search():
+        solr.async_search(queries, size=10)
+    solr.async_search(queries[:1])  # fail early without grequests
+    return search
+
+
+def scenario_parse_facets(solr, args):
+    facet_counts = {
+        'facet_queries': {},
+        'facet_fields': dict((field, make_facet(field, args.facet_terms))
+                             for field in ('cat', 'brand', 'color'))
+    }
+    response = SolrResponse(compact_facets=args.compact_facets)
+
+    def parse():
+        response.parse_facets(facet_counts)
+    return parse
+
+
+#: Scenarios by name, in the order they run by default.
+SCENARIOS = [
+    ('search', scenario_search),
+    ('search_javabin', scenario_search_javabin),
+    ('cursor', scenario_cursor),
+    ('update_json', scenario_update_json),
+    ('update_xml', scenario_update_xml),
+    ('async_search', scenario_async_search),
+    ('parse_facets', scenario_parse_facets),
+]
+
+
+def percentile(sorted_values, percentile):
+    position = int(round(percentile / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[position]
+
+
+def peak_rss():
+    """ Peak resident set size of this process in MB. """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss / 1024.0 / (1024.0 if sys.platform == 'darwin' else 1.0)
+
+
+def measure(operation, requests, warmup):
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    start = time.time()
+    for _ in range(requests):
+        operation_start = time.time()
+        operation()
+        latencies.append(time.time() - operation_start)
+    elapsed = time.time() - start
+    latencies.sort()
+    return {
+        'requests': requests,
+        'throughput': requests / elapsed,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'peak_rss': peak_rss()
+    }
+
+
+def run_scenario(name, url, args, results):
+    """ Process body: runs a scenario and puts its results in a queue. """
+    try:
+        solr = Solr(url, version=4, compress_updates=args.compress_updates)
+        operation = dict(SCENARIOS)[name](solr, args)
+        results.put((name, measure(operation, args.requests, args.warmup)))
+    except Exception as e:
+        results.put((name, {'error': '%s: %s' % (type(e).__name__, e)}))
+
+
+def run(names, args):
+    config = Config(num_found=args.num_found, doc_size=args.doc_size,
+                    facet_terms=args.facet_terms, latency=args.latency,
+                    gzip=args.gzip)
+    results = {}
+    with FakeSolrServer(config) as url:
+        for name in names:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_scenario,
+                                              args=(name, url, args, queue))
+            process.start()
+            name, result = queue.get()
+            process.join()
+            results[name] = result
+    return results
+
+
+def report(names, results, baseline=None):
+    print('%-13s %8s %10s %9s %9s %9s %9s' % ('scenario', 'requests', 'req/s',
+                                             'p50 ms', 'p95 ms', 'p99 ms',
+                                             'RSS MB'))
+    for name in names:
+        result = results[name]
+        if 'error' in result:
+            print('%-13s %s' % (name, result['error']))
+            continue
+        print('%-13s %8d %10.1f %9.2f %9.2f %9.2f %9.1f' % (
+            name, result['requests'], result['throughput'], result['p50'],
+            result['p95'], result['p99'], result['peak_rss'] or 0))
+        previous = (baseline or {}).get(name)
+        if previous and 'throughput' in previous:
+            print('%-13s %8s %+9.1f%% %+8.1f%% %+8.1f%% %+8.1f%%' % (
+                '', 'change', _change(previous, result, 'throughput'),
+                _change(previous, result, 'p50'),
+                _change(previous, result, 'p95'),
+                _change(previous, result, 'p99')))
+
+
+def _change(previous, result, key):
+    return (result[key] - previous[key]) * 100.0 / previous[key]
+
+
+def regressions(results, baseline, tolerance):
+    """ Names of the scenarios whose throughput dropped more than
+    tolerance (i.e. 0.1 for 10%) from the baseline. """
+    slower = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous and 'throughput' in previous and 'throughput' in result \
+                and result['throughput'] < previous['throughput'] * \
+                (1 - tolerance):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='Scenarios to run: %s. All by default.' %
+                        ', '.join(name for name, _ in SCENARIOS))
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=100,
+                        help='Documents per search, page or update.')
+    parser.add_argument('--num-found', type=int, default=2000,
+                        help='Documents of the fake index.')
+    parser.add_argument('--doc-size', type=int, default=100)
+    parser.add_argument('--facet-terms', type=int, default=1000)
+    parser.add_argument('--compact-facets', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the server waits before answering.')
+    parser.add_argument('--gzip', action='store_true',
+                        help='The server compresses its responses.')
+    parser.add_argument('--compress-updates', type=int, metavar='BYTES',
+                        help='Gzip update messages of at least BYTES.')
+    parser.add_argument('--save', help='Write the results to a JSON file.')
+    parser.add_argument('--baseline',
+                        help='Compare with the results saved in a file and '
+                             'exit with status 1 on regressions.')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    names = args.scenarios or [name for name, _ in SCENARIOS]
+    unknown = set(names) - set(dict(SCENARIOS))
+    if unknown:
+        parser.error('unknown scenarios: %s' % ', '.join(sorted(unknown)))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = run(names, args)
+    report(names, results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print('Throughput regressions: %s' % ', '.join(slower))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
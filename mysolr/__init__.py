@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
 from .response import SolrResponse
+from .response import StreamingSolrResponse
+from .facets import FacetCounts
 from .mysolr import Solr
 from .mysolr import Cursor
+from .bulk import BulkIndexer
+from .cache import QueryCache
+from .cluster import SolrCluster
+from .cloud import SolrCloud
 from .utils import *
 
 __title__ = 'mysolr'
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.aio
+~~~~~~~~~~
+
+asyncio version of the mysolr Solr class, for Python 3.6 or later. HTTP
+requests are made with aiohttp, so many queries can be sent concurrently from
+a single thread.
+
+>>> from mysolr.aio import AsyncSolr
+>>> async with AsyncSolr('http://myserver:8080/solr', version=4) as solr:
+...     responses = await asyncio.gather(solr.search(q='foo'),
+...                                      solr.search(q='bar'))
+
+"""
+import asyncio
+
+from .response import SolrResponse
+from .compat import urljoin
+from .codec import get_codec
+from .cache import canonical_key
+from .mysolr import (build_request, _get_add_xml, _get_commit_xml,
+                     _get_optimize_xml, _add_sort_tiebreak)
+
+
+class _HTTPResponse(object):
+    """ Holds the attributes of an HTTP response read by aiohttp with the
+    names SolrResponse expects from a requests.Response.
+    """
+    def __init__(self, status_code, headers, url, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.url = url
+        self.content = content
+
+
+def _to_pairs(query):
+    """ Converts a query dict into a list of (name, value) pairs, repeating
+    the name for list values, as aiohttp expects.
+    """
+    pairs = []
+    for key, value in query.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            pairs.append((key, v if isinstance(v, str) else str(v)))
+    return pairs
+
+
+class AsyncSingleFlight(object):
+    """ asyncio version of `mysolr.concurrency.SingleFlight`: coroutines
+    awaiting a key already in flight share the result of the first one.
+    """
+
+    def __init__(self):
+        self._futures = {}
+
+    async def do(self, key, coroutine_function, *args, **kwargs):
+        """ Awaits coroutine_function(*args, **kwargs) unless a call with
+        the same key is in flight, in which case its result is returned.
+        """
+        future = self._futures.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(coroutine_function(*args, **kwargs))
+        self._futures[key] = future
+        future.add_done_callback(lambda f: self._futures.pop(key, None))
+        return await asyncio.shield(future)
+
+
+class AsyncSolr(object):
+    """asyncio interface to Solr. Mirrors the API of Solr, with coroutines."""
+
+    def __init__(self, base_url='http://localhost:8080/solr/', session=None,
+                 use_get=False, version=None, timeout=None, codec=None,
+                 max_concurrency=100, coalesce=False):
+        """ Initializes an AsyncSolr object.
+
+        :param base_url: Url to solr index
+        :param session: aiohttp.ClientSession used to make the requests. If
+                        None, a session is created on the first request and
+                        closed by `close`.
+        :param use_get: Use get instead of post when searching.
+        :param version: first number of the solr version. If None, the
+                        version is requested to admin/system the first time
+                        it is needed.
+        :param timeout: request timeout for all requests made to solr. A
+                        (connect timeout, read timeout) tuple sets the
+                        timeouts of connecting and of every read, like
+                        `Solr`.
+        :param codec: JSON codec used to parse responses and serialize
+                      updates.
+        :param max_concurrency: Maximum number of requests in flight.
+        :param coalesce: If True, identical searches awaited at the same time
+                         share a single request and get the same
+                         SolrResponse.
+        """
+        self.base_url = base_url if base_url.endswith('/') else '%s/' % base_url
+        self.session = session
+        self.use_get = use_get
+        self.version = version
+        self.timeout = timeout
+        self.codec = get_codec(codec)
+        self.max_concurrency = max_concurrency
+        self._own_session = session is None
+        self._semaphore = None
+        self._single_flight = AsyncSingleFlight() if coalesce else None
+        # changes of the index made by this object, see Solr._generation
+        self._generation = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes the HTTP session if it was created by this object."""
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        if self.session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise RuntimeError('aiohttp is required for AsyncSolr.')
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    def _get_timeout(self):
+        if self.timeout is None:
+            return None
+        import aiohttp
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    async def _request(self, method, url, params=None, data=None,
+                       headers=None):
+        """ Makes an HTTP request and returns a SolrResponse. At most
+        max_concurrency requests are in flight at the same time.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        kwargs = {}
+        timeout = self._get_timeout()
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        async with self._semaphore:
+            session = self._get_session()
+            async with session.request(method, url, params=params, data=data,
+                                       headers=headers, **kwargs) as response:
+                content = await response.read()
+                http_response = _HTTPResponse(response.status,
+                                              response.headers,
+                                              str(response.url), content)
+        return SolrResponse(http_response, codec=self.codec)
+
+    async def _search(self, url, query):
+        if self.use_get:
+            return await self._request('GET', url, params=_to_pairs(query))
+        return await self._request('POST', url, data=_to_pairs(query))
+
+    async def search(self, resource='select', **kwargs):
+        """Queries Solr with the given kwargs and returns a SolrResponse
+        object. See `Solr.search`.
+        """
+        query = build_request(kwargs)
+        url = urljoin(self.base_url, resource)
+        if self._single_flight is not None:
+            key = canonical_key(resource, query, False, self._generation)
+            return await self._single_flight.do(key, self._search, url, query)
+        return await self._search(url, query)
+
+    def search_cursor(self, resource='select', unique_key=None, **kwargs):
+        """Returns an AsyncCursor to iterate over all the results of a
+        query. See `Solr.search_cursor`.
+        """
+        query = build_request(kwargs)
+        return AsyncCursor(self, urljoin(self.base_url, resource), query,
+                           unique_key=unique_key)
+
+    async def update(self, documents, input_type='json', commit=True):
+        """Sends an update/add message to Solr. See `Solr.update`."""
+        assert input_type in ['xml', 'json']
+
+        if input_type == 'xml':
+            solr_response = await self._post_xml(_get_add_xml(documents))
+        else:
+            solr_response = await self._post_json(self.codec.dumps(documents))
+        self._generation += 1
+        if commit:
+            await self.commit()
+        return solr_response
+
+    async def delete_by_key(self, identifier, commit=True):
+        """Sends an ID delete message to Solr."""
+        xml = '<delete><id>%s</id></delete>' % (identifier)
+        solr_response = await self._post_xml(xml)
+        self._generation += 1
+        if commit:
+            await self.commit()
+        return solr_response
+
+    async def delete_by_query(self, query, commit=True):
+        """Sends a query delete message to Solr."""
+        xml = '<delete><query>%s</query></delete>' % (query)
+        solr_response = await self._post_xml(xml)
+        self._generation += 1
+        if commit:
+            await self.commit()
+        return solr_response
+
+    async def commit(self, wait_flush=True, wait_searcher=True,
+                     expunge_deletes=False):
+        """Sends a commit message to Solr. See `Solr.commit`."""
+        version = await self.get_version()
+        xml = _get_commit_xml(version, wait_flush, wait_searcher,
+                              expunge_deletes)
+        solr_response = await self._post_xml(xml)
+        self._generation += 1
+        return solr_response
+
+    async def optimize(self, wait_flush=True, wait_searcher=True,
+                       max_segments=1):
+        """Sends an optimize message to Solr. See `Solr.optimize`."""
+        version = await self.get_version()
+        xml = _get_optimize_xml(version, wait_flush, wait_searcher,
+                                max_segments)
+        return await self._post_xml(xml)
+
+    async def rollback(self):
+        """Sends a rollback message to Solr server."""
+        solr_response = await self._post_xml('<rollback />')
+        self._generation += 1
+        return solr_response
+
+    async def ping(self):
+        """ Ping call to solr server. """
+        url = urljoin(self.base_url, 'admin/ping')
+        return await self._request('GET', url, params={'wt': 'json'})
+
+    async def is_up(self):
+        """Check if a Solr server is up using ping call"""
+        try:
+            solr_response = await self.ping()
+        except Exception:
+            return False
+        return solr_response.status == 200 and solr_response.solr_status == 0
+
+    async def get_system_info(self):
+        """ Gets solr system status. """
+        url = urljoin(self.base_url, 'admin/system')
+        return await self._request('GET', url, params={'wt': 'json'})
+
+    async def get_version(self):
+        """ First number of the Solr version. It is requested only once. """
+        if not self.version:
+            system_info = await self.get_system_info()
+            version = system_info.raw_content['lucene']['solr-spec-version']
+            self.version = int(version[0])
+        return self.version
+
+    async def more_like_this(self, resource='mlt', text=None, **kwargs):
+        """Implements convenient access to Solr MoreLikeThis functionality.
+        See `Solr.more_like_this`.
+        """
+        if text is not None:
+            kwargs['wt'] = 'json'
+            headers = {'Content-type': 'text/json'}
+            url = urljoin(self.base_url, resource)
+            return await self._request('POST', url, params=_to_pairs(kwargs),
+                                       data=text, headers=headers)
+        return await self.search(resource=resource, **kwargs)
+
+    async def _post_xml(self, xml):
+        url = urljoin(self.base_url, 'update')
+        headers = {'Content-type': 'text/xml; charset=utf-8'}
+        return await self._request('POST', url, data=xml.encode('utf-8'),
+                                   headers=headers)
+
+    async def _post_json(self, json_data):
+        url = urljoin(self.base_url, 'update/json')
+        headers = {'Content-type': 'application/json; charset=utf-8'}
+        return await self._request('POST', url, data=json_data,
+                                   headers=headers)
+
+
+class AsyncCursor(object):
+    """ asyncio version of Cursor. Use it with ``async for``::
+
+        async for response in solr.search_cursor(q='*:*').fetch(100):
+            pass
+    """
+    def __init__(self, solr, url, query, unique_key=None):
+        """ AsyncCursor initialization
+
+        :param solr: AsyncSolr object used to make the requests.
+        :param unique_key: uniqueKey field of the index. When set, deep paging
+                           with cursorMark is used instead of start/rows.
+        """
+        self.solr = solr
+        self.url = url
+        self.query = query
+        self.unique_key = unique_key
+
+    def fetch(self, rows=None):
+        """ Asynchronous generator that grabs all the documents in bulk sets
+        of 'rows' documents
+
+        :param rows: number of rows for each request
+        """
+        if rows:
+            self.query['rows'] = rows
+
+        if 'rows' not in self.query:
+            self.query['rows'] = 10
+
+        if self.unique_key:
+            return self._fetch_cursor_mark()
+        return self._fetch_offset()
+
+    async def _fetch_offset(self):
+        self.query['start'] = 0
+
+        docs_retrieved = 0
+        while True:
+            solr_response = await self.solr._search(self.url, self.query)
+            yield solr_response
+            docs_retrieved += len(solr_response.documents or [])
+            # error pages have no documents and no total_results
+            if not solr_response.documents or \
+                    docs_retrieved >= solr_response.total_results:
+                break
+            self.query['start'] += self.query['rows']
+
+    async def _fetch_cursor_mark(self):
+        _add_sort_tiebreak(self.query, self.unique_key)
+        self.query['start'] = 0
+
+        cursor_mark = '*'
+        first = True
+        while True:
+            self.query['cursorMark'] = cursor_mark
+            solr_response = await self.solr._search(self.url, self.query)
+            documents = solr_response.documents or []
+            if first or documents:
+                yield solr_response
+            first = False
+            next_cursor_mark = getattr(solr_response, 'next_cursor_mark', None)
+            if (next_cursor_mark is None or next_cursor_mark == cursor_mark
+                    or len(documents) < int(self.query['rows'])):
+                break
+            cursor_mark = next_cursor_mark
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.batch
+~~~~~~~~~~~~
+
+Helpers of `Solr.multi_search`. Counting queries (rows=0) that only differ
+in their filter queries are merged into a single request: the filters they
+share are kept as fq and each query becomes a facet.query whose count is
+the numFound of the query.
+
+"""
+from .cache import canonical_key
+from .compat import as_list
+from .response import SolrResponse
+
+#: Prefixes of parameters that prevent a query from being merged, because
+#: their results could not be split between the merged queries.
+UNMERGEABLE = ('facet', 'stats', 'group', 'json', 'spellcheck', 'hl', 'mlt',
+               'cursorMark')
+
+#: Prefixes of filter queries that may be purely negative.
+NEGATIONS = ('-', '!', 'NOT ', 'NOT(')
+
+
+def merge_key(query):
+    """ Returns the key of the group a query can be merged into, or None if
+    the query cannot be merged. Queries with the same key only differ in
+    their fq parameters.
+
+    :param query: Dictionary of query parameters.
+    """
+    if '%s' % query.get('rows') != '0':
+        return None
+    for name in query:
+        if name.startswith(UNMERGEABLE):
+            return None
+    for fq in as_list(query.get('fq')):
+        fq = fq.lstrip()
+        # Local params such as {!tag=x} cannot be combined with AND
+        if fq.startswith('{!'):
+            return None
+        # A purely negative query such as -cat:x matches nothing inside
+        # parentheses, and -a:x OR b:y cannot be told apart without parsing
+        if fq.startswith(NEGATIONS):
+            return None
+    rest = dict((k, v) for k, v in query.items() if k != 'fq')
+    return canonical_key('', rest)
+
+
+def plan(queries):
+    """ Splits queries into groups that can be sent as one request and
+    queries that have to be sent alone. Returns a (groups, singles) tuple:
+    groups is a list of lists of indexes of mergeable queries and singles a
+    list of indexes.
+
+    :param queries: List of query dictionaries.
+    """
+    groups = {}
+    order = []
+    singles = []
+    for i, query in enumerate(queries):
+        key = merge_key(query)
+        if key is None:
+            singles.append(i)
+            continue
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(i)
+
+    merged = []
+    for key in order:
+        if len(groups[key]) > 1:
+            merged.append(groups[key])
+        else:
+            singles.extend(groups[key])
+    return merged, sorted(singles)
+
+
+def merge(queries):
+    """ Builds the query that counts all the given queries at once. Returns
+    a (query, keys) tuple, keys being the facet.query key of every query or
+    None for the queries whose count is numFound.
+
+    :param queries: List of mergeable query dictionaries with the same
+                    merge key.
+    """
+    filters = [as_list(query.get('fq')) for query in queries]
+    common = [fq for fq in filters[0] if all(fq in f for f in filters[1:])]
+    merged = dict((k, v) for k, v in queries[0].items() if k != 'fq')
+    if common:
+        merged['fq'] = common
+    facet_queries = []
+    keys = []
+    for i, query_filters in enumerate(filters):
+        rest = [fq for fq in query_filters if fq not in common]
+        if not rest:
+            keys.append(None)
+            continue
+        key = 'q%d' % i
+        keys.append(key)
+        if len(rest) == 1:
+            clause = rest[0]
+        else:
+            clause = ' AND '.join('(%s)' % fq for fq in rest)
+        facet_queries.append('{!key=%s}%s' % (key, clause))
+    if facet_queries:
+        merged['facet'] = 'true'
+        merged['facet.query'] = facet_queries
+    return merged, keys
+
+
+def split(solr_response, keys):
+    """ Splits the response of a merged query into one SolrResponse per
+    query. If Solr answered with an error every query gets the response as
+    is.
+
+    :param solr_response: SolrResponse of the query built by `merge`.
+    :param keys: Keys returned by `merge`.
+    """
+    if solr_response.status != 200 or \
+            not isinstance(solr_response.raw_content, dict):
+        return [solr_response for _ in keys]
+    raw = solr_response.raw_content
+    facet_queries = (raw.get('facet_counts') or {}).get('facet_queries') or {}
+    responses = []
+    for key in keys:
+        if key is None:
+            count = solr_response.total_results
+        else:
+            count = facet_queries.get(key, 0)
+        responses.append(_count_response(solr_response, count))
+    return responses
+
+
+def _count_response(solr_response, count):
+    """ SolrResponse without documents nor components with the given count
+    and the header of solr_response. """
+    part = SolrResponse(compact_facets=solr_response.compact_facets,
+                        codec=solr_response.codec)
+    part.headers = solr_response.headers
+    part.url = solr_response.url
+    part.status = solr_response.status
+    part.raw_content = {
+        'responseHeader': solr_response.raw_content['responseHeader'],
+        'response': {'numFound': count, 'start': 0, 'docs': []}
+    }
+    part.parse_header()
+    part.documents = []
+    part.parse_components()
+    return part
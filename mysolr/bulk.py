@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.bulk
+~~~~~~~~~~~
+
+Bulk indexing. Documents are grouped in batches by number of documents or
+size in bytes, and several batches are sent to Solr at the same time from a
+pool of threads.
+
+>>> from mysolr import Solr, BulkIndexer
+>>> solr = Solr('http://myserver:8080/solr')
+>>> with BulkIndexer(solr, batch_size=500, workers=4) as indexer:
+...     for document in documents:
+...         indexer.add(document)
+
+"""
+import threading
+import time
+
+from .compat import Queue
+
+
+class BulkIndexer(object):
+    """Sends documents to Solr in batches from a pool of worker threads.
+
+    Failed batches are retried with exponential backoff when the request
+    raises an exception or Solr answers with a 5XX status. Batches that fail
+    after all the retries are kept in `failed`.
+    """
+
+    def __init__(self, solr, batch_size=1000, max_bytes=None, workers=4,
+                 retries=2, backoff=0.5, commit_within=None):
+        """ Initializes a BulkIndexer object.
+
+        :param solr: Solr object used to send the batches.
+        :param batch_size: Maximum number of documents of a batch.
+        :param max_bytes: Maximum size in bytes of a batch. A document bigger
+                          than max_bytes is sent in a batch by itself.
+        :param workers: Number of batches in flight at the same time. At most
+                        the same number of batches wait to be sent, so add
+                        blocks when Solr is slower than the caller.
+        :param retries: Times a failed batch is sent again.
+        :param backoff: Seconds to wait before the first retry. The wait is
+                        doubled on every retry.
+        :param commit_within: Milliseconds in which Solr commits the
+                              documents by itself (commitWithin).
+        """
+        self.solr = solr
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.commit_within = commit_within
+        #: SolrResponse of every batch indexed.
+        self.responses = []
+        #: Last error (an exception or a SolrResponse) of every failed batch.
+        self.failed = []
+        self._batch = []
+        self._batch_bytes = 0
+        self._queue = Queue(workers)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(commit=exc_type is None)
+
+    def add(self, document):
+        """Adds a document to the current batch, sending the batch first if
+        the document does not fit in it."""
+        data = self.solr.codec.dumps(document)
+        if self._batch and (len(self._batch) >= self.batch_size or
+                            (self.max_bytes and self._batch_bytes + len(data)
+                             + 2 > self.max_bytes)):
+            self.flush()
+        self._batch.append(data)
+        self._batch_bytes += len(data) + 1
+
+    def update(self, documents):
+        """Adds every document of an iterable."""
+        for document in documents:
+            self.add(document)
+
+    def flush(self):
+        """Sends the current batch."""
+        if not self._batch:
+            return
+        if not self._threads:
+            self._start()
+        body = b'[' + b','.join(self._batch) + b']'
+        self._batch = []
+        self._batch_bytes = 0
+        self._queue.put(body)
+
+    def close(self, commit=True):
+        """Sends the last batch, waits for every batch to be indexed and
+        commits if every batch succeeded.
+
+        :param commit: If True, sends a commit message at the end.
+        """
+        self.flush()
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if commit and self.responses and not self.failed:
+            self.solr.request_commit().wait()
+
+    def _start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            body = self._queue.get()
+            if body is None:
+                return
+            try:
+                self._send(body)
+            finally:
+                # like Solr.update, also when the batch is not committed
+                self.solr._invalidate_cache()
+
+    def _send(self, body):
+        params = None
+        if self.commit_within is not None:
+            params = {'commitWithin': self.commit_within}
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                solr_response = self.solr._post_json(body, params)
+            except Exception as e:
+                error = e
+                continue
+            if solr_response.status == 200:
+                with self._lock:
+                    self.responses.append(solr_response)
+                return
+            error = solr_response
+            if solr_response.status < 500:
+                break
+        with self._lock:
+            self.failed.append(error)
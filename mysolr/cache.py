@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.cache
+~~~~~~~~~~~~
+
+In-process cache of search responses with LRU and TTL eviction.
+
+>>> from mysolr import Solr, QueryCache
+>>> solr = Solr('http://myserver:8080/solr', cache=QueryCache(ttl=30))
+
+"""
+import threading
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+
+def canonical_key(resource, query, *extra):
+    """Returns a hashable key for a query that does not depend on the order
+    of the parameters nor on the type of their values (1 and '1' are sent
+    the same way to Solr).
+
+    :param resource: Request dispatcher.
+    :param query: Dictionary of query parameters.
+    :param extra: Other values that change the response.
+    """
+    items = []
+    for name in sorted(query):
+        value = query[name]
+        if isinstance(value, (list, tuple)):
+            value = tuple('%s' % v for v in value)
+        else:
+            value = '%s' % value
+        items.append((name, value))
+    return (resource, tuple(items)) + extra
+
+
+class QueryCache(object):
+    """Thread-safe cache of SolrResponse objects.
+
+    Entries expire ttl seconds after they are stored, and the least recently
+    used ones are evicted when there are more than max_entries or their
+    bodies sum more than max_bytes. Cached responses are shared between
+    callers, so they must not be modified.
+
+    Every clear starts a new generation. A response requested before a
+    clear, i.e. while the index was being changed, is not stored if set is
+    given the generation read before sending the request.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, max_bytes=None):
+        """
+        :param max_entries: Maximum number of responses.
+        :param ttl: Seconds a response is valid. None for no expiration.
+        :param max_bytes: Maximum sum of the sizes of the HTTP bodies of the
+                          cached responses. None for no limit.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        #: Number of clears, read it before sending a request.
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the cached response for key, or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, size, response = entry
+            if expires is not None and expires < time.time():
+                self.bytes -= size
+                self.misses += 1
+                return None
+            # Re-inserting moves the entry to the most recently used end
+            self._entries[key] = entry
+            self.hits += 1
+            return response
+
+    def set(self, key, response, size=0, generation=None):
+        """Stores a response.
+
+        :param size: Size in bytes of the response body.
+        :param generation: Generation read before the request was sent. The
+                           response is not stored if the cache has been
+                           cleared since then.
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (expires, size, response)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and
+                     self.bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every response."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.generation += 1
+
+    def stats(self):
+        """Returns a dict with hits, misses, evictions, entries, bytes and
+        hit_ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0
+            }
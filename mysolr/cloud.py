@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.cloud
+~~~~~~~~~~~~
+
+SolrCloud client that sends updates straight to the leader of the shard of
+every document. The layout of the collection is read from the Collections
+API CLUSTERSTATUS action, so ZooKeeper is not needed.
+
+>>> from mysolr import SolrCloud
+>>> cloud = SolrCloud('http://myserver:8983/solr/', 'collection1')
+>>> cloud.update(documents)
+
+"""
+import struct
+import threading
+import time
+
+from .compat import urljoin
+from .concurrency import threaded_iter
+from .mysolr import Solr
+
+
+def murmurhash3_x86_32(data, seed=0):
+    """MurmurHash3 x86 32 bits of data as a signed integer, as computed by
+    Solr.
+
+    :param data: bytes to hash.
+    :param seed: Seed of the hash.
+    """
+    c1 = 0xcc9e2d51
+    c2 = 0x1b873593
+    length = len(data)
+    h1 = seed & 0xffffffff
+    rounded_end = length & ~0x3
+
+    for i in range(0, rounded_end, 4):
+        (k1, ) = struct.unpack_from('<I', data, i)
+        k1 = (k1 * c1) & 0xffffffff
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xffffffff
+        k1 = (k1 * c2) & 0xffffffff
+        h1 ^= k1
+        h1 = ((h1 << 13) | (h1 >> 19)) & 0xffffffff
+        h1 = (h1 * 5 + 0xe6546b64) & 0xffffffff
+
+    tail = bytearray(data[rounded_end:])
+    k1 = 0
+    if len(tail) == 3:
+        k1 ^= tail[2] << 16
+    if len(tail) >= 2:
+        k1 ^= tail[1] << 8
+    if len(tail) >= 1:
+        k1 ^= tail[0]
+        k1 = (k1 * c1) & 0xffffffff
+        k1 = ((k1 << 15) | (k1 >> 17)) & 0xffffffff
+        k1 = (k1 * c2) & 0xffffffff
+        h1 ^= k1
+
+    h1 ^= length
+    h1 ^= h1 >> 16
+    h1 = (h1 * 0x85ebca6b) & 0xffffffff
+    h1 ^= h1 >> 13
+    h1 = (h1 * 0xc2b2ae35) & 0xffffffff
+    h1 ^= h1 >> 16
+    return _signed(h1)
+
+
+def composite_id_hash(route_key):
+    """Hash of a document route key according to the Solr compositeId
+    router. 'tenant!id' keys keep the top 16 bits of the hash of the prefix,
+    'a!b!c' keys the top 8 bits of a and the next 8 bits of b. The number of
+    bits of a prefix can be set as in 'tenant/4!id'.
+    """
+    parts = ('%s' % route_key).split('!')
+    if len(parts) == 1 or len(parts) > 3:
+        return _hash(route_key)
+
+    default_bits = [16] if len(parts) == 2 else [8, 8]
+    result = 0
+    used_bits = 0
+    for i, part in enumerate(parts):
+        if i == len(parts) - 1:
+            bits = 32 - used_bits
+        else:
+            bits = default_bits[i]
+            if '/' in part:
+                part, bits = part.rsplit('/', 1)
+                bits = min(max(int(bits), 0), 32 - used_bits)
+        mask = ((0xffffffff << (32 - bits)) & 0xffffffff) >> used_bits \
+            if bits else 0
+        result |= (_hash(part) & 0xffffffff) & mask
+        used_bits += bits
+    return _signed(result)
+
+
+def _hash(value):
+    return murmurhash3_x86_32(('%s' % value).encode('utf-8'))
+
+
+def _signed(value):
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def _parse_range(hash_range):
+    """ Parses a shard range like '80000000-ffffffff' into signed ints. """
+    low, high = hash_range.split('-')
+    return _signed(int(low, 16)), _signed(int(high, 16))
+
+
+class Shard(object):
+    """A shard of a SolrCloud collection."""
+
+    def __init__(self, name, hash_range, leader_url):
+        self.name = name
+        #: (min, max) hash range, or None for non hash based routers.
+        self.range = _parse_range(hash_range) if hash_range else None
+        #: Url of the core of the leader.
+        self.leader_url = leader_url
+
+    def __repr__(self):
+        return '<Shard %s leader=%s>' % (self.name, self.leader_url)
+
+    def contains(self, hash_value):
+        return self.range is not None and \
+            self.range[0] <= hash_value <= self.range[1]
+
+
+class SolrCloud(object):
+    """Client of a SolrCloud collection. Searches and commits are sent to
+    the collection; updates and deletes by key are routed to the leader of
+    the shard of each document, saving the hop through the node that would
+    forward them.
+    """
+
+    def __init__(self, base_url, collection, unique_key='id',
+                 refresh_interval=60, **kwargs):
+        """ Initializes a SolrCloud object.
+
+        :param base_url: Url of any node, i.e. http://myserver:8983/solr/
+        :param collection: Name of the collection.
+        :param unique_key: uniqueKey field of the collection.
+        :param refresh_interval: Seconds after which the cluster state is
+                                 requested again.
+        :param **kwargs: Arguments of the Solr objects.
+        """
+        self.base_url = base_url if base_url.endswith('/') else '%s/' % base_url
+        self.collection = collection
+        self.unique_key = unique_key
+        self.refresh_interval = refresh_interval
+        #: Solr object of the collection, used for searches and commits.
+        self.solr = Solr(urljoin(self.base_url, collection), **kwargs)
+        # leaders only receive updates: searches and their cache are in
+        # self.solr, which the updates invalidate
+        self._kwargs = dict(kwargs, version=self.solr.version, cache=None,
+                            coalesce=False)
+        self._leaders = {}
+        self._lock = threading.Lock()
+        self.shards = []
+        self.router = None
+        self.router_field = None
+        self.refreshed_at = None
+        self.refresh()
+
+    def search(self, resource='select', **kwargs):
+        """See `Solr.search`."""
+        return self.solr.search(resource, **kwargs)
+
+    def search_cursor(self, resource='select', **kwargs):
+        """See `Solr.search_cursor`."""
+        return self.solr.search_cursor(resource, **kwargs)
+
+    def export(self, q, fl, sort, **kwargs):
+        """See `Solr.export`."""
+        return self.solr.export(q, fl, sort, **kwargs)
+
+    def delete_by_query(self, query, commit=True, commit_within=None):
+        """See `Solr.delete_by_query`."""
+        return self.solr.delete_by_query(query, commit, commit_within)
+
+    def commit(self, **kwargs):
+        """See `Solr.commit`."""
+        return self.solr.commit(**kwargs)
+
+    def rollback(self):
+        """See `Solr.rollback`."""
+        return self.solr.rollback()
+
+    def is_up(self):
+        """See `Solr.is_up`."""
+        return self.solr.is_up()
+
+    def close(self):
+        """Closes the connections."""
+        self.solr.close()
+        for leader in self._leaders.values():
+            leader.close()
+
+    def cluster_status(self):
+        """Requests the CLUSTERSTATUS of the collection."""
+        url = urljoin(self.base_url, 'admin/collections')
+        params = {'action': 'CLUSTERSTATUS', 'collection': self.collection,
+                  'wt': 'json'}
+        http_response = self.solr.make_request.get(url, params=params,
+                                                   timeout=self.solr.timeout)
+        return self.solr.codec.loads(http_response.content)
+
+    def refresh(self):
+        """Reads the shards, their hash ranges and their leaders."""
+        status = self.cluster_status()
+        collection = status['cluster']['collections'][self.collection]
+        router = collection.get('router') or {}
+        shards = []
+        for name, shard in collection['shards'].items():
+            if shard.get('state', 'active') != 'active':
+                continue
+            leader_url = None
+            for replica in shard.get('replicas', {}).values():
+                if replica.get('leader') in ('true', True):
+                    leader_url = '%s/%s/' % (replica['base_url'].rstrip('/'),
+                                             replica['core'])
+            shards.append(Shard(name, shard.get('range'), leader_url))
+        with self._lock:
+            self.shards = shards
+            self.router = router.get('name')
+            self.router_field = router.get('field')
+            self.refreshed_at = time.time()
+
+    def _refresh_if_stale(self):
+        if self.refresh_interval is not None and \
+                time.time() - self.refreshed_at > self.refresh_interval:
+            self.refresh()
+
+    def shard_for(self, route_key):
+        """Returns the Shard of a route key (usually the unique key), or None
+        if the collection does not use the compositeId router."""
+        if self.router != 'compositeId':
+            return None
+        hash_value = composite_id_hash(route_key)
+        for shard in self.shards:
+            if shard.contains(hash_value):
+                return shard
+        return None
+
+    def _route_key(self, document):
+        return document[self.router_field or self.unique_key]
+
+    def _leader(self, shard):
+        """ Solr object of the leader of a shard, or the collection. """
+        if shard is None or shard.leader_url is None:
+            return self.solr
+        with self._lock:
+            leader = self._leaders.get(shard.leader_url)
+            if leader is None:
+                leader = Solr(shard.leader_url, **self._kwargs)
+                self._leaders[shard.leader_url] = leader
+            return leader
+
+    def update(self, documents, input_type='json', commit=True,
+               commit_within=None):
+        """Sends every document to the leader of its shard, to every shard
+        at the same time. Returns a dict with the SolrResponse of every shard
+        by name. See `Solr.update`.
+        """
+        self._refresh_if_stale()
+        batches = {}
+        for document in documents:
+            shard = self.shard_for(self._route_key(document))
+            batches.setdefault(shard, []).append(document)
+
+        sends = [self._send_batch(shard, batch, input_type, commit_within)
+                 for shard, batch in batches.items()]
+        try:
+            responses = dict(threaded_iter(sends, maxsize=len(sends)))
+        finally:
+            self.solr._invalidate_cache()
+        if commit:
+            self.solr.request_commit().wait()
+        return responses
+
+    def delete_by_key(self, identifier, commit=True, commit_within=None):
+        """Sends an ID delete message to the leader of the shard of the
+        document. See `Solr.delete_by_key`."""
+        self._refresh_if_stale()
+        shard = self.shard_for(identifier)
+        try:
+            solr_response = self._send(shard, 'delete_by_key', identifier,
+                                       False, commit_within)
+        finally:
+            self.solr._invalidate_cache()
+        if commit:
+            self.solr.request_commit().wait()
+        return solr_response
+
+    def _send_batch(self, shard, batch, input_type, commit_within):
+        """ Generator of the name of a shard and the SolrResponse of the
+        update of its batch, so the batches are sent by threaded_iter. """
+        yield (shard.name if shard else None,
+               self._send(shard, 'update', batch, input_type, False,
+                          commit_within))
+
+    def _send(self, shard, method, *args):
+        """ Calls a method of the leader of a shard. If the leader cannot be
+        reached, the cluster state is refreshed and the request is sent to
+        the new leader.
+        """
+        try:
+            return getattr(self._leader(shard), method)(*args)
+        except Exception:
+            if shard is None:
+                raise
+        self.refresh()
+        for new_shard in self.shards:
+            if new_shard.name == shard.name:
+                shard = new_shard
+        return getattr(self._leader(shard), method)(*args)
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.cluster
+~~~~~~~~~~~~~~
+
+Client for a set of Solr replicas of the same index. Requests are balanced
+between the nodes, nodes that do not answer are ejected until a background
+health check sees them up again, and reads are retried on another node.
+
+>>> from mysolr import SolrCluster
+>>> cluster = SolrCluster(['http://solr1:8080/solr/',
+...                        'http://solr2:8080/solr/'], version=4)
+>>> response = cluster.search(q='*:*')
+
+"""
+import random
+import threading
+import time
+from collections import deque
+
+from .cache import QueryCache
+from .compat import Queue, Empty
+from .mysolr import Solr
+
+
+class Node(object):
+    """A Solr node of a SolrCluster and its statistics."""
+
+    def __init__(self, solr, decay=0.3):
+        """
+        :param solr: Solr object of the node.
+        :param decay: Weight of the last request in the moving average of
+                      the latency.
+        """
+        self.solr = solr
+        self.decay = decay
+        #: False while the node is ejected.
+        self.healthy = True
+        #: Requests in flight.
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        #: Exponentially weighted moving average of the latency in seconds.
+        self.latency = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Node %s healthy=%s>' % (self.solr.base_url, self.healthy)
+
+    def started(self):
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def finished(self, elapsed=None, error=False):
+        with self._lock:
+            self.outstanding -= 1
+            if error:
+                self.errors += 1
+            if elapsed is not None:
+                if self.latency is None:
+                    self.latency = elapsed
+                else:
+                    self.latency += self.decay * (elapsed - self.latency)
+
+    def stats(self):
+        """Returns a dict with the statistics of the node."""
+        return {
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency': self.latency
+        }
+
+
+class SolrCluster(object):
+    """Balances requests between several Solr replicas.
+
+    Reads (search, more_like_this and the cursors) are retried on another
+    node when a request fails or Solr answers with a 5XX status. Updates
+    are sent to a single node and never retried.
+
+    Searches can be hedged: when a search takes longer than a percentile of
+    the latency of the recent searches, the same search is sent to another
+    node and the first answer wins. The slower request cannot be aborted
+    once sent; its answer is discarded.
+    """
+
+    #: Methods retried on another node when they fail.
+    READS = ('search', 'more_like_this')
+
+    def __init__(self, base_urls, strategy='least_outstanding',
+                 health_check_interval=10, hedge_percentile=None,
+                 hedge_budget=0.05, latency_window=1000, **kwargs):
+        """ Initializes a SolrCluster object.
+
+        :param base_urls: List of urls of the replicas.
+        :param strategy: 'least_outstanding' sends each request to the node
+                         with less requests in flight. 'latency' chooses
+                         nodes randomly with a probability inversely
+                         proportional to their average latency.
+        :param health_check_interval: Seconds between pings to every node.
+                                      None disables the health checks.
+        :param hedge_percentile: Percentile (i.e. 95) of the latency of the
+                                 recent searches after which a search is
+                                 sent to a second node. None disables
+                                 hedging.
+        :param hedge_budget: Maximum ratio of hedged searches. 0.05 means
+                             hedging never adds more than 5% of searches.
+        :param latency_window: Number of recent searches whose latency is
+                               used to compute the percentile.
+        :param **kwargs: Arguments of the Solr objects of the nodes. Every
+                         node shares the same cache, which is cleared by the
+                         writes sent through any of them.
+        """
+        assert strategy in ('least_outstanding', 'latency')
+        if kwargs.get('cache') is True:
+            kwargs['cache'] = QueryCache()
+        self.strategy = strategy
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        #: Number of searches and of hedged searches.
+        self.searches = 0
+        self.hedges = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._hedge_lock = threading.Lock()
+        self.nodes = [Node(solr) for solr in _make_solrs(base_urls, kwargs)]
+        self.health_check_interval = health_check_interval
+        self._stop = threading.Event()
+        self._health_checker = None
+        if health_check_interval:
+            self._health_checker = threading.Thread(target=self._check_health)
+            self._health_checker.daemon = True
+            self._health_checker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the health checks and closes the connections."""
+        self._stop.set()
+        for node in self.nodes:
+            node.solr.close()
+
+    def _check_health(self):
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+
+    def check_health(self):
+        """Pings every node, ejecting the ones that are down and bringing
+        back the ones that are up again."""
+        for node in self.nodes:
+            node.healthy = node.solr.is_up()
+
+    def stats(self):
+        """Returns a dict with the statistics of every node by url."""
+        return dict((node.solr.base_url, node.stats()) for node in self.nodes)
+
+    def choose(self, exclude=()):
+        """Returns the node that should receive the next request, or None if
+        every node is excluded. Ejected nodes are only chosen when every
+        node is ejected.
+
+        :param exclude: Nodes already tried.
+        """
+        candidates = [n for n in self.nodes if n not in exclude]
+        healthy = [n for n in candidates if n.healthy]
+        candidates = healthy or candidates
+        if not candidates:
+            return None
+        if self.strategy == 'latency':
+            return _choose_by_latency(candidates)
+        least = min(n.outstanding for n in candidates)
+        return random.choice([n for n in candidates if n.outstanding == least])
+
+    def _call_node(self, node, method, args, kwargs):
+        """ Calls a method of the Solr object of a node keeping the node
+        statistics. Returns a (result, exception, failed) tuple.
+        """
+        node.started()
+        start = time.time()
+        try:
+            result = getattr(node.solr, method)(*args, **kwargs)
+        except Exception as e:
+            node.finished(error=True)
+            node.healthy = False
+            return None, e, True
+        elapsed = time.time() - start
+        failed = getattr(result, 'status', 200) >= 500
+        node.finished(elapsed, error=failed)
+        if method == 'search' and not failed:
+            self._latencies.append(elapsed)
+        return result, None, failed
+
+    def call(self, method, *args, **kwargs):
+        """Calls a method of the Solr object of a node. Reads are retried on
+        the rest of the nodes."""
+        return self._call(method, args, kwargs)
+
+    def _call(self, method, args, kwargs, tried=()):
+        """ See `call`. Nodes in tried are not called. """
+        retry = method in self.READS
+        tried = list(tried)
+        while True:
+            node = self.choose(tried)
+            tried.append(node)
+            can_retry = retry and self.choose(tried) is not None
+            result, exception, failed = self._call_node(node, method, args,
+                                                        kwargs)
+            if failed and can_retry:
+                continue
+            if exception is not None:
+                raise exception
+            return result
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging a search, or None if there are not
+        enough recent searches to know."""
+        latencies = sorted(self._latencies)
+        if len(latencies) < 20:
+            return None
+        position = int(round(self.hedge_percentile / 100.0 *
+                             (len(latencies) - 1)))
+        return latencies[position]
+
+    def _can_hedge(self):
+        with self._hedge_lock:
+            if self.hedges + 1 > self.hedge_budget * self.searches:
+                return False
+            self.hedges += 1
+            return True
+
+    def hedged_call(self, method, *args, **kwargs):
+        """Calls a read method on a node and, if it has not answered after
+        `hedge_delay` seconds and the budget allows it, on a second node.
+        Returns the first successful answer. If every node called fails,
+        the call fails over to the rest of the nodes like `call`."""
+        with self._hedge_lock:
+            self.searches += 1
+        delay = self.hedge_delay()
+        first = self.choose()
+        if delay is None or self.choose([first]) is None:
+            return self.call(method, *args, **kwargs)
+
+        answers = Queue()
+
+        def run(node):
+            answers.put(self._call_node(node, method, args, kwargs))
+
+        _start_thread(run, first)
+        tried = [first]
+        pending = 1
+        try:
+            answer = answers.get(timeout=delay)
+            pending -= 1
+        except Empty:
+            answer = None
+            if self._can_hedge():
+                tried.append(self.choose(tried))
+                _start_thread(run, tried[-1])
+                pending += 1
+
+        while True:
+            if answer is None:
+                answer = answers.get()
+                pending -= 1
+            result, exception, failed = answer
+            if not failed or not pending:
+                break
+            answer = None
+
+        if failed and self.choose(tried) is not None:
+            return self._call(method, args, kwargs, tried)
+        if exception is not None:
+            raise exception
+        return result
+
+    def search(self, resource='select', **kwargs):
+        """See `Solr.search`."""
+        if self.hedge_percentile is not None:
+            return self.hedged_call('search', resource, **kwargs)
+        return self.call('search', resource, **kwargs)
+
+    def more_like_this(self, resource='mlt', text=None, **kwargs):
+        """See `Solr.more_like_this`."""
+        return self.call('more_like_this', resource, text, **kwargs)
+
+    def search_cursor(self, resource='select', **kwargs):
+        """Returns a Cursor bound to one node. See `Solr.search_cursor`."""
+        return self.choose().solr.search_cursor(resource, **kwargs)
+
+    def export(self, q, fl, sort, **kwargs):
+        """Exports from one node. See `Solr.export`."""
+        return self.choose().solr.export(q, fl, sort, **kwargs)
+
+    def _write(self, method, *args, **kwargs):
+        """ Calls a method that changes the index and invalidates the
+        cache and the coalesced searches of every node, not only of the node
+        that made the change. """
+        try:
+            return self.call(method, *args, **kwargs)
+        finally:
+            for node in self.nodes:
+                node.solr._invalidate_cache()
+
+    def update(self, documents, input_type='json', commit=True,
+               commit_within=None):
+        """See `Solr.update`."""
+        return self._write('update', documents, input_type, commit,
+                           commit_within)
+
+    def bulk_update(self, documents, **kwargs):
+        """See `Solr.bulk_update`."""
+        return self._write('bulk_update', documents, **kwargs)
+
+    def delete_by_key(self, identifier, commit=True, commit_within=None):
+        """See `Solr.delete_by_key`."""
+        return self._write('delete_by_key', identifier, commit,
+                           commit_within)
+
+    def delete_by_query(self, query, commit=True, commit_within=None):
+        """See `Solr.delete_by_query`."""
+        return self._write('delete_by_query', query, commit, commit_within)
+
+    def commit(self, **kwargs):
+        """See `Solr.commit`."""
+        return self._write('commit', **kwargs)
+
+    def optimize(self, **kwargs):
+        """See `Solr.optimize`."""
+        return self.call('optimize', **kwargs)
+
+    def rollback(self):
+        """See `Solr.rollback`."""
+        return self._write('rollback')
+
+    def is_up(self):
+        """True if any node is up."""
+        return any(node.solr.is_up() for node in self.nodes)
+
+
+def _make_solrs(base_urls, kwargs):
+    """ Creates a Solr object per url. When the version is not given it is
+    requested only to the first node that answers.
+    """
+    if kwargs.get('version'):
+        return [Solr(url, **kwargs) for url in base_urls]
+    error = None
+    for url in base_urls:
+        try:
+            first = Solr(url, **kwargs)
+        except Exception as e:
+            error = e
+            continue
+        kwargs = dict(kwargs, version=first.version)
+        return [first if u == url else Solr(u, **kwargs) for u in base_urls]
+    raise error
+
+
+def _start_thread(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def _choose_by_latency(nodes):
+    """ Chooses a node randomly with weights inversely proportional to the
+    latency. Nodes without latency get the weight of the fastest node.
+    """
+    latencies = [n.latency for n in nodes if n.latency]
+    best = min(latencies) if latencies else 1.0
+    weights = [1.0 / (n.latency or best) for n in nodes]
+    point = random.uniform(0, sum(weights))
+    for node, weight in zip(nodes, weights):
+        point -= weight
+        if point <= 0:
+            return node
+    return nodes[-1]
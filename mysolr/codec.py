@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.codec
+~~~~~~~~~~~~
+
+JSON codecs used to parse Solr responses and to serialize update messages.
+Codecs read bytes and write bytes so no intermediate unicode copy of the
+whole body is needed. The fastest available library is used by default:
+orjson, then ujson and finally the standard library json module.
+
+"""
+import json
+
+
+class JSONCodec(object):
+    """Codec based on the standard library json module."""
+    name = 'json'
+
+    def loads(self, content):
+        """Parses a JSON document from bytes."""
+        return json.loads(content.decode('utf-8'))
+
+    def dumps(self, obj):
+        """Serializes obj to JSON bytes."""
+        return json.dumps(obj).encode('utf-8')
+
+
+class UjsonCodec(JSONCodec):
+    """Codec based on ujson."""
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, content):
+        return self._ujson.loads(content)
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj).encode('utf-8')
+
+
+class OrjsonCodec(JSONCodec):
+    """Codec based on orjson, which parses from and serializes to bytes."""
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, content):
+        return self._orjson.loads(content)
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+
+#: Available codecs, fastest first.
+CODECS = [OrjsonCodec, UjsonCodec, JSONCodec]
+
+
+def get_codec(codec=None):
+    """Returns a codec instance.
+
+    :param codec: None for the fastest codec available, the name of a codec
+                  ('orjson', 'ujson' or 'json') or a codec instance, which is
+                  returned as is.
+    """
+    if codec is None:
+        return default_codec
+    if hasattr(codec, 'loads'):
+        return codec
+    for codec_class in CODECS:
+        if codec_class.name == codec:
+            return codec_class()
+    raise ValueError('Unknown codec: %s' % codec)
+
+
+def _best_codec():
+    for codec_class in CODECS:
+        try:
+            return codec_class()
+        except ImportError:
+            pass
+
+
+#: Codec used when none is given.
+default_codec = _best_codec()
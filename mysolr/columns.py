@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.columns
+~~~~~~~~~~~~~~
+
+Columnar materialization of documents. Values are appended to typed
+buffers (array.array) one document at a time, so a cursor can fill columns
+while the pages are streamed without keeping the documents. numpy is only
+needed to convert the columns into numpy arrays.
+
+>>> columns = solr.search_cursor(q='*:*', fl='id,price').fetch_columns(1000)
+>>> arrays = columns.to_arrays()
+
+"""
+from array import array
+import calendar
+import numbers
+import re
+import time
+
+from .compat import get_basestring
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+#: Solr date format, i.e. 1995-12-31T23:59:59.999Z
+_DATE = re.compile(r'^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'
+                   r'(?:\.(\d{1,9}))?Z$')
+
+
+def _int64_typecode():
+    """ 'q', or 'l' on Python 2, whose array module has no 'q'. """
+    try:
+        array('q')
+    except ValueError:
+        return 'l'
+    return 'q'
+
+
+#: Array typecode of int64 values. It is 32 bits wide on Python 2 for
+#: platforms with a 32 bits long, where bigger ints and dates (milliseconds)
+#: are kept as objects.
+_INT64 = _int64_typecode()
+
+#: Array typecodes and numpy dtypes of the column kinds.
+_TYPECODES = {'int64': _INT64, 'float64': 'd', 'bool': 'B',
+              'datetime64': _INT64}
+_DTYPES = {'int64': 'int64', 'float64': 'float64', 'bool': 'bool',
+           'datetime64': 'int64'}
+#: Values stored for missing values of single valued columns.
+_PLACEHOLDERS = {'int64': 0, 'float64': float('nan'), 'bool': 0,
+                 'datetime64': 0, 'object': None}
+
+_INT64_MIN = -2 ** (array(_INT64).itemsize * 8 - 1)
+_INT64_MAX = 2 ** (array(_INT64).itemsize * 8 - 1) - 1
+
+
+def parse_date(value):
+    """Milliseconds since the epoch of a Solr date string, or None if the
+    string is not a Solr date."""
+    match = _DATE.match(value)
+    if match is None:
+        return None
+    parts = match.groups()
+    seconds = calendar.timegm(tuple(int(part) for part in parts[:6]))
+    milliseconds = int((parts[6] or '0').ljust(3, '0')[:3])
+    return seconds * 1000 + milliseconds
+
+
+def format_date(milliseconds):
+    """Solr date string of a number of milliseconds since the epoch."""
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    date = '%04d-%02d-%02dT%02d:%02d:%02d' % \
+        time.gmtime(seconds)[:6]
+    if milliseconds:
+        return '%s.%03dZ' % (date, milliseconds)
+    return date + 'Z'
+
+
+def _kind(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, numbers.Integral):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            return 'int64'
+        return 'object'
+    if isinstance(value, float):
+        return 'float64'
+    if isinstance(value, get_basestring()) and _DATE.match(value) and \
+            _INT64_MAX > 2 ** 31:
+        return 'datetime64'
+    return 'object'
+
+
+def _combine(kind, other):
+    """ Kind of a column holding values of both kinds. """
+    if kind is None or kind == other:
+        return other
+    if other is None:
+        return kind
+    if set((kind, other)) == set(('int64', 'float64')):
+        return 'float64'
+    return 'object'
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('numpy is required to build arrays.')
+    return numpy
+
+
+class Column(object):
+    """Values of a field in a typed buffer.
+
+    Single valued columns keep a value per row in `values`. Multi-valued
+    columns keep the values of every row one after the other in `values`,
+    and the values of row i are values[offsets[i]:offsets[i + 1]]. Missing
+    values are marked with a 0 in `mask`, which is None while every row has
+    a value.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        #: 'int64', 'float64', 'bool', 'datetime64' (milliseconds since the
+        #: epoch, UTC), 'object' or None while every value is missing.
+        self.kind = None
+        #: array.array, or a list for object columns.
+        self.values = []
+        #: array of int64 offsets of multi-valued columns, or None.
+        self.offsets = None
+        #: array('B') with 1 for present values and 0 for missing ones.
+        self.mask = None
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return '<Column %s kind=%s rows=%d>' % (self.name, self.kind,
+                                               self.length)
+
+    @property
+    def multivalued(self):
+        return self.offsets is not None
+
+    def append(self, value):
+        """Appends the value of a row. Lists and tuples are multi-valued;
+        None is a missing value. The column is converted to a wider kind when
+        a value does not fit in its buffer (ints into floats, anything else
+        into objects)."""
+        multi = isinstance(value, (list, tuple))
+        if multi:
+            elements = value
+        elif value is None:
+            elements = ()
+        else:
+            elements = (value, )
+        kind = self.kind
+        for element in elements:
+            kind = _combine(kind, _kind(element))
+        if kind != self.kind or (multi and self.offsets is None):
+            self._rebuild(kind, multi or self.offsets is not None)
+
+        convert = self._convert
+        if self.offsets is not None:
+            for element in elements:
+                self.values.append(convert(element))
+            self.offsets.append(len(self.values))
+        elif value is None:
+            if self.kind is not None:
+                self.values.append(_PLACEHOLDERS[self.kind])
+        else:
+            self.values.append(convert(value))
+
+        if value is None and self.mask is None:
+            self.mask = array('B', [1]) * self.length
+        if self.mask is not None:
+            self.mask.append(0 if value is None else 1)
+        self.length += 1
+
+    def _convert(self, value):
+        if self.kind == 'datetime64':
+            return parse_date(value)
+        if self.kind == 'float64':
+            return float(value)
+        return value
+
+    def _output(self, value):
+        if self.kind == 'datetime64':
+            return format_date(value)
+        if self.kind == 'bool':
+            return bool(value)
+        return value
+
+    def _rebuild(self, kind, multi):
+        """ Converts the column to another kind and/or to multi-valued. """
+        rows = self.to_list()
+        self.kind = kind
+        self.values = array(_TYPECODES[kind]) if kind in _TYPECODES else []
+        self.offsets = array(_INT64, [0]) if multi else None
+        self.mask = None
+        self.length = 0
+        for row in rows:
+            self.append(row)
+
+    def to_list(self):
+        """Returns a list with the value of every row: None for missing
+        values and lists for multi-valued columns."""
+        rows = []
+        output = self._output
+        for i in range(self.length):
+            if self.mask is not None and not self.mask[i]:
+                rows.append(None)
+            elif self.offsets is not None:
+                start, end = self.offsets[i], self.offsets[i + 1]
+                rows.append([output(v) for v in self.values[start:end]])
+            else:
+                rows.append(output(self.values[i]))
+        return rows
+
+    def to_numpy(self):
+        """Returns the column as a numpy array: int64, float64, bool,
+        datetime64[ms] or object. Columns with missing values are returned
+        as masked arrays. Multi-valued columns are returned as a (values,
+        offsets) tuple of arrays, with missing rows as empty ranges.
+        Raises RuntimeError if numpy is not installed."""
+        numpy = _numpy()
+        if self.kind in _DTYPES:
+            # numpy reads the typecodes of the array module
+            data = numpy.frombuffer(self.values, self.values.typecode)
+            data = data.astype(_DTYPES[self.kind])
+            if self.kind == 'datetime64':
+                data = data.view('datetime64[ms]')
+        else:
+            values = self.values if self.kind else [None] * self.length
+            data = numpy.empty(len(values), dtype=object)
+            data[:] = values
+        if self.offsets is not None:
+            offsets = numpy.frombuffer(self.offsets, self.offsets.typecode)
+            return data, offsets.astype('int64')
+        if self.mask is not None:
+            present = numpy.frombuffer(self.mask, 'uint8')
+            data = numpy.ma.masked_array(data, mask=present == 0)
+        return data
+
+
+class ColumnBuilder(object):
+    """Builds a Column per field from documents appended one at a time."""
+
+    def __init__(self, fields=None):
+        """
+        :param fields: Names of the fields to keep. If None, every field of
+                       the documents gets a column, and the rows before the
+                       first document with a field are missing values.
+        """
+        self.fields = tuple(fields) if fields else None
+        #: OrderedDict of Column objects by field name.
+        self.columns = OrderedDict()
+        if self.fields:
+            for name in self.fields:
+                self.columns[name] = Column(name)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, document):
+        """Appends a document, a dict or a Record."""
+        columns = self.columns
+        if self.fields:
+            for name, column in columns.items():
+                column.append(document.get(name))
+        else:
+            for name, value in document.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = Column(name)
+                    for _ in range(self.length):
+                        column.append(None)
+                column.append(value)
+            self.length += 1
+            for column in columns.values():
+                if column.length < self.length:
+                    column.append(None)
+            return
+        self.length += 1
+
+    def extend(self, documents):
+        """Appends every document of an iterable."""
+        for document in documents:
+            self.append(document)
+        return self
+
+    def to_arrays(self):
+        """Returns an OrderedDict of numpy arrays by field name. See
+        `Column.to_numpy`."""
+        return OrderedDict((name, column.to_numpy())
+                           for name, column in self.columns.items())
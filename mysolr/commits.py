@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.commits
+~~~~~~~~~~~~~~
+
+Commit scheduling. A commit after every update makes Solr open a new
+searcher for each one of them, and many writers committing at the same time
+overload it. A CommitScheduler coalesces the commits requested by every
+caller into at most one commit per interval; callers that need to read
+their own writes wait for the commit that covers them.
+
+>>> solr = Solr('http://localhost:8983/solr/', commit_interval=1.0)
+>>> solr.update(documents)  # waits for a commit shared with other writers
+>>> solr.update(documents, commit=False)
+>>> commit = solr.request_commit()
+>>> commit.wait()
+
+"""
+import threading
+import time
+
+
+class Commit(object):
+    """A commit requested to a CommitScheduler. It covers every change sent
+    before it was requested."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        #: SolrResponse of the commit once it has been made.
+        self.response = None
+        #: Exception raised by the commit request, if any.
+        self.exception = None
+
+    def _finish(self, response=None, exception=None):
+        self.response = response
+        self.exception = exception
+        self.done.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the commit has been made and returns its
+        SolrResponse. The exception of the commit request, if any, is raised
+        again. Raises RuntimeError if the timeout expires first.
+
+        :param timeout: Seconds to wait, or None to wait as long as needed.
+        """
+        if not self.done.wait(timeout):
+            raise RuntimeError('Commit not made in %s seconds' % timeout)
+        if self.exception is not None:
+            raise self.exception
+        return self.response
+
+
+class CommitScheduler(object):
+    """Makes at most one commit per interval in a background thread, on
+    behalf of every caller that requested a commit since the previous one.
+    A request made when no commit was made during the last interval is
+    committed right away.
+    """
+
+    def __init__(self, solr, interval=1.0, soft_commit=False,
+                 wait_searcher=True):
+        """
+        :param solr: Solr object the commits are sent to.
+        :param interval: Minimum number of seconds between two commits.
+        :param soft_commit: Make soft commits, which make changes visible
+                            without flushing them to disk (Solr 4 or later).
+        :param wait_searcher: Wait until the new searcher is registered, so
+                              changes are visible once a commit is done.
+        """
+        self.solr = solr
+        self.interval = interval
+        self.soft_commit = soft_commit
+        self.wait_searcher = wait_searcher
+        #: Number of commits made.
+        self.commits = 0
+        self._pending = None
+        self._last = None
+        self._now = False
+        self._closed = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def request(self):
+        """Requests a commit of the changes sent so far and returns the
+        Commit that will make them visible, without waiting for it."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('CommitScheduler is closed')
+            if self._pending is None:
+                self._pending = Commit()
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            return self._pending
+
+    def flush(self):
+        """Makes the pending commit, if any, without waiting for the end of
+        the interval and waits for it."""
+        with self._condition:
+            commit = self._pending
+            if commit is None:
+                return
+            self._now = True
+            self._condition.notify()
+        commit.wait()
+
+    def close(self):
+        """Makes the pending commit and stops the background thread."""
+        with self._condition:
+            self._closed = True
+            self._now = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                commit = self._next()
+                if commit is None:
+                    return
+            self._commit(commit)
+
+    def _next(self):
+        """ Waits until a commit is due and returns it, or returns None once
+        the scheduler is closed and nothing is pending. Called with the
+        condition held. """
+        while True:
+            if self._pending is None:
+                if self._closed:
+                    return None
+                self._condition.wait()
+                continue
+            delay = 0
+            if self._last is not None and not self._now:
+                delay = self._last + self.interval - time.time()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            commit = self._pending
+            self._pending = None
+            self._now = False
+            self._last = time.time()
+            return commit
+
+    def _commit(self, commit):
+        try:
+            response = self.solr.commit(wait_searcher=self.wait_searcher,
+                                        soft_commit=self.soft_commit)
+        except Exception as e:
+            commit._finish(exception=e)
+        else:
+            commit._finish(response)
+        self.commits += 1
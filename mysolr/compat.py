@@ -8,15 +8,18 @@
 """
 
 import sys
-import anyjson
+from .codec import get_codec
 
 if sys.version_info >= (3, ):
-    from urllib.parse import urljoin
+    from urllib.parse import urljoin, urlencode, urlparse
+    from queue import Queue, Empty, Full
 elif sys.version_info >= (2, ):
-    from urlparse import urljoin
+    from urlparse import urljoin, urlparse
+    from urllib import urlencode
+    from Queue import Queue, Empty, Full
 
-def parse_response(content):
-    return anyjson.loads(content.decode('utf-8'))
+def parse_response(content, codec=None):
+    return get_codec(codec).loads(content)
 
 def compat_args(query):
     for (key, value) in query.items():
@@ -24,5 +27,14 @@ def compat_args(query):
             query[key] = str(value).lower()
 
 
+def as_list(value):
+    """ Returns a Solr parameter value as a list of values. """
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
 def get_basestring():
     return str if sys.version_info[0] == 3  else basestring
\ No newline at end of file
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.concurrency
+~~~~~~~~~~~~~~~~~~
+
+Thread helpers used to overlap Solr round-trips with the work done by the
+caller.
+
+"""
+import threading
+
+from .compat import Queue, Full
+
+#: How often (in seconds) a blocked worker checks if it has been cancelled.
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure(object):
+    """ Wraps an exception raised by a worker so it can travel through the
+    queue and be raised again in the consumer thread.
+    """
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _put(queue, item, stop):
+    """ Puts item in the queue blocking until there is room for it or the
+    consumer is gone. Returns False in the latter case.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=POLL_INTERVAL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _consume(iterable, queue, stop):
+    """ Worker body: moves the items of iterable into the queue. """
+    try:
+        for item in iterable:
+            if not _put(queue, item, stop):
+                return
+    except Exception as e:
+        _put(queue, _Failure(e), stop)
+        return
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            close()
+    _put(queue, _DONE, stop)
+
+
+def threaded_iter(iterables, maxsize=1):
+    """ Generator that consumes each one of the given iterables in its own
+    background thread and yields their items as they arrive.
+
+    At most `maxsize` items are buffered waiting for the consumer, so workers
+    block when the consumer is slower than them. An exception raised by an
+    iterable is raised again by this generator right after the items that
+    were produced before it. Closing the generator (or leaving a for loop
+    early) cancels the workers.
+
+    :param iterables: List of iterables to consume.
+    :param maxsize: Maximum number of items buffered.
+    """
+    queue = Queue(maxsize)
+    stop = threading.Event()
+    threads = []
+    for iterable in iterables:
+        thread = threading.Thread(target=_consume,
+                                  args=(iterable, queue, stop))
+        thread.daemon = True
+        threads.append(thread)
+
+    for thread in threads:
+        thread.start()
+
+    remaining = len(threads)
+    try:
+        while remaining:
+            item = queue.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, _Failure):
+                raise item.exception
+            else:
+                yield item
+    finally:
+        stop.set()
+
+
+class _Call(object):
+    """ A call in flight of SingleFlight. """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """ Coalesces concurrent calls with the same key: while a call is in
+    flight, other calls with its key wait for it and get the same result
+    (or exception) instead of running again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """ Calls function(*args, **kwargs) unless a call with the same key
+        is in flight, in which case its result is returned.
+
+        :param key: Hashable key of the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.facets
+~~~~~~~~~~~~~
+
+Compact representation of facet counts. Terms and counts are stored in two
+parallel arrays instead of one OrderedDict entry per term, which matters for
+facets with hundreds of thousands of terms.
+
+"""
+from array import array
+import heapq
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+
+class FacetCounts(object):
+    """Ordered, read-only mapping of facet terms to counts.
+
+    Iteration follows the order sent by Solr. Lookups by term build an index
+    the first time they are used.
+    """
+    __slots__ = ('terms', 'counts', '_index')
+
+    def __init__(self, terms, counts):
+        """
+        :param terms: List of terms.
+        :param counts: Iterable of counts, in the same order as terms.
+        """
+        #: List of terms.
+        self.terms = terms
+        #: Array of counts.
+        self.counts = array('l', counts)
+        self._index = None
+
+    @classmethod
+    def from_solr(cls, facet):
+        """Builds a FacetCounts from a facet as sent by Solr: a flat
+        [term, count, term, count, ...] list or a mapping."""
+        if isinstance(facet, dict):
+            return cls(list(facet.keys()), facet.values())
+        return cls(facet[0::2], facet[1::2])
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __contains__(self, term):
+        return term in self._get_index()
+
+    def __getitem__(self, term):
+        return self.counts[self._get_index()[term]]
+
+    def __eq__(self, other):
+        if isinstance(other, FacetCounts):
+            return self.terms == other.terms and self.counts == other.counts
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return '<FacetCounts terms=%d>' % len(self.terms)
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = dict((term, i) for i, term in enumerate(self.terms))
+        return self._index
+
+    def to_numpy(self):
+        """Returns a (terms, counts) pair of numpy arrays, of objects and of
+        int64. Raises RuntimeError if numpy is not installed."""
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError('numpy is required to build arrays.')
+        terms = numpy.empty(len(self.terms), dtype=object)
+        terms[:] = self.terms
+        return terms, numpy.array(self.counts, dtype='int64')
+
+    def get(self, term, default=None):
+        """Count of term, or default if the term is not present."""
+        try:
+            return self[term]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """List of terms."""
+        return self.terms
+
+    def values(self):
+        """Array of counts."""
+        return self.counts
+
+    def items(self):
+        """Iterator of (term, count) pairs."""
+        return zip(self.terms, self.counts)
+
+    def top(self, k):
+        """List of the k (term, count) pairs with higher counts."""
+        positions = heapq.nlargest(k, range(len(self.terms)),
+                                   key=self.counts.__getitem__)
+        return [(self.terms[i], self.counts[i]) for i in positions]
+
+    def to_dict(self):
+        """Returns the facet as an OrderedDict."""
+        return OrderedDict(zip(self.terms, self.counts))
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.instrumentation
+~~~~~~~~~~~~~~~~~~~~~~
+
+Hooks called around every HTTP request made by Solr and Cursor, and two
+built-in hooks: a histogram collector that can be exported in the Prometheus
+text format and a StatsD client.
+
+>>> from mysolr import Solr
+>>> from mysolr.instrumentation import HistogramCollector
+>>> collector = HistogramCollector()
+>>> solr = Solr('http://myserver:8080/solr', hooks=[collector])
+>>> response = solr.search(q='*:*')
+>>> print(collector.prometheus())
+
+"""
+import socket
+import threading
+import time
+
+from .compat import urlencode, urlparse
+
+#: Upper bounds in seconds of the buckets of the histograms.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class RequestEvent(object):
+    """Measures of a request to Solr. Times are in seconds.
+
+    requests does not report DNS and connect times separately; they are
+    part of `ttfb`.
+    """
+
+    def __init__(self, method, url, resource=None, params=None, data=None):
+        self.method = method
+        self.url = url
+        #: Request handler, i.e. 'select'. The last part of the url path by
+        #: default.
+        self.resource = resource or \
+            urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+        #: Size of the query string and body, None for streamed bodies.
+        data_size = _size(data)
+        self.request_bytes = None if data_size is None \
+            else _size(params) + data_size
+        self.status = None
+        #: Size of the response body as sent by Solr. None when the response
+        #: is streamed without Content-Length.
+        self.response_bytes = None
+        #: Time until the response headers were read.
+        self.ttfb = None
+        #: Time until the response body was read.
+        self.transfer_time = None
+        #: Time spent parsing the response.
+        self.parse_time = None
+        #: Time from the start of the request until the response was parsed
+        #: or the request failed.
+        self.total_time = None
+        #: QTime reported by Solr, in milliseconds.
+        self.qtime = None
+        self.exception = None
+        self.start = time.time()
+
+    def __repr__(self):
+        return '<RequestEvent %s %s status=%s>' % (self.method, self.resource,
+                                                   self.status)
+
+    @property
+    def network_time(self):
+        """Transfer time not spent by Solr processing the query."""
+        if self.transfer_time is None or self.qtime is None:
+            return None
+        return max(self.transfer_time - self.qtime / 1000.0, 0.0)
+
+    def response_received(self, http_response, stream=False):
+        self.transfer_time = time.time() - self.start
+        self.status = http_response.status_code
+        elapsed = getattr(http_response, 'elapsed', None)
+        if elapsed is not None:
+            self.ttfb = elapsed.total_seconds()
+        length = (getattr(http_response, 'headers', None) or {}) \
+            .get('Content-Length')
+        if length is not None:
+            self.response_bytes = int(length)
+        elif not stream:
+            self.response_bytes = len(http_response.content or b'')
+
+    def response_parsed(self, result, parse_start):
+        now = time.time()
+        self.parse_time = now - parse_start
+        self.total_time = now - self.start
+        self.qtime = getattr(result, 'qtime', None)
+
+    def failed(self, exception):
+        self.exception = exception
+        self.total_time = time.time() - self.start
+
+
+def _size(value):
+    """ Size in bytes of a query or body, None if it is an iterable. """
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return len(urlencode(value, doseq=True))
+    if isinstance(value, (list, tuple)):
+        return len(urlencode(value))
+    if hasattr(value, 'encode'):
+        return len(value.encode('utf-8'))
+    return None
+
+
+class Hooks(object):
+    """Base class of the hooks. Every method receives the RequestEvent of
+    the request and does nothing by default. Hooks are called from the
+    thread that makes the request and must not raise."""
+
+    def before_request(self, event):
+        """Called right before the request is sent."""
+
+    def after_response(self, event):
+        """Called once the response has been received and parsed."""
+
+    def on_error(self, event):
+        """Called when the request or the parsing raises. The exception is
+        in event.exception and is raised again after the hooks."""
+
+
+def instrumented_request(hooks, make_request, method, url, parse,
+                         resource=None, **kwargs):
+    """ Makes an HTTP request with make_request and returns
+    parse(http_response), calling the hooks around it.
+
+    :param hooks: List of Hooks objects.
+    :param make_request: Object used to make HTTP requests.
+    :param method: 'get' or 'post'.
+    :param parse: Function that builds the result from the HTTP response.
+    :param resource: Resource name reported to the hooks.
+    :param **kwargs: Arguments of the request.
+    """
+    if not hooks:
+        return parse(getattr(make_request, method)(url, **kwargs))
+
+    event = RequestEvent(method.upper(), url, resource, kwargs.get('params'),
+                         kwargs.get('data'))
+    for hook in hooks:
+        hook.before_request(event)
+    try:
+        http_response = getattr(make_request, method)(url, **kwargs)
+        event.response_received(http_response, kwargs.get('stream', False))
+        parse_start = time.time()
+        result = parse(http_response)
+    except Exception as e:
+        event.failed(e)
+        for hook in hooks:
+            hook.on_error(event)
+        raise
+    event.response_parsed(result, parse_start)
+    for hook in hooks:
+        hook.after_response(event)
+    return result
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed buckets, as Prometheus uses."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        #: Observations of each bucket; the last one is +Inf.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percentile):
+        """Upper bound of the bucket of the given percentile (i.e. 99), or
+        None if there are no observations."""
+        if not self.count:
+            return None
+        rank = percentile / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) \
+                    else float('inf')
+        return float('inf')
+
+    def cumulative(self):
+        """List of (upper bound, observations less or equal) pairs."""
+        pairs = []
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'), ), self.counts):
+            seen += count
+            pairs.append((bound, seen))
+        return pairs
+
+
+class HistogramCollector(Hooks):
+    """Hooks that keep histograms of the times of the requests by resource
+    and phase, and counters of requests, errors and bytes. Phases are
+    'total', 'ttfb', 'transfer', 'parse', 'qtime' (Solr) and 'network'
+    (transfer time minus QTime)."""
+
+    PHASES = ('total', 'ttfb', 'transfer', 'parse', 'qtime', 'network')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        #: Histograms by (resource, phase).
+        self.histograms = {}
+        #: Counters by (resource, name): requests, errors, request_bytes and
+        #: response_bytes.
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, resource, name, value=1):
+        key = (resource, name)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, resource, phase, value):
+        if value is None:
+            return
+        key = (resource, phase)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def after_response(self, event):
+        qtime = event.qtime / 1000.0 if event.qtime is not None else None
+        with self._lock:
+            self._count(event.resource, 'requests')
+            if event.request_bytes is not None:
+                self._count(event.resource, 'request_bytes',
+                            event.request_bytes)
+            if event.response_bytes is not None:
+                self._count(event.resource, 'response_bytes',
+                            event.response_bytes)
+            self._observe(event.resource, 'total', event.total_time)
+            self._observe(event.resource, 'ttfb', event.ttfb)
+            self._observe(event.resource, 'transfer', event.transfer_time)
+            self._observe(event.resource, 'parse', event.parse_time)
+            self._observe(event.resource, 'qtime', qtime)
+            self._observe(event.resource, 'network', event.network_time)
+
+    def on_error(self, event):
+        with self._lock:
+            self._count(event.resource, 'requests')
+            self._count(event.resource, 'errors')
+
+    def histogram(self, resource, phase='total'):
+        """Histogram of a phase of the requests to a resource, or None."""
+        return self.histograms.get((resource, phase))
+
+    def prometheus(self, prefix='mysolr'):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines = ['# TYPE %s_request_seconds histogram' % prefix]
+        for (resource, phase), histogram in histograms:
+            labels = 'resource="%s",phase="%s"' % (resource, phase)
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s_request_seconds_bucket{%s,le="%s"} %d' %
+                             (prefix, labels, le, count))
+            lines.append('%s_request_seconds_sum{%s} %r' %
+                         (prefix, labels, histogram.sum))
+            lines.append('%s_request_seconds_count{%s} %d' %
+                         (prefix, labels, histogram.count))
+        names = sorted(set(name for (_, name), _ in counters))
+        for name in names:
+            lines.append('# TYPE %s_%s_total counter' % (prefix, name))
+            for (resource, counter), value in counters:
+                if counter == name:
+                    lines.append('%s_%s_total{resource="%s"} %d' %
+                                 (prefix, name, resource, value))
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdHooks(Hooks):
+    """Hooks that send the times (in milliseconds) and sizes of every
+    request to a StatsD server over UDP, as
+    <prefix>.<resource>.<phase>:<value>|ms."""
+
+    def __init__(self, host='localhost', port=8125, prefix='mysolr'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, lines):
+        try:
+            self._socket.sendto('\n'.join(lines).encode('utf-8'),
+                                self.address)
+        except socket.error:
+            pass
+
+    def after_response(self, event):
+        name = self._name(event)
+        lines = ['%s.requests:1|c' % name]
+        times = (('total', event.total_time), ('ttfb', event.ttfb),
+                 ('transfer', event.transfer_time),
+                 ('parse', event.parse_time),
+                 ('network', event.network_time))
+        for phase, value in times:
+            if value is not None:
+                lines.append('%s.%s:%.3f|ms' % (name, phase, value * 1000))
+        if event.qtime is not None:
+            lines.append('%s.qtime:%d|ms' % (name, event.qtime))
+        if event.response_bytes is not None:
+            lines.append('%s.response_bytes:%d|c' % (name,
+                                                     event.response_bytes))
+        self._send(lines)
+
+    def on_error(self, event):
+        self._send(['%s.errors:1|c' % self._name(event)])
+
+    def _name(self, event):
+        return '%s.%s' % (self.prefix, event.resource.replace('/', '.'))
+
+    def close(self):
+        self._socket.close()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.javabin
+~~~~~~~~~~~~~~
+
+Decoder of javabin, the binary response format of Solr (wt=javabin). It is
+smaller on the wire than JSON and numbers are not parsed from text. Values
+are decoded into the same structures the JSON response writer produces, so
+a SolrResponse has the same attributes with either format:
+
+- SimpleOrderedMap (ORDERED_MAP) and documents become dicts.
+- NamedList (NAMED_LST), as facet counts, becomes a flat list of names and
+  values, like json.nl=flat, the default of Solr.
+- Document lists become {'numFound', 'start', 'maxScore', 'docs'} dicts.
+- Dates become strings, i.e. '1995-12-31T23:59:59.999Z'.
+
+>>> solr = Solr('http://localhost:8983/solr/', wt='javabin')
+>>> response = solr.search(q='*:*', rows=1000)
+
+"""
+import struct
+
+from .columns import format_date
+
+# Tags of the javabin format, version 2.
+NULL = 0
+BOOL_TRUE = 1
+BOOL_FALSE = 2
+BYTE = 3
+SHORT = 4
+DOUBLE = 5
+INT = 6
+LONG = 7
+FLOAT = 8
+DATE = 9
+MAP = 10
+SOLRDOC = 11
+SOLRDOCLST = 12
+BYTEARR = 13
+ITERATOR = 14
+END = 15
+SOLRINPUTDOC = 16
+MAP_ENTRY_ITER = 17
+ENUM_FIELD_VALUE = 18
+MAP_ENTRY = 19
+UUID = 20
+# Tags whose 3 high bits give the type and 5 low bits a size or a value.
+STR = 1 << 5
+SINT = 2 << 5
+SLONG = 3 << 5
+ARR = 4 << 5
+ORDERED_MAP = 5 << 5
+NAMED_LST = 6 << 5
+EXTERN_STRING = 7 << 5
+
+VERSION = 2
+
+_SHORT = struct.Struct('>h')
+_INT = struct.Struct('>i')
+_LONG = struct.Struct('>q')
+_FLOAT = struct.Struct('>f')
+_DOUBLE = struct.Struct('>d')
+
+
+def _float32(value):
+    """Shortest float that is stored as the same float32, as Java prints
+    floats (1.1 instead of 1.100000023841858)."""
+    if value != value or value in (float('inf'), float('-inf')):
+        return value
+    packed = _FLOAT.pack(value)
+    for digits in (6, 7, 8):
+        candidate = float('%.*g' % (digits, value))
+        if _FLOAT.pack(candidate) == packed:
+            return candidate
+    return value
+
+
+class JavabinDecoder(object):
+    """Decodes a single javabin message. Use `loads`."""
+
+    def __init__(self, content):
+        self.data = bytearray(content)
+        self.position = 0
+        #: Strings sent once and referenced by EXTERN_STRING afterwards.
+        self.strings = []
+        self.readers = {
+            ARR: self.read_arr, ORDERED_MAP: self.read_ordered_map,
+            NAMED_LST: self.read_named_list,
+        }
+        self.simple_readers = {
+            BYTE: self.read_byte, SHORT: self.read_short,
+            DOUBLE: self.read_double, INT: self.read_int,
+            LONG: self.read_long, FLOAT: self.read_float,
+            DATE: self.read_date, MAP: self.read_map,
+            SOLRDOC: self.read_document,
+            SOLRDOCLST: self.read_document_list,
+            BYTEARR: self.read_byte_array, ITERATOR: self.read_iterator,
+            MAP_ENTRY_ITER: self.read_map_entry_iter,
+            ENUM_FIELD_VALUE: self.read_enum, MAP_ENTRY: self.read_map_entry,
+            UUID: self.read_uuid,
+        }
+
+    def decode(self):
+        if not self.data or self.data[0] != VERSION:
+            raise ValueError('Not a javabin message of version %d' % VERSION)
+        self.position = 1
+        value = self.read_value()
+        if isinstance(value, list):
+            # a NamedList at the top, as an object in JSON
+            value = dict(zip(value[::2], value[1::2]))
+        return value
+
+    def read_value(self):
+        data = self.data
+        tag = data[self.position]
+        self.position += 1
+        kind = tag & 0xe0
+        # strings, field names and small ints inline: they are most values
+        if kind == EXTERN_STRING:
+            index = tag & 0x1f
+            if index == 0x1f:
+                index += self.read_vint()
+            if index:
+                return self.strings[index - 1]
+            value = self.read_value()
+            self.strings.append(value)
+            return value
+        if kind == STR:
+            size = tag & 0x1f
+            if size == 0x1f:
+                size += self.read_vint()
+            start = self.position
+            self.position = start + size
+            return data[start:start + size].decode('utf-8')
+        if kind == SINT or kind == SLONG:
+            value = tag & 0x0f
+            if tag & 0x10:
+                value |= self.read_vint() << 4
+            return value
+        if kind:
+            return self.readers[kind](tag)
+        if tag == NULL:
+            return None
+        if tag == BOOL_TRUE:
+            return True
+        if tag == BOOL_FALSE:
+            return False
+        reader = self.simple_readers.get(tag)
+        if reader is None:
+            raise ValueError('Unknown javabin tag %d at byte %d' %
+                             (tag, self.position - 1))
+        return reader()
+
+    def read_vint(self):
+        data = self.data
+        value = 0
+        shift = 0
+        while True:
+            byte = data[self.position]
+            self.position += 1
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def read_size(self, tag):
+        size = tag & 0x1f
+        if size == 0x1f:
+            size += self.read_vint()
+        return size
+
+    def _unpack(self, unpacker):
+        value = unpacker.unpack_from(self.data, self.position)[0]
+        self.position += unpacker.size
+        return value
+
+    def read_byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value - 256 if value > 127 else value
+
+    def read_short(self):
+        return self._unpack(_SHORT)
+
+    def read_int(self):
+        return self._unpack(_INT)
+
+    def read_long(self):
+        return self._unpack(_LONG)
+
+    def read_float(self):
+        return _float32(self._unpack(_FLOAT))
+
+    def read_double(self):
+        return self._unpack(_DOUBLE)
+
+    def read_date(self):
+        return format_date(self._unpack(_LONG))
+
+    def read_arr(self, tag):
+        return [self.read_value() for _ in range(self.read_size(tag))]
+
+    def read_ordered_map(self, tag):
+        read_value = self.read_value
+        result = {}
+        for _ in range(self.read_size(tag)):
+            name = read_value()
+            result[name] = read_value()
+        return result
+
+    def read_named_list(self, tag):
+        read_value = self.read_value
+        result = []
+        for _ in range(self.read_size(tag)):
+            result.append(read_value())
+            result.append(read_value())
+        return result
+
+    def read_map(self):
+        read_value = self.read_value
+        result = {}
+        for _ in range(self.read_vint()):
+            key = read_value()
+            result[key] = read_value()
+        return result
+
+    def read_document(self):
+        tag = self.data[self.position]
+        self.position += 1
+        read_value = self.read_value
+        document = {}
+        children = []
+        for _ in range(self.read_size(tag)):
+            name = read_value()
+            if isinstance(name, dict):
+                children.append(name)
+                continue
+            document[name] = read_value()
+        if children:
+            document['_childDocuments_'] = children
+        return document
+
+    def read_document_list(self):
+        header = self.read_value()
+        documents = self.read_value()
+        result = {'numFound': header[0], 'start': header[1]}
+        if header[2] is not None:
+            result['maxScore'] = header[2]
+        if len(header) > 3 and header[3] is not None:
+            result['numFoundExact'] = header[3]
+        result['docs'] = documents
+        return result
+
+    def read_byte_array(self):
+        size = self.read_vint()
+        start = self.position
+        self.position += size
+        return bytes(self.data[start:self.position])
+
+    def read_iterator(self):
+        values = []
+        while self.data[self.position] != END:
+            values.append(self.read_value())
+        self.position += 1
+        return values
+
+    def read_map_entry_iter(self):
+        result = {}
+        while self.data[self.position] != END:
+            key = self.read_value()
+            result[key] = self.read_value()
+        self.position += 1
+        return result
+
+    def read_enum(self):
+        self.read_value()  # ordinal
+        return self.read_value()
+
+    def read_map_entry(self):
+        key = self.read_value()
+        return {key: self.read_value()}
+
+    def read_uuid(self):
+        start = self.position
+        self.position += 16
+        return bytes(self.data[start:self.position])
+
+
+class JavabinCodec(object):
+    """Response codec of wt=javabin. It only decodes: updates are still
+    sent as JSON or XML."""
+    name = 'javabin'
+
+    def loads(self, content):
+        """Decodes a javabin message from bytes."""
+        return JavabinDecoder(content).decode()
+
+
+#: Response formats a Solr object can ask for.
+FORMATS = ('json', 'javabin')
+
+#: Codec used to parse javabin responses.
+javabin_codec = JavabinCodec()
@@ -13,71 +13,285 @@ operate with a Solr server.
 >>> query_response = solr.search(**query)
 
 """
-from .response import SolrResponse
-from .compat import urljoin, compat_args, get_basestring
+from .response import SolrResponse, StreamingSolrResponse
+from .compat import urljoin, compat_args, get_basestring, as_list
+from .concurrency import threaded_iter, SingleFlight
+from .codec import get_codec
+from .bulk import BulkIndexer
+from .transport import make_session, compress_body
+from .cache import QueryCache, canonical_key
+from .instrumentation import instrumented_request
+from .records import fields_from_fl
+from .columns import ColumnBuilder
+from .commits import Commit, CommitScheduler
+from .javabin import FORMATS, javabin_codec
+from . import batch
 from xml.sax.saxutils import escape
 
-import json
 import requests
 
+#: Approximate size in bytes of the chunks of streamed XML update messages.
+XML_CHUNK_SIZE = 64 * 1024
+
 class Solr(object):
     """Acts as an easy-to-use interface to Solr."""
 
     def __init__(self, base_url='http://localhost:8080/solr/',
-                 make_request=requests, use_get=False, version=None,
-                 timeout=None):
+                 make_request=None, use_get=False, version=None,
+                 timeout=None, codec=None, pool_maxsize=10, retries=3,
+                 cache=None, coalesce=False, hooks=None, wt='json',
+                 compress_updates=None, commit_interval=None,
+                 soft_commits=False):
         """ Initializes a Solr object. Solr URL is a needed parameter.
 
         :param base_url: Url to solr index
-        :param make_request: 
+        :param make_request: Object used to make HTTP requests, i.e. the
+                             requests module or a requests.Session. If None,
+                             a session with a pool of keep-alive connections
+                             is created (see `mysolr.transport.make_session`)
+                             and closed by `close`.
         :param use_get: Use get instead of post when searching. Useful if you
                         cache GET requests
         :param version: first number of the solr version. i.e. 4 if solr 
                         version is 4.0.0 If you set to none this parameter
                         a request to admin/system will be done at init time
                         in order to guess the version.
-        :param timeout: request timeout for all requests made to solr
+        :param timeout: request timeout for all requests made to solr. Use a
+                        (connect timeout, read timeout) tuple to set them
+                        separately.
+        :param codec: JSON codec used to parse responses and serialize
+                      updates. Name of a codec ('orjson', 'ujson' or 'json'),
+                      a codec instance or None to use the fastest available.
+        :param pool_maxsize: Connections kept per host by the default
+                             session.
+        :param retries: Times the default session retries a request after a
+                        connection error or a 503 response.
+        :param cache: QueryCache used to cache search responses, or True to
+                      use a QueryCache with the default options. It is
+                      cleared when this object sends updates, deletes,
+                      commits or rollbacks.
+        :param coalesce: If True, identical searches made at the same time
+                         from several threads share a single request and
+                         get the same SolrResponse.
+        :param hooks: List of `mysolr.instrumentation.Hooks` called around
+                      every request made by this object and its cursors.
+        :param wt: Format of search responses: 'json' or 'javabin', the
+                   binary format of Solr (see `mysolr.javabin`). It can be
+                   changed for a single search passing wt to `search`.
+        :param compress_updates: Minimum size in bytes of the update
+                                 messages that are sent gzip compressed, or
+                                 None to never compress them. Solr must
+                                 accept compressed request bodies (i.e. a
+                                 Jetty GzipHandler with inflateBufferSize).
+        :param commit_interval: If given, the commits requested by updates
+                                and deletes are coalesced by a
+                                `mysolr.commits.CommitScheduler` into at most
+                                one commit every commit_interval seconds,
+                                instead of a commit per call.
+        :param soft_commits: If True, the commits of the scheduler are soft
+                             commits. Raises ValueError before Solr 4.
         """
         self.base_url = base_url if base_url.endswith('/') else '%s/' % base_url
+        self._own_session = make_request is None
+        if make_request is None:
+            make_request = make_session(pool_maxsize=pool_maxsize,
+                                        retries=retries)
         self.make_request = make_request
         self.use_get = use_get
         self.version = version
         self.timeout = timeout
+        self.codec = get_codec(codec)
+        self.cache = QueryCache() if cache is True else cache
+        self._single_flight = SingleFlight() if coalesce else None
+        # changes of the index made by this object, see _invalidate_cache
+        self._generation = 0
+        self.hooks = list(hooks or [])
+        if wt not in FORMATS:
+            raise ValueError('Unknown response format: %s' % wt)
+        self.wt = wt
+        self.compress_updates = compress_updates
+        #: CommitScheduler of the commits requested by updates, or None.
+        self.commits = None
+        if commit_interval is not None:
+            self.commits = CommitScheduler(self, commit_interval,
+                                           soft_commit=soft_commits)
         if not version:
             self.version = self.get_version()
         assert(self.version in (1, 3, 4))
-
-    def search(self, resource='select', **kwargs):
+        if soft_commits and self.version < 4:
+            # fail before any update is sent, not at the first commit
+            raise ValueError('Soft commits require Solr 4 or later')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Makes the commit pending in the commit scheduler, if any, and
+        closes the connections of the default session. Sessions passed as
+        make_request are not closed."""
+        if self.commits is not None:
+            self.commits.close()
+        if self._own_session:
+            self.make_request.close()
+
+    def search(self, resource='select', stream=False, compact_facets=False,
+               records=False, **kwargs):
         """Queries Solr with the given kwargs and returns a SolrResponse
         object.
 
         :param resource: Request dispatcher. 'select' by default.
+        :param stream: If True, a StreamingSolrResponse is returned. Its
+                       documents are parsed one at a time while they are
+                       read from the connection.
+        :param compact_facets: If True, facet fields are parsed as
+                               FacetCounts objects, which keep terms and
+                               counts in parallel arrays, instead of
+                               OrderedDicts.
+        :param records: If True, documents are `mysolr.records.Record`
+                        tuples sharing the field names given in fl, which
+                        take much less memory than dicts.
         :param **kwargs: Dictionary containing any of the available Solr query
                          parameters described in
                          http://wiki.apache.org/solr/CommonQueryParameters.
-                         'q' is a mandatory parameter.
+                         'q' is a mandatory parameter. wt may be 'json' or
+                         'javabin' to override the format of this object.
 
         """
-        query = build_request(kwargs)
-        url = urljoin(self.base_url, resource)
-        if self.use_get:
-            http_response = self.make_request.get(url, params=query,
-                                                  timeout=self.timeout)
-        else:
-            http_response = self.make_request.post(url, data=query,
-                                                   timeout=self.timeout)
-
-        solr_response = SolrResponse(http_response)
+        query = build_request(kwargs, self.wt)
+        options = {'compact_facets': compact_facets,
+                   'records': _record_fields(query) if records else None}
+        if stream:
+            return _search(self.make_request, urljoin(self.base_url, resource),
+                           query, self.use_get, self.timeout, stream,
+                           self.hooks, resource, codec=self.codec, **options)
+
+        key = canonical_key(resource, query, compact_facets, bool(records))
+        generation = None
+        if self.cache is not None:
+            # read before the request, so a response sent while the index
+            # changes is not cached
+            generation = self.cache.generation
+            solr_response = self.cache.get(key)
+            if solr_response is not None:
+                return solr_response
+
+        if self._single_flight is not None:
+            # a search made after a change does not join a flight that
+            # started before it
+            flight = key + (self._generation, )
+            return self._single_flight.do(flight, self._search, key,
+                                          resource, query, options,
+                                          generation)
+        return self._search(key, resource, query, options, generation)
+
+    def _search(self, key, resource, query, options, generation=None):
+        """ Sends a search and caches its response if there is a cache and
+        it has not been cleared since `generation`. """
+        solr_response = _search(self.make_request,
+                                urljoin(self.base_url, resource), query,
+                                self.use_get, self.timeout, hooks=self.hooks,
+                                resource=resource, codec=self.codec,
+                                **options)
+        if self.cache is not None and solr_response.status == 200:
+            self.cache.set(key, solr_response, solr_response.content_length,
+                           generation)
         return solr_response
 
-    def search_cursor(self, resource='select', **kwargs):
-        """ """
-        query = build_request(kwargs)
+    def search_cursor(self, resource='select', unique_key=None, **kwargs):
+        """Returns a Cursor to iterate over all the results of a query.
+
+        :param resource: Request dispatcher. 'select' by default.
+        :param unique_key: uniqueKey field of the index. If given, the cursor
+                           pages using Solr cursorMark (Solr 4.7 or later)
+                           instead of start/rows offsets, so the cost of each
+                           page does not grow with the offset.
+        :param **kwargs: Dictionary containing any of the available Solr query
+                         parameters. 'q' is a mandatory parameter.
+        """
+        query = build_request(kwargs, self.wt)
         cursor = Cursor(urljoin(self.base_url, resource), query,
-                        self.make_request, self.use_get, timeout=self.timeout)
+                        self.make_request, self.use_get, timeout=self.timeout,
+                        unique_key=unique_key, codec=self.codec,
+                        hooks=self.hooks)
 
         return cursor
     
+    def export_parallel(self, q, field, partitions=4, method='hash',
+                        rows=1000, resource='select', unique_key=None,
+                        **kwargs):
+        """Exports all the documents matching a query splitting the result
+        set into disjoint slices that are fetched concurrently, one Cursor
+        per slice. Returns a generator of documents; documents of different
+        slices are interleaved so the sort order is not kept.
+
+        :param q: Query.
+        :param field: Single valued numeric field used to split the results.
+        :param partitions: Number of slices, and of concurrent cursors.
+        :param method: 'hash' puts each document in the slice given by
+                       the integer part of abs(mod(field, partitions)).
+                       'range' asks Solr for the minimum and maximum values
+                       of field and splits that interval into partitions
+                       ranges of equal width, plus a slice of the documents
+                       without a value if there are any.
+        :param rows: number of rows for each request.
+        :param resource: Request dispatcher. 'select' by default.
+        :param unique_key: uniqueKey of the index. If given, each slice is
+                           paged using cursorMark.
+        :param **kwargs: Any other Solr query parameters.
+        """
+        assert method in ['hash', 'range']
+        query = dict(kwargs, q=q)
+        if method == 'hash':
+            filters = _hash_partitions(field, partitions)
+        else:
+            stats_query = dict(query, rows=0, stats='true')
+            stats_query['stats.field'] = field
+            stats = self.search(resource, **stats_query).stats or {}
+            field_stats = stats.get(field) or {}
+            filters = _range_partitions(field, partitions,
+                                        field_stats.get('min'),
+                                        field_stats.get('max'),
+                                        field_stats.get('missing'))
+
+        fetches = []
+        for partition_filter in filters:
+            partition_query = dict(query)
+            partition_query['fq'] = as_list(query.get('fq')) + \
+                                    [partition_filter]
+            cursor = self.search_cursor(resource, unique_key=unique_key,
+                                        **partition_query)
+            fetches.append(cursor.fetch(rows))
+
+        return _iter_documents(threaded_iter(fetches, maxsize=partitions))
+
+    def export(self, q, fl, sort, resource='export', **kwargs):
+        """Exports all the documents matching a query with the Solr /export
+        handler, which streams the whole sorted result set in a single
+        request. Returns a generator of documents that are parsed one at a
+        time while they are read, so memory usage does not depend on the
+        number of results. Raises RuntimeError if Solr reports an error.
+
+        :param q: Query.
+        :param fl: Fields to export, as a list or a comma separated string.
+                   They must have docValues.
+        :param sort: Sort clause, as a list or a comma separated string,
+                     i.e. 'id asc'. Sort fields must have docValues.
+        :param resource: Request dispatcher. 'export' by default.
+        :param **kwargs: Any other Solr query parameters, i.e. fq.
+        """
+        query = dict(kwargs, q=q, fl=','.join(as_list(fl)),
+                     sort=','.join(as_list(sort)), wt='json')
+        query = build_request(query)
+        solr_response = _search(self.make_request,
+                                urljoin(self.base_url, resource), query,
+                                self.use_get, self.timeout, stream=True,
+                                hooks=self.hooks, resource=resource,
+                                codec=self.codec)
+        return _iter_export(solr_response)
+
     def async_search(self, queries, size=10, resource='select'):
         """ Asynchronous search using async module from requests. 
 
@@ -95,62 +309,169 @@ class Solr(object):
 
         url = urljoin(self.base_url, resource)
         queries = map(build_request, queries)
-        rs = (grequests.post(url, data=query) for query in queries)
+        rs = (grequests.post(url, data=query, timeout=self.timeout)
+              for query in queries)
         responses = grequests.map(rs, size=size)
-        return [SolrResponse(http_response) for http_response in responses]
+        return [SolrResponse(http_response, codec=self.codec)
+                for http_response in responses]
 
+    def multi_search(self, queries, resource='select', workers=4):
+        """ Sends many searches with as few requests as possible. Returns a
+        list with the SolrResponse of every query, in the same order.
 
-    def update(self, documents, input_type='json', commit=True):
+        Counting queries (rows=0) that only differ in their fq parameters
+        are merged into a single request that counts each one of them with
+        a facet.query. Their responses only have total_results. The rest of
+        the queries are sent concurrently.
+
+        :param queries: List of queries. Each query is a dictionary of Solr
+                        query parameters. 'q' is a mandatory parameter.
+        :param resource: Request dispatcher. 'select' by default.
+        :param workers: Maximum number of requests in flight.
+        """
+        queries = [build_request(dict(query), self.wt) for query in queries]
+        groups, singles = batch.plan(queries)
+        tasks = [(group, ) + batch.merge([queries[i] for i in group])
+                 for group in groups]
+        tasks.extend(([i], queries[i], None) for i in singles)
+
+        def run(tasks):
+            for indexes, query, keys in tasks:
+                solr_response = self.search(resource, **query)
+                if keys is None:
+                    yield indexes, [solr_response]
+                else:
+                    yield indexes, batch.split(solr_response, keys)
+
+        responses = [None] * len(queries)
+        workers = max(1, min(workers, len(tasks)))
+        answers = threaded_iter([run(tasks[i::workers])
+                                 for i in range(workers)])
+        for indexes, solr_responses in answers:
+            for i, solr_response in zip(indexes, solr_responses):
+                responses[i] = solr_response
+        return responses
+
+
+    def update(self, documents, input_type='json', commit=True,
+               commit_within=None):
         """Sends an update/add message to add the array of hashes(documents) to
         Solr.
 
         :param documents: A list of solr-compatible documents to index. You
                           should use unicode strings for text/string fields.
+                          With xml input_type any iterable of documents can
+                          be used; the message is encoded while it is sent,
+                          using chunked transfer encoding.
         :param input_type: The format which documents are sent. Remember that
                            json is not supported until version 3.
         :param commit: If True, sends a commit message after the operation is
-                       executed.
+                       executed. With a commit scheduler (see
+                       commit_interval), waits for the next coalesced commit
+                       instead.
+        :param commit_within: Milliseconds in which Solr commits the
+                              documents by itself (commitWithin). Use it with
+                              commit=False.
 
         """
         assert input_type in ['xml', 'json']
 
         if input_type == 'xml':
-            http_response = self._post_xml(_get_add_xml(documents))
+            solr_response = self._post_xml(_iter_add_xml(
+                documents, commit_within=commit_within))
         else:
-            http_response = self._post_json(json.dumps(documents))
+            params = None
+            if commit_within is not None:
+                params = {'commitWithin': commit_within}
+            solr_response = self._post_json(self.codec.dumps(documents),
+                                            params)
+        self._invalidate_cache()
         if commit:
-            self.commit()
+            self.request_commit().wait()
         
-        return SolrResponse(http_response)
+        return solr_response
 
-    def delete_by_key(self, identifier, commit=True):
+    def bulk_update(self, documents, batch_size=1000, max_bytes=None,
+                    workers=4, retries=2, commit=True, commit_within=None):
+        """Indexes any iterable of documents, i.e. a generator, in json
+        batches that are sent concurrently. Returns the list of SolrResponse
+        objects of the batches. Raises RuntimeError if a batch could not be
+        indexed after retrying. See `mysolr.BulkIndexer`.
+
+        :param documents: Iterable of solr-compatible documents.
+        :param batch_size: Maximum number of documents of a batch.
+        :param max_bytes: Maximum size in bytes of a batch.
+        :param workers: Number of batches in flight at the same time.
+        :param retries: Times a failed batch is sent again.
+        :param commit: If True, sends a commit message once every batch has
+                       been indexed.
+        :param commit_within: Milliseconds in which Solr commits the
+                              documents by itself (commitWithin).
+        """
+        indexer = BulkIndexer(self, batch_size=batch_size,
+                              max_bytes=max_bytes, workers=workers,
+                              retries=retries, commit_within=commit_within)
+        try:
+            indexer.update(documents)
+        except Exception:
+            # like BulkIndexer.__exit__, partial data is not committed
+            indexer.close(commit=False)
+            raise
+        indexer.close(commit=commit)
+        if indexer.failed:
+            raise RuntimeError('%d batches could not be indexed' %
+                               len(indexer.failed))
+        return indexer.responses
+
+    def delete_by_key(self, identifier, commit=True, commit_within=None):
         """Sends an ID delete message to Solr.
 
         :param commit: If True, sends a commit message after the operation is
-                       executed.
+                       executed. See `update`.
+        :param commit_within: Milliseconds in which Solr commits the delete
+                              by itself (commitWithin).
 
         """
-        xml = '<delete><id>%s</id></delete>' % (identifier)
-        http_response = self._post_xml(xml)
+        xml = '%s<id>%s</id></delete>' % (_get_delete_tag(commit_within),
+                                          identifier)
+        solr_response = self._post_xml(xml)
+        self._invalidate_cache()
         if commit:
-            self.commit()
-        return SolrResponse(http_response)
+            self.request_commit().wait()
+        return solr_response
 
-    def delete_by_query(self, query, commit=True):
+    def delete_by_query(self, query, commit=True, commit_within=None):
         """Sends a query delete message to Solr.
 
         :param commit: If True, sends a commit message after the operation is
-                       executed.
+                       executed. See `update`.
+        :param commit_within: Milliseconds in which Solr commits the delete
+                              by itself (commitWithin).
 
         """
-        xml = '<delete><query>%s</query></delete>' % (query)
-        http_response = self._post_xml(xml)
+        xml = '%s<query>%s</query></delete>' % (_get_delete_tag(commit_within),
+                                                query)
+        solr_response = self._post_xml(xml)
+        self._invalidate_cache()
         if commit:
-            self.commit()
-        return SolrResponse(http_response)
+            self.request_commit().wait()
+        return solr_response
+
+    def request_commit(self):
+        """Requests a commit of the changes sent so far and returns a
+        `mysolr.commits.Commit`; its wait method returns the SolrResponse of
+        the commit once the changes are visible. With a commit scheduler
+        (see commit_interval) the commit is shared with the other callers
+        and made in the background. Otherwise it is made right away.
+        """
+        if self.commits is not None:
+            return self.commits.request()
+        commit = Commit()
+        commit._finish(self.commit())
+        return commit
 
     def commit(self, wait_flush=True,
-               wait_searcher=True, expunge_deletes=False):
+               wait_searcher=True, expunge_deletes=False, soft_commit=False):
         """Sends a commit message to Solr.
 
         :param wait_flush: Block until index changes are flushed to disk
@@ -160,17 +481,15 @@ class Solr(object):
                               changes visible (default is True).
         :param expunge_deletes: Merge segments with deletes away (default is 
                                 False)
+        :param soft_commit: Make the changes visible without flushing them
+                            to disk (Solr 4 or later, default is False)
 
         """
-        xml = '<commit '
-        if self.version < 4:
-            xml += 'waitFlush="%s" ' % str(wait_flush).lower()
-        xml += 'waitSearcher="%s" ' % str(wait_searcher).lower()
-        xml += 'expungeDeletes="%s" ' % str(expunge_deletes).lower()
-        xml += '/>'
-
-        http_response = self._post_xml(xml)
-        return SolrResponse(http_response)
+        xml = _get_commit_xml(self.version, wait_flush, wait_searcher,
+                              expunge_deletes, soft_commit)
+        solr_response = self._post_xml(xml)
+        self._invalidate_cache()
+        return solr_response
 
     def optimize(self, wait_flush=True, wait_searcher=True, max_segments=1):
         """Sends an optimize message to Solr.
@@ -184,28 +503,20 @@ class Solr(object):
                              (default is 1)
 
         """
-        xml = '<optimize '
-        if self.version < 4:
-            xml += 'waitFlush="%s" ' % str(wait_flush).lower()
-        xml += 'waitSearcher="%s" ' % str(wait_searcher).lower()
-        xml += 'maxSegments="%s" ' % max_segments
-        xml += '/>'
-
-        http_response = self._post_xml(xml)
-        return SolrResponse(http_response)
+        xml = _get_optimize_xml(self.version, wait_flush, wait_searcher,
+                                max_segments)
+        return self._post_xml(xml)
 
     def rollback(self):
         """Sends a rollback message to Solr server."""
         xml = '<rollback />'
-        http_response = self._post_xml(xml)
-        return SolrResponse(http_response)
+        solr_response = self._post_xml(xml)
+        self._invalidate_cache()
+        return solr_response
 
     def ping(self):
         """ Ping call to solr server. """
-        url = urljoin(self.base_url, 'admin/ping')
-        http_response = self.make_request.get(url, params={'wt': 'json'},
-                                              timeout=self.timeout)
-        return SolrResponse(http_response)
+        return self._request('get', 'admin/ping', params={'wt': 'json'})
 
     def is_up(self):
         """Check if a Solr server is up using ping call"""
@@ -223,11 +534,7 @@ class Solr(object):
 
     def get_system_info(self):
         """ Gets solr system status. """
-        url = urljoin(self.base_url, 'admin/system')
-        params = {'wt': 'json'}
-        http_response = self.make_request.get(url, params=params,
-                                              timeout=self.timeout)
-        return SolrResponse(http_response)
+        return self._request('get', 'admin/system', params={'wt': 'json'})
 
     def get_version(self):
         system_info = self.get_system_info()
@@ -274,132 +581,434 @@ class Solr(object):
             #we dont call build_query because 'q' is NOT mandatory in this case
             kwargs['wt'] = 'json'
             headers = {'Content-type': 'text/json'}
-            url = urljoin(self.base_url, resource)
-            http_response = self.make_request.post(url, params=kwargs,
-                                                   data=text,
-                                                   headers=headers,
-                                                   timeout=self.timeout)
-            solr_response = SolrResponse(http_response)
-            return solr_response
+            return self._request('post', resource, params=kwargs, data=text,
+                                 headers=headers)
         else:
             return self.search(resource=resource, **kwargs)
 
+    def _request(self, method, resource, parse=None, **kwargs):
+        """ Makes an HTTP request to a resource of the index calling the
+        hooks, and returns a SolrResponse.
+
+        :param method: 'get' or 'post'.
+        :param parse: Function that builds the result from the HTTP response
+                      instead of a SolrResponse.
+        :param **kwargs: Arguments of the request.
+        """
+        if parse is None:
+            parse = self._parse
+        return instrumented_request(self.hooks, self.make_request, method,
+                                    urljoin(self.base_url, resource), parse,
+                                    resource, timeout=self.timeout, **kwargs)
+
+    def _parse(self, http_response):
+        return SolrResponse(http_response, codec=self.codec)
+
+    def _invalidate_cache(self):
+        """ Clears the query cache after a change of the index, and makes
+        later searches start new flights when they are coalesced. """
+        self._generation += 1
+        if self.cache is not None:
+            self.cache.clear()
+
     def _post_xml(self, xml):
-        """ Sends the xml to Solr server.
+        """ Sends the xml to Solr server and returns the SolrResponse.
 
-        :param xml: XML document to be posted.
+        :param xml: XML document to be posted. It can also be an iterable of
+                    utf-8 encoded chunks, which is sent using chunked
+                    transfer encoding.
         """
-        url = urljoin(self.base_url, 'update')
-        xml_data = xml.encode('utf-8')
-        headers = {
-            'Content-type': 'text/xml; charset=utf-8',
-            'Content-Length': "%s" % len(xml_data)
-        }
-        http_response = self.make_request.post(url, data=xml_data,
-                                               headers=headers,
-                                               timeout=self.timeout)
-        return http_response
+        headers = {'Content-type': 'text/xml; charset=utf-8'}
+        if isinstance(xml, get_basestring()):
+            xml_data = xml.encode('utf-8')
+        else:
+            xml_data = xml
+        return self._post_update('update', xml_data, headers)
 
-    def _post_json(self, json_doc):
-        """ Sends the json to Solr server.
+    def _post_json(self, json_doc, params=None):
+        """ Sends the json to Solr server and returns the SolrResponse.
 
-        :param json_doc: JSON document to be posted.
+        :param json_doc: JSON document to be posted, as bytes or unicode.
+        :param params: Optional query string parameters, i.e. commitWithin.
         """
-        url = urljoin(self.base_url, 'update/json')
-        json_data = json_doc.encode('utf-8')
-        headers = {
-            'Content-type': 'application/json; charset=utf-8',
-            'Content-Length': "%s" % len(json_data)
-        }
-        http_response = self.make_request.post(url, data=json_data,
-                                               headers=headers,
-                                               timeout=self.timeout)
-        return http_response
+        json_data = json_doc
+        if not isinstance(json_data, bytes):
+            json_data = json_doc.encode('utf-8')
+        headers = {'Content-type': 'application/json; charset=utf-8'}
+        return self._post_update('update/json', json_data, headers, params)
+
+    def _post_update(self, resource, data, headers, params=None):
+        """ Posts an update message, gzip compressed if it is at least
+        compress_updates bytes long.
+
+        :param data: Message as bytes or as an iterable of byte chunks, which
+                     is sent using chunked transfer encoding.
+        """
+        data, compressed = compress_body(data, self.compress_updates)
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+        if isinstance(data, bytes):
+            headers['Content-Length'] = "%s" % len(data)
+        kwargs = {'params': params} if params else {}
+        return self._request('post', resource, data=data, headers=headers,
+                             **kwargs)
 
     def _get_file(self, filename):
         """Retrieves config files of the current index."""
-        url = urljoin(self.base_url, 'admin/file')
         params = {
             'contentType': 'text/xml;charset=utf-8',
             'file' : filename
         }
-        http_response = self.make_request.get(url, params=params, timeout=self.timeout)
-        return http_response.content
+        return self._request('get', 'admin/file', params=params,
+                             parse=lambda http_response: http_response.content)
 
 
 class Cursor(object):
     """ Implements the concept of cursor in relational databases """
-    def __init__(self, url, query, make_request=requests, use_get=False, timeout=None):
-        """ Cursor initialization """
+    def __init__(self, url, query, make_request=requests, use_get=False,
+                 timeout=None, unique_key=None, codec=None, hooks=None):
+        """ Cursor initialization
+
+        :param unique_key: uniqueKey field of the index. When set, deep paging
+                           with cursorMark is used instead of start/rows.
+        :param codec: JSON codec used to parse the responses.
+        :param hooks: List of `mysolr.instrumentation.Hooks` called around
+                      every request.
+        """
         self.url = url
         self.query = query
         self.make_request = make_request
         self.use_get = use_get
         self.timeout = timeout
+        self.unique_key = unique_key
+        self.codec = get_codec(codec)
+        self.hooks = list(hooks or [])
+        self.stream = False
+        self.records = None
 
-    def fetch(self, rows=None):
+    def fetch(self, rows=None, prefetch=0, stream=False, records=False):
         """ Generator method that grabs all the documents in bulk sets of 
         'rows' documents
 
         :param rows: number of rows for each request
+        :param prefetch: number of pages to read ahead in a background thread
+                         while the current page is being processed. 0 (the
+                         default) fetches each page only when it is needed.
+        :param stream: If True, pages are StreamingSolrResponse objects. The
+                       documents of a page not read when the next page is
+                       requested are skipped. Cannot be used with prefetch.
+        :param records: If True, documents are `mysolr.records.Record`
+                        tuples. See `Solr.search`.
         """
+        if stream and prefetch:
+            raise ValueError('stream and prefetch cannot be used together')
+        self.stream = stream
+        self.records = _record_fields(self.query) if records else None
+
         if rows:
             self.query['rows'] = rows
 
         if 'rows' not in self.query:
             self.query['rows'] = 10
 
+        if self.unique_key:
+            pages = self._fetch_cursor_mark()
+        else:
+            pages = self._fetch_offset()
+
+        if prefetch:
+            return threaded_iter([pages], maxsize=prefetch)
+        return pages
+
+    def fetch_columns(self, rows=None, fields=None):
+        """ Reads every page and returns a `mysolr.columns.ColumnBuilder`
+        with a typed column per field. Pages are streamed and each document
+        is appended to the columns as soon as it is parsed, so no list of
+        documents is built. Call `to_arrays` on the result to get numpy
+        arrays.
+
+        :param rows: number of rows for each request
+        :param fields: Fields to keep. The fields in fl by default, or every
+                       field if fl is not given or has wildcards.
+        """
+        builder = ColumnBuilder(fields or fields_from_fl(self.query.get('fl')))
+        for page in self.fetch(rows, stream=True):
+            builder.extend(page.documents or [])
+        return builder
+
+    def _fetch_offset(self):
+        """ Pages through the results incrementing 'start' by 'rows'. """
         self.query['start'] = 0
 
         end = False
         docs_retrieved = 0
         while not end:
-            if self.use_get:
-                http_response = self.make_request.get(self.url,
-                                                      params=self.query,
-                                                      timeout=self.timeout)
-            else:
-                http_response = self.make_request.post(self.url,
-                                                       data=self.query,
-                                                       timeout=self.timeout)
-            solr_response = SolrResponse(http_response)
+            solr_response = self._request()
             yield solr_response
-            total_results = solr_response.total_results
-            docs_retrieved += len(solr_response.documents)
-            end = docs_retrieved == total_results
+            count = _document_count(solr_response)
+            docs_retrieved += count
+            total_results = getattr(solr_response, 'total_results', None)
+            # error pages have no documents and no total_results
+            end = not count or total_results is None or \
+                docs_retrieved >= total_results
             self.query['start'] += self.query['rows']
 
+    def _fetch_cursor_mark(self):
+        """ Pages through the results following Solr nextCursorMark. The
+        sort is completed with the uniqueKey as tie-break, as required by
+        Solr. Paging stops when the mark stops changing or a page comes back
+        with less than 'rows' documents.
+        """
+        _add_sort_tiebreak(self.query, self.unique_key)
+        self.query['start'] = 0
 
-def _get_add_xml(array_of_hash, overwrite=True):
+        cursor_mark = '*'
+        first = True
+        while True:
+            self.query['cursorMark'] = cursor_mark
+            solr_response = self._request()
+            if first or self.stream or solr_response.documents:
+                yield solr_response
+            first = False
+            documents = _document_count(solr_response)
+            next_cursor_mark = getattr(solr_response, 'next_cursor_mark', None)
+            if (next_cursor_mark is None or next_cursor_mark == cursor_mark
+                    or documents < int(self.query['rows'])):
+                break
+            cursor_mark = next_cursor_mark
+
+    def _request(self):
+        """ Requests the current page of the cursor. """
+        return _search(self.make_request, self.url, self.query, self.use_get,
+                       self.timeout, self.stream, self.hooks, codec=self.codec,
+                       records=self.records)
+
+
+def _get_add_xml(array_of_hash, overwrite=True, commit_within=None):
     """ Creates add XML message to send to Solr based on the array of hashes
     (documents) provided.
 
     :param overwrite: Newer documents will replace previously added documents
                       with the same uniqueKey (default is True)
+    :param commit_within: Milliseconds in which Solr commits the documents.
 
     """
-    xml = '<add overwrite="%s">' % ('true' if overwrite else 'false')
+    docs = ''.join(_get_doc_xml(doc_hash) for doc_hash in array_of_hash)
+    return '%s%s</add>' % (_get_add_tag(overwrite, commit_within), docs)
+
+
+def _iter_add_xml(array_of_hash, overwrite=True, chunk_size=XML_CHUNK_SIZE,
+                  commit_within=None):
+    """ Generator of the add XML message encoded as utf-8, in chunks of
+    about chunk_size bytes. Documents are encoded as they are consumed, so
+    memory usage does not depend on the number of documents.
+
+    :param overwrite: Newer documents will replace previously added documents
+                      with the same uniqueKey (default is True)
+    :param chunk_size: Approximate size of every chunk.
+    :param commit_within: Milliseconds in which Solr commits the documents.
+    """
+    chunk = [_get_add_tag(overwrite, commit_within).encode('utf-8')]
+    size = 0
     for doc_hash in array_of_hash:
-        doc = '<doc>'
-        for key, value in doc_hash.items():
-            if isinstance(value, list):
-                for v in value:
-                    if isinstance(v, get_basestring()):
-                        v = escape(v)
-                    doc += '<field name="%s">%s</field>' % (key, v)
-            else:
-                if isinstance(value, get_basestring()):
-                    value = escape(value)
-                doc += '<field name="%s">%s</field>' % (key, value)
-        doc += '</doc>'
-        xml += doc
-    xml += '</add>'
+        doc = _get_doc_xml(doc_hash).encode('utf-8')
+        chunk.append(doc)
+        size += len(doc)
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    chunk.append(b'</add>')
+    yield b''.join(chunk)
+
+
+def _get_add_tag(overwrite, commit_within=None):
+    tag = '<add overwrite="%s"' % ('true' if overwrite else 'false')
+    if commit_within is not None:
+        tag += ' commitWithin="%d"' % commit_within
+    return tag + '>'
+
+
+def _get_delete_tag(commit_within=None):
+    if commit_within is None:
+        return '<delete>'
+    return '<delete commitWithin="%d">' % commit_within
+
+
+def _get_doc_xml(doc_hash):
+    """ Creates the doc element of a document. """
+    fields = ['<doc>']
+    for key, value in doc_hash.items():
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            if isinstance(v, get_basestring()):
+                v = escape(v)
+            fields.append('<field name="%s">%s</field>' % (key, v))
+    fields.append('</doc>')
+    return ''.join(fields)
+
+
+def _search(make_request, url, query, use_get, timeout, stream=False,
+            hooks=(), resource=None, **response_options):
+    """ Sends a search request and wraps the HTTP response. Extra keyword
+    arguments are passed to the response class. javabin responses are
+    decoded at once, so stream is ignored for them.
+    """
+    if query.get('wt') == 'javabin':
+        stream = False
+        response_options['codec'] = javabin_codec
+    kwargs = {'timeout': timeout}
+    if stream:
+        kwargs['stream'] = True
+    if use_get:
+        kwargs['params'] = query
+    else:
+        kwargs['data'] = query
+    response_class = StreamingSolrResponse if stream else SolrResponse
+
+    def parse(http_response):
+        return response_class(http_response, **response_options)
+
+    return instrumented_request(hooks, make_request,
+                                'get' if use_get else 'post', url, parse,
+                                resource, **kwargs)
+
+
+def _record_fields(query):
+    """ Value of the records option of the responses of a query: the field
+    names in fl, or True when they cannot be known beforehand. """
+    return fields_from_fl(query.get('fl')) or True
+
+
+def _document_count(solr_response):
+    """ Number of documents of a page. Streaming pages are drained. """
+    if isinstance(solr_response, StreamingSolrResponse):
+        return solr_response.drain()
+    # HTML error pages have no documents attribute
+    return len(getattr(solr_response, 'documents', None) or [])
+
+
+def _hash_partitions(field, partitions):
+    """ Filter queries putting each document in one of the partitions
+    according to the value of a numeric field. Each filter takes a whole
+    unit of abs(mod(field, partitions)), so values with decimals are not
+    left out.
+    """
+    return ['{!frange l=%d u=%d incu=false}abs(mod(%s,%d))' %
+            (i, i + 1, field, partitions) for i in range(partitions)]
+
+
+def _range_partitions(field, partitions, minimum, maximum, missing=None):
+    """ Filter queries splitting [minimum, maximum] in partitions disjoint
+    ranges. Integer boundaries are used when both limits are integral, as
+    Solr reports stats of int fields as doubles. The first and last ranges
+    are open, so rounding of float boundaries does not leave the extremes
+    out, and one more filter matches the documents without a value unless
+    missing, their number, is 0.
+    """
+    if minimum is None or maximum is None:
+        return ['*:*']
+    if float(minimum).is_integer() and float(maximum).is_integer():
+        minimum, maximum = int(minimum), int(maximum)
+        bounds = [minimum + (maximum - minimum) * i // partitions
+                  for i in range(partitions + 1)]
+    else:
+        bounds = [minimum + (maximum - minimum) * float(i) / partitions
+                  for i in range(partitions + 1)]
+    bounds[0] = bounds[-1] = '*'
+    filters = []
+    for i in range(partitions):
+        closing = ']' if i == partitions - 1 else '}'
+        filters.append('%s:[%s TO %s%s' % (field, bounds[i], bounds[i + 1],
+                                           closing))
+    if missing != 0:
+        filters.append('-%s:[* TO *]' % field)
+    return filters
+
+
+def _iter_documents(pages):
+    """ Flattens a stream of SolrResponse into a stream of documents. """
+    try:
+        for page in pages:
+            for document in page.documents or []:
+                yield document
+    finally:
+        close = getattr(pages, 'close', None)
+        if close is not None:
+            close()
+
+
+def _iter_export(solr_response):
+    """ Yields the documents of a streaming /export response. Solr reports
+    errors found while streaming as a last {"EXCEPTION": message} tuple, and
+    streaming expressions end with an {"EOF": true} tuple.
+    """
+    try:
+        if solr_response.status != 200 or solr_response.documents is None:
+            message = solr_response.message
+            if not message and isinstance(solr_response.raw_content, dict):
+                message = (solr_response.raw_content.get('error') or
+                           {}).get('msg')
+            raise RuntimeError('Export failed with status %d: %s' %
+                               (solr_response.status, message))
+        for document in solr_response.documents:
+            if 'EXCEPTION' in document:
+                raise RuntimeError('Export failed: %s' %
+                                   document['EXCEPTION'])
+            if document.get('EOF') is True:
+                break
+            yield document
+    finally:
+        solr_response.close()
+
+
+def _get_commit_xml(version,wait_flush=True, wait_searcher=True,
+                    expunge_deletes=False, soft_commit=False):
+    """ Creates a commit XML message for the given Solr version. """
+    if soft_commit and version < 4:
+        raise ValueError('Soft commits require Solr 4 or later')
+    xml = '<commit '
+    if version < 4:
+        xml += 'waitFlush="%s" ' % str(wait_flush).lower()
+    xml += 'waitSearcher="%s" ' % str(wait_searcher).lower()
+    xml += 'expungeDeletes="%s" ' % str(expunge_deletes).lower()
+    if soft_commit:
+        xml += 'softCommit="true" '
+    xml += '/>'
     return xml
 
 
-def  build_request(query):
-    """ Check solr query and put convenient format """
+def _get_optimize_xml(version, wait_flush=True, wait_searcher=True,
+                      max_segments=1):
+    """ Creates an optimize XML message for the given Solr version. """
+    xml = '<optimize '
+    if version < 4:
+        xml += 'waitFlush="%s" ' % str(wait_flush).lower()
+    xml += 'waitSearcher="%s" ' % str(wait_searcher).lower()
+    xml += 'maxSegments="%s" ' % max_segments
+    xml += '/>'
+    return xml
+
+
+def _add_sort_tiebreak(query, unique_key):
+    """ Appends the uniqueKey to the sort clause of the query unless it is
+    already sorted by it. cursorMark requires a total ordering.
+    """
+    sort = query.get('sort') or ''
+    clauses = [clause.strip() for clause in sort.split(',') if clause.strip()]
+    if not any(clause.split()[0] == unique_key for clause in clauses):
+        clauses.append('%s asc' % unique_key)
+    query['sort'] = ','.join(clauses)
+
+
+def  build_request(query, wt='json'):
+    """ Check solr query and put convenient format
+
+    :param wt: Response format used unless the query asks for another one
+               that mysolr can parse ('json' or 'javabin').
+    """
     assert 'q' in query
     compat_args(query)
-    query['wt'] = 'json'
+    if query.get('wt') not in FORMATS:
+        query['wt'] = wt
     return query
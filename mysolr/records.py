@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.records
+~~~~~~~~~~~~~~
+
+Compact documents. A Record is a tuple with the values of the fields of a
+document; the field names live in its class, which is shared by every
+record with the same fields, so a page of records takes a fraction of the
+memory of a page of dicts.
+
+>>> response = solr.search(q='*:*', fl='id,name,price', rows=50000,
+...                        records=True)
+>>> record = response.documents[0]
+>>> record.name == record['name'] == record[1]
+True
+
+"""
+import threading
+
+from .compat import get_basestring
+
+_classes = {}
+_lock = threading.Lock()
+
+
+class Record(tuple):
+    """Read-only document stored as a tuple. Fields can be read as
+    attributes, by name as in a dict or by position as in a tuple. Iterating
+    a Record yields its values, like a named tuple. Fields named like a
+    method (count, index, get, keys...) can only be read by name."""
+    __slots__ = ()
+
+    #: Names of the fields, in the order of the values.
+    fields = ()
+    _positions = {}
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._positions[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, get_basestring()):
+            return tuple.__getitem__(self, self._positions[key])
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self):
+        return 'Record(%s)' % ', '.join('%s=%r' % item
+                                        for item in self.items())
+
+    def __reduce__(self):
+        return (_rebuild, (self.fields, tuple(self)))
+
+    def get(self, key, default=None):
+        """Value of a field or default if the record does not have it."""
+        position = self._positions.get(key)
+        if position is None:
+            return default
+        return tuple.__getitem__(self, position)
+
+    def keys(self):
+        return list(self.fields)
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return list(zip(self.fields, self))
+
+    def to_dict(self):
+        """Returns the record as a dict."""
+        return dict(zip(self.fields, self))
+
+
+def record_class(fields):
+    """Returns the Record subclass of the given field names. Classes are
+    created once and reused.
+
+    :param fields: Tuple of field names.
+    """
+    cls = _classes.get(fields)
+    if cls is None:
+        with _lock:
+            cls = _classes.get(fields)
+            if cls is None:
+                positions = dict((name, i) for i, name in enumerate(fields))
+                cls = type('Record', (Record, ),
+                           {'__slots__': (), 'fields': fields,
+                            '_positions': positions})
+                _classes[fields] = cls
+    return cls
+
+
+def _rebuild(fields, values):
+    return record_class(fields)(values)
+
+
+def to_record(document, fields=None):
+    """Converts a document dict into a Record.
+
+    :param document: Document dict.
+    :param fields: Tuple of field names of the record. Fields missing in the
+                   document are None. If None, the keys of the document are
+                   used.
+    """
+    if fields is None:
+        fields = tuple(document)
+        return record_class(fields)(document.values())
+    return record_class(fields)([document.get(name) for name in fields])
+
+
+def to_records(documents, fields=None):
+    """Converts a list of document dicts into Records in place, so each dict
+    can be freed as soon as it has been converted. Returns the list.
+
+    :param documents: List of document dicts.
+    :param fields: See `to_record`.
+    """
+    for i, document in enumerate(documents):
+        documents[i] = to_record(document, fields)
+    return documents
+
+
+def fields_from_fl(fl):
+    """Returns the tuple of field names requested by an fl parameter, or
+    None if it cannot be known beforehand (fl missing or with wildcards).
+    Aliases ('name:field') give their alias; functions and transformers
+    ('sum(a,b)', '[docid]') are named as written.
+
+    :param fl: fl parameter, as a string or a list of strings.
+    """
+    if fl is None:
+        return None
+    if not isinstance(fl, get_basestring()):
+        fl = ','.join(fl)
+    names = []
+    for item in _split_fl(fl):
+        if '*' in item or '?' in item:
+            return None
+        name = item
+        alias, separator, rest = item.partition(':')
+        if separator and alias and '(' not in alias and '[' not in alias:
+            name = alias
+        if name not in names:
+            names.append(name)
+    return tuple(names) or None
+
+
+def _split_fl(fl):
+    """ Splits fl by commas and spaces outside parentheses and brackets. """
+    items = []
+    depth = 0
+    current = []
+    for character in fl:
+        if character in '([':
+            depth += 1
+        elif character in ')]':
+            depth -= 1
+        if character in ', ' and depth == 0:
+            if current:
+                items.append(''.join(current))
+            current = []
+        else:
+            current.append(character)
+    if current:
+        items.append(''.join(current))
+    return items
@@ -16,6 +16,10 @@ can be created from a more generic requests.Response.
 """
 
 from .compat import parse_response
+from .facets import FacetCounts
+from .stream import iter_solr_json, CHUNK_SIZE, DOCS_START
+from .records import to_record, to_records
+from .columns import ColumnBuilder
 import requests
 import json
 import re
@@ -24,9 +28,30 @@ try:
 except ImportError:
     from ordereddict import OrderedDict
 
+#: Attributes of SolrResponse computed on first access.
+_COMPONENTS = ('facets', 'stats', 'spellcheck', 'highlighting', 'mlt')
+
+
+class _lazy(object):
+    """Non data descriptor that computes an attribute the first time it is
+    accessed and caches the result in the instance."""
+    def __init__(self, function):
+        self.function = function
+        self.__name__ = function.__name__
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.function(instance)
+        instance.__dict__[self.__name__] = value
+        return value
+
+
 class SolrResponse(object):
     """Parse solr response and make it accesible."""
-    def __init__(self, http_response=None):
+    def __init__(self, http_response=None, compact_facets=False, codec=None,
+                 records=None):
         """ Initializes a SolrResponse object.
 
         If a requests.Response is provided as an argument, some  of its attributes
@@ -34,17 +59,31 @@ class SolrResponse(object):
         SolrResponse object.
 
         :param http_response: `requests.Response` object
+        :param compact_facets: If True, facet fields are parsed as
+                               FacetCounts objects instead of OrderedDicts.
+        :param codec: JSON codec used to parse the content. See
+                      `mysolr.codec.get_codec`.
+        :param records: If given, documents are `mysolr.records.Record`
+                        objects instead of dicts: a tuple of field names
+                        gives the fields of every record, True uses the keys
+                        of each document.
 
         """
+        self.compact_facets = compact_facets
+        self.codec = codec
+        self.records = records
         self.headers = None
         self.url = None
         self.status = 0
         self.raw_content = None
+        #: Size in bytes of the HTTP body.
+        self.content_length = 0
         if http_response is not None:
             self.headers = http_response.headers
             self.raw_content = http_response.content
             self.url = http_response.url
             self.status = http_response.status_code
+            self.content_length = len(self.raw_content or b'')
 
         self.parse_content()
 
@@ -55,62 +94,150 @@ class SolrResponse(object):
         """
         if self.raw_content:
             try:
-                self.raw_content = parse_response(self.raw_content)
+                self.raw_content = parse_response(self.raw_content,
+                                                  self.codec)
             except:
                 self.raw_content = None
 
             #Solr responded with a Structured Results Response
             if self.raw_content is not None:
-                #: Response status from solr responseHeader.
-                self.solr_status = self.raw_content['responseHeader']['status']
-                #: Query time.
-                self.qtime = self.raw_content['responseHeader']['QTime']
-                self.total_results = None
-                self.start = None
-                self.documents = None
+                self.parse_header()
                 if 'response' in self.raw_content:
-                    #: Number of results.
-                    self.total_results = self.raw_content['response']['numFound']
-                    #: Offset.
-                    self.start = self.raw_content['response']['start']
                     #: Documents list.
                     self.documents = self.raw_content['response']['docs']
-                #: Facets parsed as a OrderedDict (Order matters).
-                self.facets = None
-                if 'facet_counts' in self.raw_content:
-                    self.facets = self.parse_facets(self.raw_content['facet_counts'])
-                #: Shorcut to stats resuts
-                self.stats = None
-                if 'stats' in self.raw_content:
-                    self.stats = self.raw_content['stats']['stats_fields']
-                #: Spellcheck result parsed into a more readable object.
-                self.spellcheck = None
-                if 'spellcheck' in self.raw_content:
-                    suggestions = self.raw_content['spellcheck']['suggestions']
-                    self.spellcheck = self.parse_spellcheck(suggestions)
-                #: Shorcut to highlighting result
-                self.highlighting = None
-                if 'highlighting' in self.raw_content:
-                    self.highlighting = self.raw_content['highlighting']
-                self.mlt = None
-                if 'moreLikeThis' in self.raw_content:
-                    self.mlt = self.raw_content['moreLikeThis']
-                self.message = None
+                    if self.records:
+                        to_records(self.documents, self._record_fields())
+                self.parse_components()
             #Solr responded with a unstructured HTML Body Response
             else:
                 #try to extract error message from html body if any:
                 self.message = self.extract_errmessage()
 
+    def parse_header(self):
+        """Sets the attributes known before the documents are read."""
+        # /export and streaming expressions responses may lack QTime, start
+        # or the whole responseHeader
+        header = self.raw_content.get('responseHeader') or {}
+        #: Response status from solr responseHeader.
+        self.solr_status = header.get('status')
+        #: Query time.
+        self.qtime = header.get('QTime')
+        self.total_results = None
+        self.start = None
+        self.documents = None
+        if 'response' in self.raw_content:
+            #: Number of results.
+            self.total_results = self.raw_content['response']['numFound']
+            #: Offset.
+            self.start = self.raw_content['response'].get('start')
+
+    def parse_components(self):
+        """Resets the attributes of the search components (facets, stats,
+        spellcheck, highlighting and more like this). They are parsed the
+        first time they are accessed."""
+        for name in _COMPONENTS:
+            self.__dict__.pop(name, None)
+        #: Cursor mark of the next page when using deep paging.
+        self.next_cursor_mark = self.raw_content.get('nextCursorMark')
+        self.message = None
+
+    def _record_fields(self):
+        return None if self.records is True else self.records
+
+    def _section(self, key):
+        """Returns a section of the parsed content or None."""
+        if isinstance(self.raw_content, dict):
+            return self.raw_content.get(key)
+        return None
+
+    @_lazy
+    def facets(self):
+        """Facets parsed as a OrderedDict (Order matters)."""
+        facet_counts = self._section('facet_counts')
+        if facet_counts is None:
+            return None
+        return self.parse_facets(facet_counts)
+
+    @_lazy
+    def stats(self):
+        """Shorcut to stats resuts"""
+        stats = self._section('stats')
+        if stats is None:
+            return None
+        return stats['stats_fields']
+
+    @_lazy
+    def spellcheck(self):
+        """Spellcheck result parsed into a more readable object."""
+        spellcheck = self._section('spellcheck')
+        if spellcheck is None:
+            return None
+        return self.parse_spellcheck(spellcheck['suggestions'])
+
+    @_lazy
+    def highlighting(self):
+        """Shorcut to highlighting result"""
+        return self._section('highlighting')
+
+    @_lazy
+    def mlt(self):
+        """Shorcut to more like this result"""
+        return self._section('moreLikeThis')
+
     def __repr__(self):
         return '<SolrResponse status=%d>' % self.status 
 
+    def to_columns(self, fields=None):
+        """Returns the documents as an OrderedDict of
+        `mysolr.columns.Column` objects by field name.
+
+        :param fields: Fields to keep. All of them by default.
+        """
+        return ColumnBuilder(fields).extend(self.documents or []).columns
+
+    def to_arrays(self, fields=None):
+        """Returns the documents as an OrderedDict of numpy arrays by field
+        name. See `mysolr.columns.Column.to_numpy`. Raises RuntimeError if
+        numpy is not installed.
+
+        :param fields: Fields to keep. All of them by default.
+        """
+        return ColumnBuilder(fields).extend(self.documents or []).to_arrays()
+
+    def stats_columns(self):
+        """Returns the stats of every field as columns, one row per field:
+        'field', 'min', 'max', 'count', 'missing', 'sum', 'mean'... Stats
+        facets are left out."""
+        builder = ColumnBuilder()
+        for name, stats in (self.stats or {}).items():
+            row = OrderedDict([('field', name)])
+            for key, value in (stats or {}).items():
+                if key != 'facets':
+                    row[key] = value
+            builder.append(row)
+        return builder.columns
+
+    def facet_arrays(self, field, facet_type='facet_fields'):
+        """Returns the terms and counts of a facet as a pair of numpy
+        arrays. Raises RuntimeError if numpy is not installed.
+
+        :param field: Name of the facet.
+        :param facet_type: 'facet_fields', 'facet_queries', 'facet_ranges'...
+        """
+        facet = self.facets[facet_type][field]
+        if not isinstance(facet, FacetCounts):
+            facet = FacetCounts.from_solr(facet)
+        return facet.to_numpy()
+
     def parse_facets(self, solr_facets):
         """ Parse facets."""
         result = {}
         for facet_type, facets in solr_facets.items():
             facet_type_dict = {}
             for name, facet in facets.items():
-                if isinstance(facet, list):
+                if isinstance(facet, list) and self.compact_facets:
+                    facet_type_dict[name] = FacetCounts.from_solr(facet)
+                elif isinstance(facet, list):
                     parsed = [tuple(facet[i:i+2]) for i in range(0, len(facet), 2)]
                     facet_type_dict[name] = OrderedDict(parsed)
                 elif isinstance(facet, dict):
@@ -151,3 +278,94 @@ class SolrResponse(object):
             pass
         return message
 
+
+class StreamingSolrResponse(SolrResponse):
+    """SolrResponse whose documents are decoded one at a time while they are
+    read from the HTTP connection, so memory usage does not depend on the
+    number of rows.
+
+    Header attributes (solr_status, qtime, total_results and start) are
+    available right away. `documents` is an iterator that can be consumed
+    only once. Facets and the rest of the components come after the
+    documents in the response body, so they are set once every document has
+    been read.
+    """
+    def __init__(self, http_response, compact_facets=False, codec=None,
+                 chunk_size=CHUNK_SIZE, records=None):
+        """ Initializes a StreamingSolrResponse object.
+
+        :param http_response: `requests.Response` object requested with
+                              stream=True.
+        :param compact_facets: If True, facet fields are parsed as
+                               FacetCounts objects instead of OrderedDicts.
+        :param codec: JSON codec used to parse error responses. Documents
+                      are always parsed by the incremental parser.
+        :param chunk_size: Size of the reads from the HTTP connection.
+        :param records: See `SolrResponse`.
+        """
+        self.compact_facets = compact_facets
+        self.codec = codec
+        self.records = records
+        self.http_response = http_response
+        self.headers = http_response.headers
+        self.url = http_response.url
+        self.status = http_response.status_code
+        self.raw_content = None
+        self.content_length = None
+        self.documents = None
+        #: Number of documents read so far.
+        self.documents_read = 0
+        self._finished = False
+
+        if self.status >= 400:
+            # Errors are small and may not be JSON, parse them as usual
+            self.raw_content = http_response.content
+            self.parse_content()
+            self._close()
+            return
+
+        self.raw_content = {}
+        self._parser = iter_solr_json(http_response.iter_content(chunk_size),
+                                      self.raw_content)
+        reached_documents = False
+        for item in self._parser:
+            if item is DOCS_START:
+                reached_documents = True
+                break
+        self.parse_header()
+        if reached_documents:
+            self.documents = self._iter_documents()
+        else:
+            self._finish()
+
+    def _iter_documents(self):
+        fields = self._record_fields()
+        for document in self._parser:
+            self.documents_read += 1
+            if self.records:
+                document = to_record(document, fields)
+            yield document
+        self._finish()
+
+    def _finish(self):
+        self.parse_components()
+        self._close()
+
+    def _close(self):
+        self._finished = True
+        self.http_response.close()
+
+    def drain(self):
+        """Reads and discards the documents that have not been read yet, so
+        the components that come after them are parsed. Returns the total
+        number of documents of the response."""
+        if not self._finished:
+            for document in self.documents:
+                pass
+        return self.documents_read
+
+    def close(self):
+        """Releases the HTTP connection without reading the rest of the
+        response."""
+        if not self._finished:
+            self._close()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.stream
+~~~~~~~~~~~~~
+
+Incremental parsing of Solr JSON responses. Documents are decoded one at a
+time from the HTTP body as it arrives, so memory usage is bounded by the size
+of a document instead of the size of the whole response.
+
+"""
+import codecs
+import json
+
+#: Bytes requested to the HTTP response in each read.
+CHUNK_SIZE = 64 * 1024
+
+#: Sentinel yielded by iter_solr_json when the documents list starts.
+DOCS_START = object()
+
+_WHITESPACE = ' \t\n\r'
+
+#: Characters that can follow a complete value.
+_DELIMITERS = ',:}]' + _WHITESPACE
+
+
+class JSONStreamReader(object):
+    """ Reads JSON values from an iterable of byte chunks. """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read(self, size):
+        """ Appends at least size characters to the buffer unless the stream
+        ends before. Consumed characters are discarded.
+        """
+        pieces = [self.buffer[self.pos:]]
+        read = 0
+        while read < size and not self.eof:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                pieces.append(self.decoder.decode(b'', True))
+                break
+            text = self.decoder.decode(chunk)
+            pieces.append(text)
+            read += len(text)
+        self.buffer = ''.join(pieces)
+        self.pos = 0
+
+    def peek(self):
+        """ Returns the next non blank character without consuming it. """
+        while True:
+            while self.pos < len(self.buffer) and \
+                    self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError('Unexpected end of JSON stream')
+            self._read(1)
+
+    def expect(self, characters):
+        """ Consumes the next non blank character, which must be one of the
+        given characters, and returns it.
+        """
+        character = self.peek()
+        if character not in characters:
+            raise ValueError('Expected one of %r at position %d, got %r' %
+                             (characters, self.pos, character))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """ Decodes the next JSON value. The buffer grows geometrically while
+        the value is incomplete so big values are not decoded again and again.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer,
+                                                          self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._read(max(len(self.buffer) - self.pos, 1))
+                continue
+            # A number not followed by a delimiter may still be incomplete,
+            # i.e. 1 read out of 1.0E-4 split after '1'
+            if not self.eof and (end == len(self.buffer) or
+                                 self.buffer[end] not in _DELIMITERS):
+                self._read(1)
+                continue
+            self.pos = end
+            return value
+
+
+def iter_solr_json(chunks, content):
+    """ Generator that parses a Solr JSON response from an iterable of byte
+    chunks. Everything but the documents is stored in the content dict as it
+    is read. DOCS_START is yielded when the documents list is reached, and
+    then every document. The tuples of streaming expressions responses
+    ('result-set') are yielded as documents too.
+
+    :param chunks: iterable of bytes.
+    :param content: dict filled with the rest of the response.
+    """
+    reader = JSONStreamReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key in ('response', 'result-set') and reader.peek() == '{':
+            response = content[key] = {}
+            for document in _iter_response(reader, response):
+                yield document
+        else:
+            content[key] = reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def _iter_response(reader, response):
+    """ Parses the 'response' section yielding DOCS_START and documents. """
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'docs' and reader.peek() == '[':
+            reader.expect('[')
+            yield DOCS_START
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            response[key] = reader.value()
+        if reader.expect(',}') == '}':
+            return
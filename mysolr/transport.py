@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+mysolr.transport
+~~~~~~~~~~~~~~~~
+
+HTTP transport used by default by Solr objects: a requests.Session with a
+pool of keep-alive connections per host, a retry policy for connection
+errors and 503 responses and compressed responses. Update messages can be
+gzip compressed too (see `compress_body`).
+
+"""
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3.util.retry import Retry
+    from urllib3.util.request import ACCEPT_ENCODING
+except ImportError:
+    from requests.packages.urllib3.util.retry import Retry
+    from requests.packages.urllib3.util.request import ACCEPT_ENCODING
+
+#: zlib compression level of update messages: fast, and most of the gain.
+COMPRESS_LEVEL = 6
+
+
+#: Accept-Encoding header listing every content encoding urllib3 can decode
+#: here: gzip and deflate, plus br and zstd when the brotli and zstandard
+#: packages are installed.
+DEFAULT_ACCEPT_ENCODING = ', '.join(encoding.strip()
+                                    for encoding in ACCEPT_ENCODING.split(','))
+
+
+class RetryAdapter(HTTPAdapter):
+    """HTTPAdapter that only retries requests whose body is an iterable
+    after connection errors, which happen before the body is read. A retry
+    on status would send the rest of an iterable already consumed, that is
+    an empty body."""
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=0):
+        HTTPAdapter.__init__(self, pool_connections=pool_connections,
+                             pool_maxsize=pool_maxsize,
+                             max_retries=max_retries)
+        no_status = self.max_retries.new(status=0, status_forcelist=())
+        self.streaming = HTTPAdapter(pool_connections=pool_connections,
+                                     pool_maxsize=pool_maxsize,
+                                     max_retries=no_status)
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if body is None or isinstance(body, (bytes, bytearray, type(u''))):
+            return HTTPAdapter.send(self, request, **kwargs)
+        return self.streaming.send(request, **kwargs)
+
+    def close(self):
+        HTTPAdapter.close(self)
+        self.streaming.close()
+
+
+def make_session(pool_connections=10, pool_maxsize=10, retries=3,
+                 backoff_factor=0.3, status_forcelist=(503, ),
+                 accept_encoding=DEFAULT_ACCEPT_ENCODING):
+    """Returns a requests.Session configured for Solr.
+
+    :param pool_connections: Number of hosts whose connection pools are kept.
+    :param pool_maxsize: Maximum number of connections kept per host. Use
+                         at least the number of threads sharing the session.
+    :param retries: Times a request is retried after a connection error or
+                    one of the statuses of status_forcelist. Requests are not
+                    retried after the server has started to answer.
+    :param backoff_factor: Retries wait backoff_factor * 2 ^ (retry - 1)
+                           seconds.
+    :param status_forcelist: Response statuses that are retried. Requests
+                             whose body is an iterable, as streamed update
+                             messages, are not retried on status: their
+                             body is consumed by the first attempt.
+    :param accept_encoding: Accept-Encoding header of the requests. Solr
+                            only compresses responses if its servlet
+                            container is configured to (i.e. a Jetty
+                            GzipHandler). Compressed responses are decoded
+                            while they are read, also when they are
+                            streamed. Use 'identity' to ask for uncompressed
+                            responses.
+    """
+    retry_options = dict(total=retries, connect=retries, read=0,
+                         status=retries, status_forcelist=status_forcelist,
+                         backoff_factor=backoff_factor,
+                         raise_on_status=False)
+    try:
+        # Solr searches are POST requests, so retry every method
+        retry = Retry(allowed_methods=None, **retry_options)
+    except TypeError:
+        # urllib3 < 1.26
+        retry = Retry(method_whitelist=False, **retry_options)
+
+    adapter = RetryAdapter(pool_connections=pool_connections,
+                           pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = accept_encoding
+    return session
+
+
+def gzip_bytes(data, level=COMPRESS_LEVEL):
+    """ Compresses bytes in the gzip format. """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _iter_gzip(chunks, level=COMPRESS_LEVEL):
+    """ Compresses an iterable of byte chunks in the gzip format. """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def compress_body(data, threshold):
+    """Gzip compresses a request body of at least threshold bytes. Returns
+    the body to send and whether it was compressed.
+
+    :param data: Body as bytes or as an iterable of byte chunks. Chunks are
+                 compressed while they are sent; only the first threshold
+                 bytes are read beforehand, to know if the body is big
+                 enough. Bodies of chunks smaller than threshold are joined
+                 and sent as bytes.
+    :param threshold: Minimum size in bytes of the compressed bodies, or
+                      None to never compress.
+    """
+    if threshold is None:
+        return data, False
+    if isinstance(data, bytes):
+        if len(data) < threshold:
+            return data, False
+        return gzip_bytes(data), True
+
+    chunks = iter(data)
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            break
+    else:
+        return b''.join(head), False
+
+    def iter_body():
+        for chunk in head:
+            yield chunk
+        for chunk in chunks:
+            yield chunk
+    return _iter_gzip(iter_body()), True
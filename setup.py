@@ -7,7 +7,7 @@ except ImportError:
     from distutils.core import setup
 
 
-REQUIRED = ['anyjson', 'coveralls', 'requests>=2.2.1']
+REQUIRED = ['coveralls', 'requests>=2.2.1']
 
 if sys.version_info < (2, 7, ):
     REQUIRED.append('ordereddict')
@@ -38,7 +38,9 @@ setup(name='mysolr',
       packages=['mysolr'],
       install_requires=REQUIRED,
       extras_require={
-          'async': ['Gevent', 'grequests']
+          'async': ['Gevent', 'grequests'],
+          'asyncio': ['aiohttp'],
+          'fast': ['orjson']
       },
       test_suite='tests',
       classifiers=CLASSIFIERS)
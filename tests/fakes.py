@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Fake HTTP layer used to test mysolr without a running Solr server. A
+FakeRequests instance can be passed as `make_request` to Solr and Cursor.
+"""
+import json
+
+
+class FakeResponse(object):
+    """ Mimics the attributes of requests.Response used by mysolr. """
+
+    def __init__(self, body, status_code=200, url='', headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.content = body
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers or {'Content-Type': 'application/json'}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeRequests(object):
+    """ Records requests and answers them calling `handler(method, url,
+    params)`, which must return a json-serializable body, bytes or a
+    FakeResponse.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def _respond(self, method, url, params, **kwargs):
+        self.calls.append((method, url, dict(params or {}), kwargs))
+        body = self.handler(method, url, params or {})
+        if isinstance(body, FakeResponse):
+            return body
+        return FakeResponse(body, url=url)
+
+    def get(self, url, params=None, **kwargs):
+        return self._respond('GET', url, params, **kwargs)
+
+    def post(self, url, data=None, params=None, **kwargs):
+        if isinstance(data, dict):
+            params = data
+            data = None
+        return self._respond('POST', url, params, data=data, **kwargs)
+
+
+def select_response(docs, num_found=None, start=0, **extra):
+    """ Builds a select response body. """
+    body = {
+        'responseHeader': {'status': 0, 'QTime': 1},
+        'response': {
+            'numFound': len(docs) if num_found is None else num_found,
+            'start': start,
+            'docs': docs
+        }
+    }
+    body.update(extra)
+    return body
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of mysolr.aio, imported by tests/test_aio.py on Python 3.7 or later.
+This directory has no __init__.py, so test loaders of older versions do not
+import it.
+"""
+import asyncio
+import json
+import unittest
+
+from mysolr.aio import AsyncSolr
+from tests.fakes import select_response
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+DOCS = [{'id': str(i)} for i in range(5)]
+
+
+class FakeClientResponse(object):
+
+    def __init__(self, body, url, status=200):
+        self.status = status
+        self.headers = {'Content-Type': 'application/json'}
+        self.url = url
+        self.body = json.dumps(body).encode('utf-8')
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession(object):
+    """ Answers like a Solr server with DOCS indexed. """
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.error = False
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                **kwargs):
+        self.calls.append((method, url, params, data))
+        if not params and isinstance(data, list):
+            params = data
+        return self._respond(url, dict(params or []))
+
+    def _respond(self, url, params):
+        session = self
+
+        class Context(object):
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight,
+                                            session.in_flight)
+                await asyncio.sleep(0.01)
+                session.in_flight -= 1
+                if session.error:
+                    return FakeClientResponse(
+                        {'error': {'msg': 'boom', 'code': 500}}, url, 500)
+                if url.endswith('update') or url.endswith('update/json'):
+                    body = {'responseHeader': {'status': 0, 'QTime': 1}}
+                else:
+                    start = int(params.get('start', 0))
+                    rows = int(params.get('rows', 10))
+                    body = select_response(DOCS[start:start + rows],
+                                           len(DOCS), start)
+                return FakeClientResponse(body, url)
+
+            async def __aexit__(self, *args):
+                pass
+
+        return Context()
+
+
+class AsyncSolrTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = FakeSession()
+        self.solr = AsyncSolr('http://localhost:8983/solr', version=4,
+                              session=self.session, max_concurrency=3)
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_search(self):
+        response = self.run_async(self.solr.search(q='*:*', fq=['a', 'b']))
+        self.assertEqual(response.total_results, 5)
+        method, url, params, data = self.session.calls[0]
+        self.assertEqual(url, 'http://localhost:8983/solr/select')
+        self.assertEqual([v for k, v in data if k == 'fq'], ['a', 'b'])
+
+    def test_concurrency_limit(self):
+        async def fan_out():
+            return await asyncio.gather(*[self.solr.search(q='q%d' % i)
+                                          for i in range(10)])
+        responses = self.run_async(fan_out())
+        self.assertEqual(len(responses), 10)
+        self.assertEqual(self.session.max_in_flight, 3)
+
+    def test_cursor(self):
+        async def fetch_all():
+            cursor = self.solr.search_cursor(q='*:*')
+            return [d async for r in cursor.fetch(2) for d in r.documents]
+        self.assertEqual(self.run_async(fetch_all()), DOCS)
+
+    def test_cursor_error_page(self):
+        self.session.error = True
+
+        async def fetch_all():
+            cursor = self.solr.search_cursor(q='*:*')
+            return [r async for r in cursor.fetch(2)]
+        responses = self.run_async(fetch_all())
+        self.assertEqual([r.status for r in responses], [500])
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_timeouts(self):
+        self.solr.timeout = 5
+        self.assertEqual(self.solr._get_timeout().total, 5)
+        self.solr.timeout = (3.05, 30)
+        timeout = self.solr._get_timeout()
+        self.assertEqual((timeout.total, timeout.sock_connect,
+                          timeout.sock_read), (None, 3.05, 30))
+
+    def test_update_and_commit(self):
+        response = self.run_async(self.solr.update([{'id': '9'}]))
+        self.assertEqual(response.solr_status, 0)
+        urls = [url for _, url, _, _ in self.session.calls]
+        self.assertEqual(urls, ['http://localhost:8983/solr/update/json',
+                                'http://localhost:8983/solr/update'])
+
+    def test_coalesce(self):
+        solr = AsyncSolr('http://localhost:8983/solr', version=4,
+                         session=self.session, coalesce=True)
+
+        async def fan_out():
+            return await asyncio.gather(solr.search(q='*:*', rows=2),
+                                        solr.search(rows='2', q='*:*'),
+                                        solr.search(q='other'))
+        first, second, other = self.run_async(fan_out())
+        self.assertTrue(first is second)
+        self.assertFalse(first is other)
+        self.assertEqual(len(self.session.calls), 2)
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import sys
+import unittest
+
+if sys.version_info >= (3, 7):
+    # async syntax is a SyntaxError before, see tests/py3
+    from tests.py3.aio_cases import AsyncSolrTestCase
+
+
+if __name__ == '__main__':
+    unittest.main()
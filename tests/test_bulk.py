@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import unittest
+
+from mysolr import Solr, BulkIndexer
+from tests.fakes import FakeRequests, FakeResponse
+
+
+OK = {'responseHeader': {'status': 0, 'QTime': 1}}
+
+
+class FakeSolrServer(object):
+    """ Records the documents posted to update/json. The first `failures`
+    update requests are answered with a 503.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.sizes = []
+        self.commits = 0
+        self.lock = threading.Lock()
+        self.fake = FakeRequests(self.handler)
+
+    def handler(self, method, url, params):
+        return OK
+
+    def post(self, url, data=None, params=None, **kwargs):
+        self.fake.calls.append(('POST', url, params, kwargs))
+        if url.endswith('update'):
+            self.commits += 1
+            return FakeResponse(OK, url=url)
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                return FakeResponse(b'<html>busy</html>', 503, url=url)
+            self.batches.append(json.loads(data.decode('utf-8')))
+            self.sizes.append(len(data))
+        return FakeResponse(OK, url=url)
+
+
+class BulkIndexerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeSolrServer()
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=self.server, version=4)
+
+    def documents(self, n):
+        return ({'id': str(i), 'text': 'x' * 10} for i in range(n))
+
+    def test_batches_by_size(self):
+        responses = self.solr.bulk_update(self.documents(25), batch_size=10,
+                                          workers=2)
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(sorted(len(b) for b in self.server.batches),
+                         [5, 10, 10])
+        self.assertEqual(self.server.commits, 1)
+
+    def test_batches_by_bytes(self):
+        self.solr.bulk_update(self.documents(10), max_bytes=100,
+                              commit=False)
+        for size in self.server.sizes:
+            self.assertTrue(size <= 100)
+        self.assertEqual(sum(len(b) for b in self.server.batches), 10)
+        self.assertEqual(self.server.commits, 0)
+
+    def test_retry(self):
+        self.server.failures = 2
+        indexer = BulkIndexer(self.solr, batch_size=5, workers=1,
+                              backoff=0)
+        indexer.update(self.documents(5))
+        indexer.close()
+        self.assertEqual(indexer.failed, [])
+        self.assertEqual(len(self.server.batches), 1)
+
+    def test_failure(self):
+        self.server.failures = 10
+        self.assertRaises(RuntimeError, self.solr.bulk_update,
+                          self.documents(5), retries=1, workers=1)
+        self.assertEqual(self.server.commits, 0)
+
+    def test_failing_iterable(self):
+        def documents():
+            for document in self.documents(15):
+                yield document
+            raise ValueError('broken source')
+
+        self.assertRaises(ValueError, self.solr.bulk_update, documents(),
+                          batch_size=10, workers=1)
+        self.assertEqual(sum(len(b) for b in self.server.batches), 15)
+        self.assertEqual(self.server.commits, 0)
+
+    def test_commit_scheduler(self):
+        solr = Solr('http://localhost:8983/solr/', make_request=self.server,
+                    version=4, commit_interval=10)
+        solr.bulk_update(self.documents(5))
+        self.assertEqual(solr.commits.commits, 1)
+        self.assertEqual(self.server.commits, 1)
+        solr.close()
+
+    def test_invalidates_cache(self):
+        solr = Solr('http://localhost:8983/solr/', make_request=self.server,
+                    version=4, cache=True)
+        solr.cache.set('key', object())
+        generation = solr._generation
+        solr.bulk_update(self.documents(5), commit=False,
+                         commit_within=1000)
+        self.assertEqual(solr.cache.get('key'), None)
+        self.assertTrue(solr._generation > generation)
+
+    def test_commit_within(self):
+        self.solr.bulk_update(self.documents(3), commit=False,
+                              commit_within=1000)
+        self.assertEqual(self.server.fake.calls[0][2],
+                         {'commitWithin': 1000})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from mysolr import Solr, QueryCache
+from mysolr.cache import canonical_key
+from tests.fakes import FakeRequests, select_response
+
+
+def handler(method, url, params):
+    if url.endswith('update') or url.endswith('update/json'):
+        return {'responseHeader': {'status': 0, 'QTime': 1}}
+    return select_response([{'id': '1'}])
+
+
+class QueryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRequests(handler)
+        self.solr = Solr('http://localhost:8983/solr/', make_request=self.fake,
+                         version=4, cache=True)
+
+    def searches(self):
+        return len([c for c in self.fake.calls if c[1].endswith('select')])
+
+    def test_hit(self):
+        first = self.solr.search(q='*:*', fq=['a', 'b'], rows=10)
+        second = self.solr.search(rows='10', fq=['a', 'b'], q='*:*')
+        self.assertTrue(first is second)
+        self.assertEqual(self.searches(), 1)
+        stats = self.solr.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_different_queries(self):
+        self.solr.search(q='*:*', fq=['a', 'b'])
+        self.solr.search(q='*:*', fq=['b', 'a'])
+        self.solr.search(q='*:*', fq=['a', 'b'], compact_facets=True)
+        self.assertEqual(self.searches(), 3)
+
+    def test_invalidation(self):
+        self.solr.search(q='*:*')
+        self.solr.update([{'id': '2'}], commit=False)
+        self.solr.search(q='*:*')
+        self.solr.delete_by_key('2', commit=False)
+        self.solr.search(q='*:*')
+        self.solr.rollback()
+        self.solr.search(q='*:*')
+        self.assertEqual(self.searches(), 4)
+
+    def test_update_during_search(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_handler(method, url, params):
+            if url.endswith('select'):
+                started.set()
+                release.wait(5)
+            return handler(method, url, params)
+
+        self.fake.handler = slow_handler
+        thread = threading.Thread(target=self.solr.search,
+                                  kwargs={'q': '*:*'})
+        thread.start()
+        started.wait(5)
+        self.solr.update([{'id': '2'}])
+        release.set()
+        thread.join()
+        # the response sent before the update is not cached
+        self.assertEqual(len(self.solr.cache), 0)
+        self.solr.search(q='*:*')
+        self.assertEqual(self.searches(), 2)
+
+    def test_generation(self):
+        cache = QueryCache()
+        generation = cache.generation
+        cache.clear()
+        cache.set('a', 1, generation=generation)
+        self.assertEqual(cache.get('a'), None)
+        cache.set('a', 1, generation=cache.generation)
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_lru(self):
+        cache = QueryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_max_bytes(self):
+        cache = QueryCache(max_bytes=100)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.bytes, 60)
+        cache.set('c', 3, 101)
+        self.assertEqual(cache.get('c'), None)
+
+    def test_ttl(self):
+        cache = QueryCache(ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.bytes, 0)
+
+    def test_canonical_key(self):
+        self.assertEqual(canonical_key('select', {'q': 'x', 'rows': 1}),
+                         canonical_key('select', {'rows': '1', 'q': 'x'}))
+        self.assertNotEqual(canonical_key('select', {'q': 'x'}),
+                            canonical_key('mlt', {'q': 'x'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
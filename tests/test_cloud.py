@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import unittest
+
+from mysolr import SolrCloud
+from mysolr.cloud import murmurhash3_x86_32, composite_id_hash, _hash
+from tests.fakes import FakeRequests
+
+
+def replica(host, core, leader):
+    return {'core': core, 'base_url': 'http://%s/solr' % host,
+            'state': 'active', 'leader': 'true' if leader else 'false'}
+
+
+CLUSTER_STATUS = {
+    'responseHeader': {'status': 0, 'QTime': 1},
+    'cluster': {'collections': {'books': {
+        'router': {'name': 'compositeId'},
+        'shards': {
+            'shard1': {'range': '80000000-ffffffff', 'state': 'active',
+                       'replicas': {
+                           'core_node1': replica('n1:8983', 'books_s1_r1',
+                                                 True),
+                           'core_node2': replica('n2:8983', 'books_s1_r2',
+                                                 False)}},
+            'shard2': {'range': '0-7fffffff', 'state': 'active',
+                       'replicas': {
+                           'core_node3': replica('n1:8983', 'books_s2_r1',
+                                                 False),
+                           'core_node4': replica('n2:8983', 'books_s2_r2',
+                                                 True)}}}}}}}
+
+
+OK = {'responseHeader': {'status': 0, 'QTime': 1}}
+
+
+class MurmurHashTestCase(unittest.TestCase):
+
+    def test_known_values(self):
+        self.assertEqual(murmurhash3_x86_32(b''), 0)
+        self.assertEqual(murmurhash3_x86_32(b'hello'), 613153351)
+        self.assertEqual(murmurhash3_x86_32(b'foo'), -156908512)
+
+    def test_composite_id(self):
+        expected = (_hash('tenant') & 0xffff0000) | (_hash('doc') & 0xffff)
+        if expected & 0x80000000:
+            expected -= 0x100000000
+        self.assertEqual(composite_id_hash('tenant!doc'), expected)
+        self.assertEqual(composite_id_hash('doc'), _hash('doc'))
+
+
+class SolrCloudTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRequests(self.handler)
+        self.cloud = SolrCloud('http://n1:8983/solr/', 'books',
+                               make_request=self.fake, version=4)
+
+    def handler(self, method, url, params):
+        if url.endswith('admin/collections'):
+            return CLUSTER_STATUS
+        return OK
+
+    def test_routing(self):
+        documents = [{'id': 'doc%d' % i} for i in range(20)]
+        responses = self.cloud.update(documents, commit=False)
+        self.assertEqual(sorted(responses), ['shard1', 'shard2'])
+        for _, url, _, kwargs in self.fake.calls[1:]:
+            posted = json.loads(kwargs['data'].decode('utf-8'))
+            for document in posted:
+                negative = composite_id_hash(document['id']) < 0
+                if negative:
+                    self.assertEqual(url,
+                                     'http://n1:8983/solr/books_s1_r1/'
+                                     'update/json')
+                else:
+                    self.assertEqual(url,
+                                     'http://n2:8983/solr/books_s2_r2/'
+                                     'update/json')
+
+    def test_shards_in_parallel(self):
+        both = threading.Event()
+        in_flight = []
+        waits = []
+
+        def handler(method, url, params):
+            if url.endswith('update/json'):
+                in_flight.append(url)
+                if len(in_flight) == 2:
+                    both.set()
+                # a serial update would wait here in vain for the second
+                waits.append(both.wait(1))
+            return self.handler(method, url, params)
+        self.fake.handler = handler
+        documents = [{'id': 'doc%d' % i} for i in range(20)]
+        responses = self.cloud.update(documents, commit=False)
+        self.assertEqual(waits, [True, True])
+        self.assertEqual(sorted(responses), ['shard1', 'shard2'])
+
+    def test_updates_clear_the_cache(self):
+        cloud = SolrCloud('http://n1:8983/solr/', 'books',
+                          make_request=self.fake, version=4, cache=True)
+        cloud.solr.cache.set('key', object())
+        cloud.update([{'id': 'a'}], commit=False)
+        self.assertEqual(cloud.solr.cache.get('key'), None)
+        self.assertTrue(all(leader.cache is None
+                            for leader in cloud._leaders.values()))
+
+    def test_commit_goes_to_collection(self):
+        self.cloud.update([{'id': 'a'}])
+        self.assertEqual(self.fake.calls[-1][1],
+                         'http://n1:8983/solr/books/update')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+
+from mysolr import SolrCluster
+from tests.fakes import FakeRequests, FakeResponse, select_response
+
+
+URLS = ['http://solr1:8983/solr/', 'http://solr2:8983/solr/',
+        'http://solr3:8983/solr/']
+
+
+class ClusterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.down = set()
+        self.busy = set()
+        self.fake = FakeRequests(self.handler)
+
+    def handler(self, method, url, params):
+        host = url.split('/')[2]
+        if host in self.down:
+            raise IOError('connection refused')
+        if host in self.busy:
+            return FakeResponse(b'busy', 503, url=url)
+        if url.endswith('admin/ping'):
+            return {'responseHeader': {'status': 0, 'QTime': 0}}
+        return select_response([{'id': host}])
+
+    def cluster(self, **kwargs):
+        return SolrCluster(URLS, make_request=self.fake, version=4,
+                           health_check_interval=None, **kwargs)
+
+    def hosts(self):
+        return [url.split('/')[2] for _, url, _, _ in self.fake.calls]
+
+    def test_spreads_requests(self):
+        cluster = self.cluster()
+        for _ in range(30):
+            cluster.search(q='*:*')
+        stats = cluster.stats()
+        self.assertEqual(sum(s['requests'] for s in stats.values()), 30)
+        self.assertTrue(all(s['requests'] > 0 for s in stats.values()))
+
+    def test_failover(self):
+        self.down.add('solr1:8983')
+        self.busy.add('solr2:8983')
+        cluster = self.cluster()
+        for _ in range(30):
+            response = cluster.search(q='*:*')
+            self.assertEqual(response.documents, [{'id': 'solr3:8983'}])
+        self.assertFalse(cluster.nodes[0].healthy)
+
+    def test_updates_not_retried(self):
+        self.down.update(['solr1:8983', 'solr2:8983', 'solr3:8983'])
+        cluster = self.cluster()
+        self.assertRaises(IOError, cluster.update, [{'id': 1}], commit=False)
+        self.assertEqual(len(self.fake.calls), 1)
+
+    def test_shared_cache(self):
+        cluster = self.cluster(cache=True)
+        caches = set(id(node.solr.cache) for node in cluster.nodes)
+        self.assertEqual(len(caches), 1)
+        for _ in range(3):
+            cluster.search(q='*:*')
+        self.assertEqual(len(self.fake.calls), 1)
+        cluster.update([{'id': 1}], commit=False)
+        cluster.search(q='*:*')
+        self.assertEqual(len(self.fake.calls), 3)
+
+    def test_writes_invalidate_every_node(self):
+        cluster = self.cluster()
+        generations = [node.solr._generation for node in cluster.nodes]
+        cluster.delete_by_key('1', commit=False)
+        for node, generation in zip(cluster.nodes, generations):
+            self.assertTrue(node.solr._generation > generation)
+
+    def test_health_check(self):
+        self.down.add('solr1:8983')
+        cluster = self.cluster()
+        cluster.check_health()
+        self.assertEqual([n.healthy for n in cluster.nodes],
+                         [False, True, True])
+        self.down.clear()
+        cluster.check_health()
+        self.assertEqual([n.healthy for n in cluster.nodes],
+                         [True, True, True])
+
+    def test_latency_strategy(self):
+        cluster = self.cluster(strategy='latency')
+        cluster.nodes[0].latency = 0.001
+        cluster.nodes[1].latency = 10.0
+        cluster.nodes[2].latency = 10.0
+        for _ in range(20):
+            cluster.search(q='*:*')
+        self.assertTrue(cluster.nodes[0].requests >= 15)
+
+
+class HedgingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.down = set()
+        self.fake = FakeRequests(self.handler)
+
+    def handler(self, method, url, params):
+        host = url.split('/')[2]
+        if host in self.down:
+            raise IOError('connection refused')
+        if host == 'solr1:8983':
+            time.sleep(0.3)
+        return select_response([{'id': host}])
+
+    def cluster(self, **kwargs):
+        cluster = SolrCluster(URLS[:2], make_request=self.fake, version=4,
+                              health_check_interval=None,
+                              hedge_percentile=90, **kwargs)
+        slow, fast = cluster.nodes
+        # Warm up the latency window with the fast node
+        slow.healthy = False
+        for _ in range(30):
+            cluster.search(q='*:*')
+        # Now the slow node is chosen first
+        slow.healthy, fast.healthy = True, False
+        return cluster
+
+    def test_hedge(self):
+        cluster = self.cluster(hedge_budget=0.5)
+        start = time.time()
+        response = cluster.search(q='*:*')
+        self.assertTrue(time.time() - start < 0.25)
+        self.assertEqual(response.documents, [{'id': 'solr2:8983'}])
+        self.assertEqual(cluster.hedges, 1)
+
+    def test_budget(self):
+        cluster = self.cluster(hedge_budget=0)
+        response = cluster.search(q='*:*')
+        self.assertEqual(response.documents, [{'id': 'solr1:8983'}])
+        self.assertEqual(cluster.hedges, 0)
+
+    def test_failover(self):
+        cluster = self.cluster(hedge_budget=0)
+        self.down.add('solr1:8983')
+        response = cluster.search(q='*:*')
+        self.assertEqual(response.documents, [{'id': 'solr2:8983'}])
+        self.assertFalse(cluster.nodes[0].healthy)
+
+
+if __name__ == '__main__':
+    unittest.main()
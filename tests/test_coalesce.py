@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from mysolr import Solr
+from mysolr.concurrency import SingleFlight
+from tests.fakes import FakeRequests, select_response
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def run_threads(self, target, count):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_shared_result(self):
+        single_flight = SingleFlight()
+        calls = []
+        results = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return object()
+
+        self.run_threads(lambda: results.append(single_flight.do('k', slow)),
+                         5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(id(r) for r in results)), 1)
+
+    def test_shared_exception(self):
+        single_flight = SingleFlight()
+        errors = []
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                single_flight.do('k', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        self.run_threads(call, 3)
+        self.assertEqual(len(errors), 3)
+
+    def test_sequential_calls_run_again(self):
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do('k', lambda: 1), 1)
+        self.assertEqual(single_flight.do('k', lambda: 2), 2)
+
+
+class CoalesceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        def handler(method, url, params):
+            time.sleep(0.1)
+            return select_response([{'id': '1'}])
+        self.fake = FakeRequests(handler)
+        self.solr = Solr('http://localhost:8983/solr/', make_request=self.fake,
+                         version=4, coalesce=True)
+
+    def test_identical_searches(self):
+        responses = []
+
+        def search(**kwargs):
+            responses.append(self.solr.search(**kwargs))
+
+        threads = [threading.Thread(target=search,
+                                    kwargs={'q': '*:*', 'rows': 10})
+                   for _ in range(4)]
+        threads.append(threading.Thread(target=search,
+                                        kwargs={'q': 'other'}))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.fake.calls), 2)
+        self.assertEqual(len(responses), 5)
+        self.assertEqual(len(set(id(r) for r in responses)), 2)
+
+    def test_search_after_commit(self):
+        release = threading.Event()
+
+        def handler(method, url, params):
+            if url.endswith('select'):
+                release.wait(5)
+                return select_response([{'id': '1'}])
+            return {'responseHeader': {'status': 0, 'QTime': 1}}
+        self.fake.handler = handler
+
+        def selects():
+            return [c for c in self.fake.calls if c[1].endswith('select')]
+
+        threads = [threading.Thread(target=self.solr.search,
+                                    kwargs={'q': '*:*'})]
+        threads[0].start()
+        while not selects():
+            time.sleep(0.01)
+        self.solr.update([{'id': '2'}])
+        # started after the commit, it does not join the first search
+        threads.append(threading.Thread(target=self.solr.search,
+                                        kwargs={'q': '*:*'}))
+        threads[1].start()
+        deadline = time.time() + 5
+        while len(selects()) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(selects()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
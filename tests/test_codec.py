@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from mysolr import Solr
+from mysolr.codec import get_codec, JSONCodec, CODECS
+from tests.fakes import FakeRequests
+
+
+class CodecTestCase(unittest.TestCase):
+
+    def available_codecs(self):
+        codecs = []
+        for codec_class in CODECS:
+            try:
+                codecs.append(codec_class())
+            except ImportError:
+                pass
+        return codecs
+
+    def test_round_trip(self):
+        document = {'id': u'1', 'name': u'Ñandú', 'price': 12.5, 'n': [1, 2]}
+        for codec in self.available_codecs():
+            data = codec.dumps([document])
+            self.assertTrue(isinstance(data, bytes))
+            self.assertEqual(codec.loads(data), [document])
+            self.assertEqual(json.loads(data.decode('utf-8')), [document])
+
+    def test_get_codec(self):
+        self.assertTrue(isinstance(get_codec('json'), JSONCodec))
+        codec = JSONCodec()
+        self.assertTrue(get_codec(codec) is codec)
+        self.assertTrue(get_codec() is not None)
+        self.assertRaises(ValueError, get_codec, 'yaml')
+
+    def test_update_posts_bytes(self):
+        fake = FakeRequests(lambda method, url, params:
+                            {'responseHeader': {'status': 0, 'QTime': 1}})
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4, codec='json')
+        response = solr.update([{'id': 1}], commit=False)
+        self.assertEqual(response.solr_status, 0)
+        data = fake.calls[0][3]['data']
+        self.assertEqual(data, b'[{"id": 1}]')
+
+
+if __name__ == '__main__':
+    unittest.main()
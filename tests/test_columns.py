@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mysolr import Solr
+from mysolr.columns import Column, ColumnBuilder, parse_date, format_date
+from tests.fakes import FakeRequests, select_response
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DOCS = [{'id': str(i), 'price': i * 1.5, 'stock': i,
+         'date': '2015-03-%02dT10:00:00Z' % (i + 1), 'cat': ['a', 'b']}
+        for i in range(20)]
+
+STATS = {'stats_fields': {
+    'price': {'min': 0.0, 'max': 28.5, 'count': 20, 'missing': 0,
+              'sum': 285.0, 'mean': 14.25, 'stddev': 8.87, 'facets': {}},
+    'stock': {'min': 0.0, 'max': 19.0, 'count': 20, 'missing': 0,
+              'sum': 190.0, 'mean': 9.5, 'stddev': 5.91, 'facets': {}}
+}}
+
+
+def handler(method, url, params):
+    start = int(params.get('start', 0))
+    rows = int(params.get('rows', 10))
+    documents = DOCS[start:start + rows]
+    fl = params.get('fl')
+    if fl:
+        names = fl.split(',')
+        documents = [dict((k, v) for k, v in d.items() if k in names)
+                     for d in documents]
+    return select_response(documents, len(DOCS), start, stats=STATS,
+                           facet_counts={'facet_queries': {},
+                                         'facet_fields': {
+                                             'cat': ['a', 20, 'b', 20]}})
+
+
+class ColumnTestCase(unittest.TestCase):
+
+    def test_kinds(self):
+        columns = ColumnBuilder().extend(DOCS).columns
+        self.assertEqual(sorted(columns),
+                         ['cat', 'date', 'id', 'price', 'stock'])
+        self.assertEqual(columns['id'].kind, 'object')
+        self.assertEqual(columns['price'].kind, 'float64')
+        self.assertEqual(columns['stock'].kind, 'int64')
+        self.assertEqual(columns['date'].kind, 'datetime64')
+        # 'l' on Python 2, which has no 'q'
+        self.assertTrue(columns['stock'].values.typecode in ('q', 'l'))
+        self.assertEqual(columns['stock'].values.itemsize, 8)
+        self.assertEqual(columns['price'].values.typecode, 'd')
+
+    def test_promotion(self):
+        column = Column('value')
+        for value in (1, 2, 2.5):
+            column.append(value)
+        self.assertEqual(column.kind, 'float64')
+        self.assertEqual(column.to_list(), [1.0, 2.0, 2.5])
+        column.append('three')
+        self.assertEqual(column.kind, 'object')
+        self.assertEqual(column.to_list(), [1.0, 2.0, 2.5, 'three'])
+
+    def test_missing(self):
+        column = Column('value')
+        for value in (None, 1, None, 3):
+            column.append(value)
+        self.assertEqual(column.kind, 'int64')
+        self.assertEqual(list(column.mask), [0, 1, 0, 1])
+        self.assertEqual(column.to_list(), [None, 1, None, 3])
+
+    def test_multivalued(self):
+        column = Column('cat')
+        for value in ('a', ['b', 'c'], None, []):
+            column.append(value)
+        self.assertTrue(column.multivalued)
+        self.assertEqual(list(column.offsets), [0, 1, 3, 3, 3])
+        self.assertEqual(column.values, ['a', 'b', 'c'])
+        self.assertEqual(column.to_list(), [['a'], ['b', 'c'], None, []])
+
+    def test_new_fields(self):
+        builder = ColumnBuilder()
+        builder.extend([{'id': '1'}, {'id': '2', 'price': 3}, {'id': '3'}])
+        self.assertEqual(len(builder), 3)
+        self.assertEqual(builder.columns['price'].to_list(), [None, 3, None])
+
+    def test_fields(self):
+        builder = ColumnBuilder(('stock', 'other')).extend(DOCS[:3])
+        self.assertEqual(list(builder.columns), ['stock', 'other'])
+        self.assertEqual(builder.columns['other'].to_list(), [None] * 3)
+
+    def test_dates(self):
+        milliseconds = parse_date('1995-12-31T23:59:59.5Z')
+        self.assertEqual(milliseconds, 820454399500)
+        self.assertEqual(format_date(milliseconds),
+                         '1995-12-31T23:59:59.500Z')
+        self.assertEqual(format_date(parse_date('2015-03-01T10:00:00Z')),
+                         '2015-03-01T10:00:00Z')
+        self.assertEqual(parse_date('NOW'), None)
+
+    @unittest.skipIf(numpy is not None, 'numpy is installed')
+    def test_without_numpy(self):
+        builder = ColumnBuilder().extend(DOCS)
+        self.assertRaises(RuntimeError, builder.to_arrays)
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numpy(self):
+        arrays = ColumnBuilder().extend(DOCS + [{'id': 'x'}]).to_arrays()
+        self.assertEqual(arrays['stock'].dtype, numpy.dtype('int64'))
+        self.assertTrue(arrays['stock'].mask[-1])
+        self.assertEqual(arrays['date'].dtype, numpy.dtype('datetime64[ms]'))
+        values, offsets = arrays['cat']
+        self.assertEqual(len(offsets), len(DOCS) + 2)
+
+
+class SearchColumnsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=FakeRequests(handler), version=4)
+
+    def test_to_columns(self):
+        response = self.solr.search(q='*:*')
+        columns = response.to_columns(('id', 'stock'))
+        self.assertEqual(columns['stock'].to_list(), list(range(10)))
+
+    def test_stats_columns(self):
+        response = self.solr.search(q='*:*', stats='true')
+        columns = response.stats_columns()
+        self.assertEqual(sorted(columns['field'].to_list()),
+                         ['price', 'stock'])
+        self.assertEqual(columns['count'].kind, 'int64')
+        self.assertFalse('facets' in columns)
+
+    def test_cursor(self):
+        cursor = self.solr.search_cursor(q='*:*', fl='id,date')
+        builder = cursor.fetch_columns(7)
+        self.assertEqual(len(builder), len(DOCS))
+        self.assertEqual(list(builder.columns), ['id', 'date'])
+        self.assertEqual(builder.columns['date'].to_list(),
+                         [d['date'] for d in DOCS])
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_facet_arrays(self):
+        response = self.solr.search(q='*:*', facet='true')
+        terms, counts = response.facet_arrays('cat')
+        self.assertEqual(list(terms), ['a', 'b'])
+        self.assertEqual(counts.dtype, numpy.dtype('int64'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from mysolr import Solr
+from mysolr.mysolr import _get_commit_xml
+from tests.fakes import FakeRequests, FakeResponse
+
+
+class Handler(object):
+    """ Answers updates, and commits with the given status after `delay`
+    seconds. """
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, params):
+        return {'responseHeader': {'status': 0, 'QTime': 1}}
+
+    def respond(self, method, url, params):
+        return FakeResponse({'responseHeader': {'status': 0, 'QTime': 1}},
+                            status_code=self.status)
+
+
+class CommitFakeRequests(FakeRequests):
+    """ FakeRequests that tells commits apart by their body. """
+
+    def __init__(self, handler):
+        FakeRequests.__init__(self, handler)
+        self.commits = []
+
+    def post(self, url, data=None, params=None, **kwargs):
+        if isinstance(data, bytes) and data.startswith(b'<commit'):
+            time.sleep(self.handler.delay)
+            with self.handler.lock:
+                self.commits.append(data)
+            return self.handler.respond('POST', url, params)
+        return FakeRequests.post(self, url, data, params, **kwargs)
+
+
+class CommitXMLTestCase(unittest.TestCase):
+
+    def test_soft_commit(self):
+        self.assertEqual(_get_commit_xml(4, soft_commit=True),
+                         '<commit waitSearcher="true" expungeDeletes="false" '
+                         'softCommit="true" />')
+        self.assertRaises(ValueError, _get_commit_xml, 3, soft_commit=True)
+
+    def test_commit_within(self):
+        fake = FakeRequests(Handler())
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        solr.update([{'id': '1'}], 'xml', commit=False, commit_within=500)
+        solr.update([{'id': '1'}], commit=False, commit_within=500)
+        solr.delete_by_key('1', commit=False, commit_within=500)
+        solr.delete_by_query('*:*', commit=False, commit_within=500)
+        xml, json, key, query = [call[3] for call in fake.calls]
+        self.assertEqual(fake.calls[1][2], {'commitWithin': 500})
+        self.assertTrue(b''.join(xml['data']).startswith(
+            b'<add overwrite="true" commitWithin="500">'))
+        self.assertFalse(json['data'].startswith(b'<'))
+        self.assertEqual(key['data'],
+                         b'<delete commitWithin="500"><id>1</id></delete>')
+        self.assertEqual(query['data'], b'<delete commitWithin="500">'
+                                        b'<query>*:*</query></delete>')
+
+
+class CommitSchedulerTestCase(unittest.TestCase):
+
+    def make_solr(self, handler, interval=0.2, **kwargs):
+        self.fake = CommitFakeRequests(handler)
+        return Solr('http://localhost:8983/solr/', make_request=self.fake,
+                    version=4, commit_interval=interval, **kwargs)
+
+    def test_without_scheduler(self):
+        fake = CommitFakeRequests(Handler())
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        solr.update([{'id': '1'}])
+        commit = solr.request_commit()
+        self.assertTrue(commit.done.is_set())
+        self.assertEqual(commit.wait().status, 200)
+        self.assertEqual(len(fake.commits), 2)
+
+    def test_coalesced(self):
+        solr = self.make_solr(Handler(delay=0.05))
+        errors = []
+
+        def write(i):
+            try:
+                solr.update([{'id': str(i)}])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i, ))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        solr.close()
+        self.assertEqual(errors, [])
+        # the first commit is made right away, the rest are shared
+        self.assertTrue(len(self.fake.commits) <= 3)
+        self.assertEqual(solr.commits.commits, len(self.fake.commits))
+
+    def test_interval(self):
+        solr = self.make_solr(Handler(), interval=0.3)
+        solr.update([{'id': '1'}])
+        start = time.time()
+        solr.update([{'id': '2'}])
+        self.assertTrue(time.time() - start >= 0.25)
+        self.assertEqual(len(self.fake.commits), 2)
+        solr.close()
+
+    def test_request_and_wait(self):
+        solr = self.make_solr(Handler(), interval=0.3, soft_commits=True)
+        solr.update([{'id': '1'}], commit=False)
+        first = solr.request_commit()
+        self.assertEqual(first.wait(1).status, 200)
+        second = solr.request_commit()
+        self.assertTrue(solr.request_commit() is second)
+        self.assertFalse(second.done.is_set())
+        solr.commits.flush()
+        self.assertTrue(second.done.is_set())
+        self.assertTrue(b'softCommit="true"' in self.fake.commits[-1])
+        solr.close()
+
+    def test_soft_commits_version(self):
+        fake = CommitFakeRequests(Handler())
+        self.assertRaises(ValueError, Solr, 'http://localhost:8983/solr/',
+                          make_request=fake, version=3, commit_interval=1,
+                          soft_commits=True)
+        self.assertEqual(fake.calls, [])
+
+    def test_close_makes_pending_commit(self):
+        solr = self.make_solr(Handler(), interval=10)
+        solr.request_commit().wait()
+        pending = solr.request_commit()
+        solr.close()
+        self.assertTrue(pending.done.is_set())
+        self.assertEqual(len(self.fake.commits), 2)
+        self.assertRaises(RuntimeError, solr.request_commit)
+
+    def test_timeout(self):
+        solr = self.make_solr(Handler(), interval=10)
+        solr.request_commit().wait()
+        self.assertRaises(RuntimeError, solr.request_commit().wait, 0.05)
+        solr.close()
+
+    def test_failed_commit(self):
+        solr = self.make_solr(Handler(status=500))
+        self.assertEqual(solr.request_commit().wait().status, 500)
+        solr.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mysolr import Solr
+from tests.fakes import FakeRequests, FakeResponse, select_response
+
+
+DOCS = [{'id': str(i)} for i in range(7)]
+
+
+def offset_handler(method, url, params):
+    start, rows = int(params['start']), int(params['rows'])
+    return select_response(DOCS[start:start + rows], len(DOCS), start)
+
+
+def cursor_mark_handler(method, url, params):
+    assert 'start' not in params or int(params['start']) == 0
+    mark = params['cursorMark']
+    start = 0 if mark == '*' else int(mark)
+    rows = int(params['rows'])
+    docs = DOCS[start:start + rows]
+    return select_response(docs, len(DOCS),
+                           nextCursorMark=str(start + len(docs)))
+
+
+class CursorTestCase(unittest.TestCase):
+
+    def test_offset_paging(self):
+        fake = FakeRequests(offset_handler)
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        cursor = solr.search_cursor(q='*:*')
+        pages = [r.documents for r in cursor.fetch(3)]
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+
+    def test_offset_error_page(self):
+        bodies = [b'<html><u>Server error</u></html>',
+                  {'responseHeader': {'status': 500, 'QTime': 1},
+                   'error': {'msg': 'boom', 'code': 500}}]
+        for body in bodies:
+            fake = FakeRequests(lambda method, url, params:
+                                FakeResponse(body, 500))
+            solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                        version=4)
+            for prefetch in (0, 2):
+                cursor = solr.search_cursor(q='*:*')
+                pages = list(cursor.fetch(3, prefetch=prefetch))
+                self.assertEqual([p.status for p in pages], [500])
+
+    def test_cursor_mark_paging(self):
+        fake = FakeRequests(cursor_mark_handler)
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        cursor = solr.search_cursor(q='*:*', unique_key='id',
+                                    sort='price desc')
+        docs = [d for r in cursor.fetch(3) for d in r.documents]
+        self.assertEqual(docs, DOCS)
+        marks = [params['cursorMark'] for _, _, params, _ in fake.calls]
+        self.assertEqual(marks, ['*', '3', '6'])
+        self.assertEqual(fake.calls[0][2]['sort'], 'price desc,id asc')
+
+    def test_cursor_mark_exact_pages(self):
+        fake = FakeRequests(cursor_mark_handler)
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        cursor = solr.search_cursor(q='*:*', unique_key='id', sort='id desc')
+        pages = list(cursor.fetch(7))
+        self.assertEqual(len(pages), 1)
+        # One more request is needed to see that the mark did not change
+        self.assertEqual(len(fake.calls), 2)
+        self.assertEqual(fake.calls[0][2]['sort'], 'id desc')
+
+    def test_prefetch(self):
+        fake = FakeRequests(offset_handler)
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        cursor = solr.search_cursor(q='*:*')
+        docs = [d for r in cursor.fetch(2, prefetch=2) for d in r.documents]
+        self.assertEqual(docs, DOCS)
+
+    def test_prefetch_error_at_failing_page(self):
+        def handler(method, url, params):
+            if int(params['start']) == 4:
+                raise IOError('connection reset')
+            return offset_handler(method, url, params)
+
+        solr = Solr('http://localhost:8983/solr/',
+                    make_request=FakeRequests(handler), version=4)
+        pages = []
+        cursor = solr.search_cursor(q='*:*')
+        with self.assertRaises(IOError):
+            for response in cursor.fetch(2, prefetch=3):
+                pages.append(response)
+        self.assertEqual(len(pages), 2)
+
+    def test_prefetch_early_close(self):
+        requested = []
+
+        def handler(method, url, params):
+            requested.append(params['start'])
+            return offset_handler(method, url, params)
+
+        solr = Solr('http://localhost:8983/solr/',
+                    make_request=FakeRequests(handler), version=4)
+        cursor = solr.search_cursor(q='*:*')
+        pages = cursor.fetch(1, prefetch=1)
+        next(pages)
+        pages.close()
+        # Back-pressure: the worker cannot run further than the buffer
+        self.assertTrue(len(requested) <= 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
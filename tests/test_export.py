@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from mysolr import Solr
+from tests.fakes import FakeRequests, FakeResponse
+
+
+DOCS = [{'id': str(i), 'price': i * 1.5} for i in range(50)]
+
+
+class ChunkedResponse(FakeResponse):
+    """ Counts the bytes read by the client. """
+
+    def __init__(self, body, **kwargs):
+        FakeResponse.__init__(self, body, **kwargs)
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for chunk in FakeResponse.iter_content(self, 16):
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class ExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.body = {'responseHeader': {'status': 0},
+                     'response': {'numFound': len(DOCS), 'docs': DOCS}}
+        self.responses = []
+        self.fake = FakeRequests(self.handler)
+        self.solr = Solr('http://localhost:8983/solr/', make_request=self.fake,
+                         version=4)
+
+    def handler(self, method, url, params):
+        body = self.body
+        if not isinstance(body, FakeResponse):
+            body = ChunkedResponse(json.dumps(body).encode('utf-8'), url=url)
+        self.responses.append(body)
+        return body
+
+    def test_export(self):
+        documents = self.solr.export('*:*', ['id', 'price'], 'id asc',
+                                     fq='price:[0 TO *]')
+        self.assertEqual(list(documents), DOCS)
+        method, url, params, kwargs = self.fake.calls[0]
+        self.assertEqual(url, 'http://localhost:8983/solr/export')
+        self.assertEqual(params['fl'], 'id,price')
+        self.assertEqual(params['sort'], 'id asc')
+        self.assertEqual(params['fq'], 'price:[0 TO *]')
+        self.assertTrue(kwargs['stream'])
+        self.assertTrue(self.responses[0].closed)
+
+    def test_incremental(self):
+        documents = self.solr.export('*:*', 'id,price', 'id asc')
+        self.assertEqual(next(documents), DOCS[0])
+        response = self.responses[0]
+        self.assertTrue(response.read < len(response.content) / 4)
+        documents.close()
+        self.assertTrue(response.closed)
+
+    def test_exception_tuple(self):
+        self.body['response']['docs'] = DOCS[:2] + [{'EXCEPTION': 'boom'}]
+        documents = self.solr.export('*:*', 'id', 'id asc')
+        self.assertEqual(next(documents), DOCS[0])
+        self.assertEqual(next(documents), DOCS[1])
+        self.assertRaises(RuntimeError, next, documents)
+
+    def test_error_status(self):
+        self.body = FakeResponse({'responseHeader': {'status': 400},
+                                  'error': {'msg': 'no docValues'}},
+                                 status_code=400)
+        documents = self.solr.export('*:*', 'id', 'id asc')
+        try:
+            next(documents)
+        except RuntimeError as e:
+            self.assertTrue('no docValues' in str(e))
+        else:
+            self.fail('RuntimeError not raised')
+
+    def test_result_set(self):
+        self.body = {'result-set': {'docs': DOCS[:3] + [{'EOF': True}]}}
+        documents = self.solr.export('*:*', 'id', 'id asc')
+        self.assertEqual(list(documents), DOCS[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
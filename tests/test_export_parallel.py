@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import math
+import re
+import unittest
+
+from mysolr import Solr
+from mysolr.mysolr import _range_partitions
+from tests.fakes import FakeRequests, select_response
+
+
+DOCS = [{'id': str(i), 'num': i} for i in range(-5, 23)]
+MISSING = [{'id': 'a'}, {'id': 'b'}]
+
+HASH_FILTER = re.compile(r'\{!frange l=(\d+) u=(\d+) incu=false\}'
+                         r'abs\(mod\((\w+),(\d+)\)\)')
+RANGE_FILTER = re.compile(r'num:\[(-?\d+|\*) TO (-?\d+|\*)([\]}])')
+
+
+def matches(doc, fq):
+    if fq == '-num:[* TO *]':
+        return 'num' not in doc
+    match = HASH_FILTER.match(fq)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        field, partitions = match.group(3), int(match.group(4))
+        # function queries take missing values as 0
+        value = abs(math.fmod(doc.get(field, 0), partitions))
+        return low <= value < high
+    match = RANGE_FILTER.match(fq)
+    if match:
+        if 'num' not in doc:
+            return False
+        low, high = match.group(1), match.group(2)
+        if low != '*' and doc['num'] < int(low):
+            return False
+        if high == '*':
+            return True
+        if match.group(3) == ']':
+            return doc['num'] <= int(high)
+        return doc['num'] < int(high)
+    return True
+
+
+def handler(method, url, params):
+    fqs = params.get('fq', [])
+    docs = [d for d in DOCS + MISSING if all(matches(d, fq) for fq in fqs)]
+    if params.get('stats') == 'true':
+        stats = {'stats_fields': {'num': {'min': -5.0, 'max': 22.0,
+                                          'missing': len(MISSING)}}}
+        return select_response([], len(docs), stats=stats)
+    start, rows = int(params['start']), int(params['rows'])
+    return select_response(docs[start:start + rows], len(docs), start)
+
+
+class ExportParallelTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRequests(handler)
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=self.fake, version=4)
+
+    def test_hash_partitions(self):
+        docs = list(self.solr.export_parallel('*:*', 'num', partitions=3,
+                                              rows=4))
+        self.assertEqual(sorted(d['id'] for d in docs),
+                         sorted(d['id'] for d in DOCS + MISSING))
+
+    def test_hash_partitions_float_field(self):
+        for doc in DOCS:
+            doc['price'] = doc['num'] * 1.3
+        try:
+            docs = list(self.solr.export_parallel('*:*', 'price',
+                                                  partitions=3, rows=4))
+        finally:
+            for doc in DOCS:
+                del doc['price']
+        self.assertEqual(sorted(d['id'] for d in docs),
+                         sorted(d['id'] for d in DOCS + MISSING))
+
+    def test_range_partitions(self):
+        docs = list(self.solr.export_parallel('*:*', 'num', partitions=4,
+                                              method='range', rows=5))
+        self.assertEqual(sorted(d['id'] for d in docs),
+                         sorted(d['id'] for d in DOCS + MISSING))
+
+    def test_float_range(self):
+        filters = _range_partitions('f', 3, 0.3, 1.0)
+        self.assertEqual(filters[0], 'f:[* TO 0.5333333333333333}')
+        self.assertEqual(filters[2], 'f:[0.7666666666666666 TO *]')
+        self.assertEqual(filters[3], '-f:[* TO *]')
+
+    def test_no_missing_values(self):
+        self.assertEqual(_range_partitions('num', 2, 0, 10, missing=0),
+                         ['num:[* TO 5}', 'num:[5 TO *]'])
+
+    def test_keeps_filters(self):
+        list(self.solr.export_parallel('*:*', 'num', partitions=2,
+                                       fq='type:book'))
+        for _, _, params, _ in self.fake.calls:
+            self.assertEqual(params['fq'][0], 'type:book')
+            self.assertEqual(len(params['fq']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join, dirname
+
+from mysolr import SolrResponse, FacetCounts
+from tests.fakes import FakeResponse
+
+
+class FacetCountsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.facet = FacetCounts.from_solr(['a', 3, 'b', 10, 'c', 1, 'd', 7])
+
+    def test_order(self):
+        self.assertEqual(list(self.facet), ['a', 'b', 'c', 'd'])
+        self.assertEqual(list(self.facet.items()),
+                         [('a', 3), ('b', 10), ('c', 1), ('d', 7)])
+
+    def test_lookup(self):
+        self.assertEqual(self.facet['b'], 10)
+        self.assertEqual(self.facet.get('z'), None)
+        self.assertTrue('c' in self.facet)
+        self.assertRaises(KeyError, lambda: self.facet['z'])
+
+    def test_top(self):
+        self.assertEqual(self.facet.top(2), [('b', 10), ('d', 7)])
+
+    def test_to_dict(self):
+        expected = [('a', 3), ('b', 10), ('c', 1), ('d', 7)]
+        self.assertEqual(list(self.facet.to_dict().items()), expected)
+        self.assertEqual(self.facet, dict(expected))
+
+    def test_compact_response(self):
+        with open(join(dirname(__file__), 'mocks/query')) as f:
+            body = f.read().encode('utf-8')
+        response = SolrResponse(FakeResponse(body), compact_facets=True)
+        author = response.facets['facet_fields']['author']
+        self.assertTrue(isinstance(author, FacetCounts))
+        self.assertEqual(author['riordan'], 2)
+        self.assertEqual(author, SolrResponse(FakeResponse(body)).facets[
+            'facet_fields']['author'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import socket
+import unittest
+
+from mysolr import Solr
+from mysolr.instrumentation import (Hooks, Histogram, HistogramCollector,
+                                    StatsdHooks)
+from tests.fakes import FakeRequests, select_response
+
+
+DOCS = [{'id': str(i)} for i in range(5)]
+
+
+def handler(method, url, params):
+    if params.get('q') == 'down':
+        raise IOError('connection refused')
+    if url.endswith('update') or url.endswith('update/json'):
+        return {'responseHeader': {'status': 0, 'QTime': 3}}
+    start = int(params.get('start', 0))
+    rows = int(params.get('rows', 10))
+    return select_response(DOCS[start:start + rows], len(DOCS), start)
+
+
+class RecordingHooks(Hooks):
+
+    def __init__(self):
+        self.calls = []
+
+    def before_request(self, event):
+        self.calls.append(('before', event))
+
+    def after_response(self, event):
+        self.calls.append(('after', event))
+
+    def on_error(self, event):
+        self.calls.append(('error', event))
+
+
+class HooksTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hooks = RecordingHooks()
+        self.fake = FakeRequests(handler)
+        self.solr = Solr('http://localhost:8983/solr/', make_request=self.fake,
+                         version=4, hooks=[self.hooks])
+
+    def test_search(self):
+        response = self.solr.search(q='*:*')
+        self.assertEqual([name for name, _ in self.hooks.calls],
+                         ['before', 'after'])
+        event = self.hooks.calls[1][1]
+        self.assertEqual(event.resource, 'select')
+        self.assertEqual(event.status, 200)
+        self.assertEqual(event.qtime, 1)
+        self.assertEqual(event.response_bytes, response.content_length)
+        self.assertTrue(event.request_bytes > 0)
+        self.assertTrue(event.total_time >= event.parse_time >= 0)
+
+    def test_error(self):
+        self.assertRaises(IOError, self.solr.search, q='down')
+        self.assertEqual([name for name, _ in self.hooks.calls],
+                         ['before', 'error'])
+        self.assertTrue(isinstance(self.hooks.calls[1][1].exception, IOError))
+
+    def test_cursor_and_updates(self):
+        list(self.solr.search_cursor(q='*:*').fetch(2))
+        self.solr.update([{'id': '9'}])
+        resources = [event.resource for name, event in self.hooks.calls
+                     if name == 'after']
+        self.assertEqual(resources, ['select'] * 3 + ['update/json',
+                                                      'update'])
+
+    def test_streamed_body(self):
+        self.solr.update([{'id': '9'}], input_type='xml', commit=False)
+        event = self.hooks.calls[1][1]
+        self.assertEqual(event.request_bytes, None)
+        self.assertEqual(event.qtime, 3)
+
+
+class CollectorTestCase(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(),
+                         [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.percentile(50), 0.1)
+        self.assertEqual(histogram.percentile(75), 1.0)
+        self.assertEqual(histogram.percentile(99), float('inf'))
+
+    def test_prometheus(self):
+        collector = HistogramCollector()
+        solr = Solr('http://localhost:8983/solr/',
+                    make_request=FakeRequests(handler), version=4,
+                    hooks=[collector])
+        solr.search(q='*:*')
+        solr.search(q='*:*')
+        self.assertRaises(IOError, solr.search, q='down')
+        self.assertEqual(collector.histogram('select').count, 2)
+        self.assertEqual(collector.histogram('select', 'qtime').sum, 0.002)
+        text = collector.prometheus()
+        self.assertTrue('mysolr_request_seconds_count'
+                        '{resource="select",phase="total"} 2' in text)
+        self.assertTrue('mysolr_requests_total{resource="select"} 3' in text)
+        self.assertTrue('mysolr_errors_total{resource="select"} 1' in text)
+
+
+class StatsdTestCase(unittest.TestCase):
+
+    def test_send(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        statsd = StatsdHooks('127.0.0.1', server.getsockname()[1])
+        solr = Solr('http://localhost:8983/solr/',
+                    make_request=FakeRequests(handler), version=4,
+                    hooks=[statsd])
+        try:
+            solr.search(q='*:*')
+            lines = server.recv(4096).decode('utf-8').split('\n')
+        finally:
+            statsd.close()
+            server.close()
+        self.assertEqual(lines[0], 'mysolr.select.requests:1|c')
+        self.assertTrue('mysolr.select.qtime:1|ms' in lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
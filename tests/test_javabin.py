@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import struct
+import unittest
+from os.path import join, dirname
+
+from mysolr import Solr, SolrResponse
+from mysolr.javabin import javabin_codec
+from tests.fakes import FakeRequests, FakeResponse, select_response
+
+
+def string(value):
+    data = value.encode('utf-8')
+    if len(data) < 31:
+        return struct.pack('B', 0x20 | len(data)) + data
+    return b'\x3f' + struct.pack('B', len(data) - 31) + data
+
+
+def name(value):
+    """ First use of an extern string. """
+    return b'\xe0' + string(value)
+
+
+def entries(*pairs):
+    """ ORDERED_MAP with the given names and encoded values. """
+    return struct.pack('B', 0xa0 | len(pairs)) + \
+        b''.join(name(key) + value for key, value in pairs)
+
+
+def loads(*parts):
+    return javabin_codec.loads(b'\x02' + b''.join(parts))
+
+
+def mock(filename):
+    with open(join(dirname(__file__), 'mocks', filename), 'rb') as f:
+        return f.read()
+
+
+class JavabinTestCase(unittest.TestCase):
+
+    def test_numbers(self):
+        content = loads(entries(
+            ('small', b'\x45'),
+            ('vint', b'\x5f\x81\x01'),
+            ('negative', b'\x06' + struct.pack('>i', -7)),
+            ('long', b'\x07' + struct.pack('>q', 2 ** 40)),
+            ('float', b'\x08' + struct.pack('>f', 1.1)),
+            ('double', b'\x05' + struct.pack('>d', 1.1)),
+            ('short', b'\x04' + struct.pack('>h', -2)),
+            ('byte', b'\x03\xff')))
+        self.assertEqual(content, {'small': 5, 'vint': 0x81f,
+                                   'negative': -7, 'long': 2 ** 40,
+                                   'float': 1.1, 'double': 1.1,
+                                   'short': -2, 'byte': -1})
+
+    def test_values(self):
+        content = loads(entries(
+            ('date', b'\x09' + struct.pack('>q', 820454399500)),
+            ('flags', b'\x82\x01\x02'),
+            ('null', b'\x00'),
+            ('text', string(u'caf\xe9 ' * 10)),
+            ('iterator', b'\x0e\x41\x42\x0f'),
+            ('map', b'\x0a\x01' + string('k') + b'\x41')))
+        self.assertEqual(content['date'], '1995-12-31T23:59:59.500Z')
+        self.assertEqual(content['flags'], [True, False])
+        self.assertEqual(content['null'], None)
+        self.assertEqual(content['text'], u'caf\xe9 ' * 10)
+        self.assertEqual(content['iterator'], [1, 2])
+        self.assertEqual(content['map'], {'k': 1})
+
+    def test_named_list(self):
+        facets = b'\xc2' + name('a') + b'\x43' + name('b') + b'\x41'
+        content = loads(entries(('cat', facets), ('again', b'\xe2')))
+        self.assertEqual(content['cat'], ['a', 3, 'b', 1])
+        # extern strings are referenced by their position
+        self.assertEqual(content['again'], 'a')
+
+    def test_document_list(self):
+        document = b'\x0b' + entries(('id', string('1')), ('price', b'\x42'))
+        documents = b'\x0c\x83\x62\x60\x08' + struct.pack('>f', 0.5) + \
+            b'\x81' + document
+        content = loads(entries(('response', documents)))
+        self.assertEqual(content['response'], {
+            'numFound': 2, 'start': 0, 'maxScore': 0.5,
+            'docs': [{'id': '1', 'price': 2}]})
+
+    def test_not_javabin(self):
+        self.assertRaises(ValueError, javabin_codec.loads, b'{"a": 1}')
+
+    def test_fixture(self):
+        """ The javabin fixture holds the same response as mocks/query. """
+        expected = SolrResponse(FakeResponse(mock('query')))
+        response = SolrResponse(FakeResponse(mock('javabinquery')),
+                                codec=javabin_codec)
+        self.assertEqual(response.qtime, expected.qtime)
+        self.assertEqual(response.total_results, expected.total_results)
+        self.assertEqual(response.documents, expected.documents)
+        self.assertEqual(response.facets, expected.facets)
+
+
+class SearchJavabinTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.fixture = mock('javabinquery')
+
+        def handler(method, url, params):
+            self.calls.append(params)
+            if params['wt'] == 'javabin':
+                return self.fixture
+            return select_response([{'id': '1'}])
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=FakeRequests(handler), version=4)
+
+    def test_per_call(self):
+        response = self.solr.search(q='*:*', wt='javabin')
+        self.assertEqual(response.total_results, 2)
+        self.assertEqual(self.solr.search(q='*:*').total_results, 1)
+        self.assertEqual([c['wt'] for c in self.calls], ['javabin', 'json'])
+
+    def test_per_instance(self):
+        self.solr.wt = 'javabin'
+        response = self.solr.search(q='*:*', stream=True)
+        self.assertEqual(len(list(response.documents)), 2)
+        self.assertEqual(self.solr.search(q='*:*', wt='json').total_results,
+                         1)
+        self.assertEqual(self.solr.search(q='*:*', wt='xml').total_results,
+                         2)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, Solr, 'http://localhost:8983/solr/',
+                          version=4, wt='xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
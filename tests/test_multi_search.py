@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mysolr import Solr
+from mysolr.batch import plan, merge
+from tests.fakes import FakeRequests, FakeResponse, select_response
+
+COUNTS = {'cat:a': 3, 'cat:b': 5, '(cat:a) AND (in_stock:true)': 1}
+
+
+def handler(method, url, params):
+    if params.get('q') == 'error':
+        return FakeResponse(b'<html><u>boom</u></html>', status_code=500)
+    extra = {}
+    facet_queries = params.get('facet.query')
+    if facet_queries:
+        counts = {}
+        for facet_query in facet_queries:
+            key, clause = facet_query[len('{!key='):].split('}', 1)
+            counts[key] = COUNTS.get(clause, 0)
+        extra['facet_counts'] = {'facet_queries': counts}
+    return select_response([], num_found=10, **extra)
+
+
+class PlanTestCase(unittest.TestCase):
+
+    def test_plan(self):
+        queries = [{'q': '*:*', 'rows': 0, 'fq': 'cat:a'},
+                   {'q': '*:*', 'rows': 10, 'fq': 'cat:a'},
+                   {'q': '*:*', 'rows': '0', 'fq': ['cat:b']},
+                   {'q': 'foo', 'rows': 0},
+                   {'q': '*:*', 'rows': 0, 'fq': '{!tag=c}cat:c'},
+                   {'q': '*:*', 'rows': 0, 'facet': 'true'}]
+        self.assertEqual(plan(queries), ([[0, 2]], [1, 3, 4, 5]))
+
+    def test_negative_filters(self):
+        queries = [{'q': '*:*', 'rows': 0, 'fq': ['type:x', '-cat:a']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x', 'NOT cat:b']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x', 'cat:c']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x', 'cat:d']}]
+        # (type:x) AND (-cat:a) would match nothing
+        self.assertEqual(plan(queries), ([[2, 3]], [0, 1]))
+
+    def test_merge(self):
+        queries = [{'q': '*:*', 'rows': 0, 'fq': ['type:x', 'cat:a']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x']},
+                   {'q': '*:*', 'rows': 0,
+                    'fq': ['type:x', 'cat:a', 'in_stock:true']}]
+        query, keys = merge(queries)
+        self.assertEqual(query['fq'], ['type:x'])
+        self.assertEqual(query['facet.query'],
+                         ['{!key=q0}cat:a',
+                          '{!key=q2}(cat:a) AND (in_stock:true)'])
+        self.assertEqual(keys, ['q0', None, 'q2'])
+
+
+class MultiSearchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRequests(handler)
+        self.solr = Solr('http://localhost:8983/solr/', make_request=self.fake,
+                         version=4)
+
+    def test_merged_counts(self):
+        queries = [{'q': '*:*', 'rows': 0, 'fq': ['type:x', 'cat:a']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x', 'cat:b']},
+                   {'q': '*:*', 'rows': 0, 'fq': ['type:x']},
+                   {'q': '*:*', 'rows': 10}]
+        responses = self.solr.multi_search(queries)
+        self.assertEqual([r.total_results for r in responses], [3, 5, 10, 10])
+        self.assertEqual(responses[0].documents, [])
+        self.assertEqual(len(self.fake.calls), 2)
+        self.assertEqual(queries[0], {'q': '*:*', 'rows': 0,
+                                      'fq': ['type:x', 'cat:a']})
+
+    def test_fan_out(self):
+        queries = [{'q': 'q%d' % i} for i in range(7)]
+        responses = self.solr.multi_search(queries, workers=3)
+        self.assertEqual(len(responses), 7)
+        self.assertEqual(len(self.fake.calls), 7)
+        self.assertTrue(all(r.total_results == 10 for r in responses))
+
+    def test_error(self):
+        queries = [{'q': 'error', 'rows': 0, 'fq': 'cat:a'},
+                   {'q': 'error', 'rows': 0, 'fq': 'cat:b'}]
+        responses = self.solr.multi_search(queries)
+        self.assertEqual([r.status for r in responses], [500, 500])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,5 +52,16 @@ class QueryResultTestCase(unittest.TestCase):
     def test_facets(self):
         self.assertNotEqual(self.solr_response.facets, None)
 
+    def test_lazy_facets(self):
+        self.assertFalse('facets' in self.solr_response.__dict__)
+        facets = self.solr_response.facets
+        self.assertTrue(self.solr_response.facets is facets)
+
+    def test_missing_components(self):
+        self.assertEqual(self.solr_response.stats, None)
+        self.assertEqual(self.solr_response.spellcheck, None)
+        self.assertEqual(self.solr_response.highlighting, None)
+        self.assertEqual(self.solr_response.mlt, None)
+
 if __name__ == '__main__':
     unittest.main()
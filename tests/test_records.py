@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import pickle
+import sys
+import unittest
+
+from mysolr import Solr
+from mysolr.records import Record, to_record, fields_from_fl
+from tests.fakes import FakeRequests, select_response
+
+
+DOCS = [{'id': str(i), 'name': 'doc %d' % i, 'price': i * 1.5,
+         'stock': i, 'cat': ['a', 'b']} for i in range(20)]
+
+
+def handler(method, url, params):
+    start = int(params.get('start', 0))
+    rows = int(params.get('rows', 10))
+    documents = DOCS[start:start + rows]
+    fl = params.get('fl')
+    if fl and fl != '*':
+        names = fl.split(',')
+        documents = [dict((k, v) for k, v in d.items() if k in names)
+                     for d in documents]
+    return select_response(documents, len(DOCS), start)
+
+
+class RecordTestCase(unittest.TestCase):
+
+    def test_access(self):
+        record = to_record(DOCS[1], ('id', 'name', 'missing'))
+        self.assertTrue(isinstance(record, Record))
+        self.assertEqual(record.name, 'doc 1')
+        self.assertEqual(record['name'], 'doc 1')
+        self.assertEqual(record[1], 'doc 1')
+        self.assertEqual(record.missing, None)
+        self.assertEqual(record.get('other', 0), 0)
+        self.assertRaises(AttributeError, getattr, record, 'other')
+        self.assertRaises(KeyError, record.__getitem__, 'other')
+        self.assertEqual(record.to_dict(), {'id': '1', 'name': 'doc 1',
+                                            'missing': None})
+        self.assertEqual(list(record), ['1', 'doc 1', None])
+
+    def test_shared_class(self):
+        first = to_record(DOCS[0], ('id', 'name'))
+        second = to_record(DOCS[1], ('id', 'name'))
+        self.assertTrue(type(first) is type(second))
+        self.assertFalse(hasattr(first, '__dict__'))
+
+    def test_pickle(self):
+        record = to_record(DOCS[2])
+        copy = pickle.loads(pickle.dumps(record))
+        self.assertEqual(copy.to_dict(), DOCS[2])
+
+    def test_size(self):
+        records = [to_record(d, ('id', 'name', 'price', 'stock', 'cat'))
+                   for d in DOCS]
+        dict_size = sum(sys.getsizeof(d) for d in DOCS)
+        record_size = sum(sys.getsizeof(r) for r in records)
+        self.assertTrue(record_size * 2 < dict_size)
+
+    def test_fields_from_fl(self):
+        self.assertEqual(fields_from_fl('id,name score'),
+                         ('id', 'name', 'score'))
+        self.assertEqual(fields_from_fl(['id', 'total:sum(price, stock)']),
+                         ('id', 'total'))
+        self.assertEqual(fields_from_fl('id,[docid]'), ('id', '[docid]'))
+        self.assertEqual(fields_from_fl('id,*'), None)
+        self.assertEqual(fields_from_fl('na*'), None)
+        self.assertEqual(fields_from_fl(None), None)
+
+
+class SearchRecordsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=FakeRequests(handler), version=4)
+
+    def test_search(self):
+        response = self.solr.search(q='*:*', fl='id,name,price',
+                                    records=True)
+        record = response.documents[0]
+        self.assertEqual(record.fields, ('id', 'name', 'price'))
+        self.assertEqual(record.price, 0.0)
+
+    def test_wildcard(self):
+        response = self.solr.search(q='*:*', fl='*', records=True)
+        self.assertEqual(response.documents[3].to_dict(), DOCS[3])
+
+    def test_stream(self):
+        response = self.solr.search(q='*:*', fl='id,stock', stream=True,
+                                    records=True)
+        self.assertEqual([r.stock for r in response.documents],
+                         list(range(10)))
+
+    def test_cursor(self):
+        cursor = self.solr.search_cursor(q='*:*', fl='id,name')
+        records = [r for page in cursor.fetch(7, records=True)
+                   for r in page.documents]
+        self.assertEqual([r.id for r in records],
+                         [d['id'] for d in DOCS])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from os.path import join, dirname
+
+from mysolr import Solr, StreamingSolrResponse
+from tests.fakes import FakeRequests, FakeResponse, select_response
+
+
+class StreamingResponseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        with open(join(dirname(__file__), 'mocks/query')) as f:
+            self.body = f.read().encode('utf-8')
+        self.expected = json.loads(self.body.decode('utf-8'))
+
+    def test_attributes(self):
+        for chunk_size in (1, 7, 4096):
+            response = StreamingSolrResponse(FakeResponse(self.body),
+                                             chunk_size=chunk_size)
+            self.assertEqual(response.solr_status, 0)
+            self.assertEqual(response.qtime, 101)
+            self.assertEqual(response.total_results, 2)
+            documents = list(response.documents)
+            self.assertEqual(documents,
+                             self.expected['response']['docs'])
+            self.assertEqual(response.documents_read, 2)
+            self.assertNotEqual(response.facets, None)
+
+    def test_drain(self):
+        response = StreamingSolrResponse(FakeResponse(self.body),
+                                         chunk_size=16)
+        next(response.documents)
+        self.assertEqual(response.drain(), 2)
+        self.assertNotEqual(response.facets, None)
+
+    def test_unicode_split_between_chunks(self):
+        body = select_response([{'name': u'Ñandú ☃'}] * 3)
+        response = StreamingSolrResponse(FakeResponse(body), chunk_size=1)
+        self.assertEqual([d['name'] for d in response.documents],
+                         [u'Ñandú ☃'] * 3)
+
+    def test_numbers_split_between_chunks(self):
+        docs = [{'id': 1, 'price': 1.25, 'weight': 1.0E-4, 'n': -12}] * 2
+        body = select_response(docs, maxScore=1.25)
+        body['response']['maxScore'] = 1.0E-4
+        body = json.dumps(body).encode('utf-8')
+        for chunk_size in range(1, len(body) + 1):
+            response = StreamingSolrResponse(FakeResponse(body),
+                                             chunk_size=chunk_size)
+            self.assertEqual(list(response.documents), docs)
+            self.assertEqual(response.raw_content['response']['maxScore'],
+                             1.0E-4)
+            self.assertEqual(response.raw_content['maxScore'], 1.25)
+
+    def test_error_response(self):
+        response = StreamingSolrResponse(
+            FakeResponse(b'<html><u>Bad request</u></html>', 400))
+        self.assertEqual(response.status, 400)
+        self.assertEqual(response.documents, None)
+
+    def test_streaming_cursor(self):
+        docs = [{'id': i} for i in range(5)]
+
+        def handler(method, url, params):
+            start, rows = int(params['start']), int(params['rows'])
+            return select_response(docs[start:start + rows], len(docs), start)
+
+        fake = FakeRequests(handler)
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=4)
+        cursor = solr.search_cursor(q='*:*')
+        pages = 0
+        for response in cursor.fetch(2, stream=True):
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertTrue(all(kwargs['stream'] for _, _, _, kwargs in
+                            fake.calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import unittest
+import zlib
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from mysolr import Solr
+from mysolr.mysolr import _iter_add_xml
+from mysolr.transport import make_session, compress_body
+from tests.fakes import FakeRequests, select_response
+
+
+def gunzip(data):
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+class BusyHandler(BaseHTTPRequestHandler):
+    """ Answers 503 to the first `failures` requests and gzip compressed
+    searches to POST requests. """
+    failures = 0
+    requests = 0
+    accept_encoding = None
+    bodies = []
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding') != 'chunked':
+            return self.rfile.read(int(self.headers.get('Content-Length')
+                                       or 0))
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if not size:
+                return b''.join(chunks)
+
+    def fail(self):
+        BusyHandler.failures -= 1
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        BusyHandler.requests += 1
+        BusyHandler.accept_encoding = self.headers.get('Accept-Encoding')
+        BusyHandler.bodies.append(self.read_body())
+        if BusyHandler.failures:
+            return self.fail()
+        docs = [{'id': str(i), 'text': 'lorem ipsum ' * 10}
+                for i in range(500)]
+        body = json.dumps(select_response(docs)).encode('utf-8')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        body = compressor.compress(body) + compressor.flush()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        BusyHandler.requests += 1
+        if BusyHandler.failures:
+            return self.fail()
+        body = json.dumps({'responseHeader': {'status': 0, 'QTime': 0},
+                           'status': 'OK'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TransportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), BusyHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d/solr/' % self.server.server_port
+        BusyHandler.requests = 0
+        BusyHandler.bodies = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_default_session(self):
+        with Solr(self.url, version=4) as solr:
+            self.assertTrue(isinstance(solr.make_request, requests.Session))
+            self.assertTrue(solr.is_up())
+
+    def test_retry_on_503(self):
+        BusyHandler.failures = 2
+        solr = Solr(self.url, version=4,
+                    make_request=make_session(backoff_factor=0))
+        self.assertEqual(solr.ping().status, 200)
+        self.assertEqual(BusyHandler.requests, 3)
+
+    def test_retries_exhausted(self):
+        BusyHandler.failures = 5
+        solr = Solr(self.url, version=4, retries=1)
+        self.assertEqual(solr.ping().status, 503)
+        solr.close()
+
+    def test_streamed_body_not_retried(self):
+        BusyHandler.failures = 1
+        solr = Solr(self.url, version=4,
+                    make_request=make_session(backoff_factor=0))
+        documents = ({'id': str(i)} for i in range(10))
+        response = solr.update(documents, 'xml', commit=False)
+        self.assertEqual(response.status, 503)
+        self.assertEqual(BusyHandler.requests, 1)
+        self.assertTrue(BusyHandler.bodies[0].startswith(b'<add'))
+        # bodies as bytes can be sent again
+        BusyHandler.failures = 1
+        response = solr.update([{'id': '1'}], commit=False)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(BusyHandler.requests, 3)
+        self.assertEqual(BusyHandler.bodies[1], BusyHandler.bodies[2])
+        solr.close()
+
+    def test_compressed_response(self):
+        with Solr(self.url, version=4) as solr:
+            self.assertEqual(len(solr.search(q='*:*').documents), 500)
+            response = solr.search(q='*:*', stream=True)
+            self.assertEqual(len(list(response.documents)), 500)
+        self.assertTrue('gzip' in BusyHandler.accept_encoding)
+
+    def test_custom_session_not_closed(self):
+        session = requests.Session()
+        solr = Solr(self.url, version=4, make_request=session)
+        solr.close()
+        self.assertTrue(solr.make_request is session)
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRequests(lambda method, url, params:
+                                 {'responseHeader': {'status': 0, 'QTime': 1}})
+        self.solr = Solr('http://localhost:8983/solr/',
+                         make_request=self.fake, version=4,
+                         compress_updates=1024)
+
+    def test_threshold(self):
+        self.assertEqual(compress_body(b'abc', 1024), (b'abc', False))
+        self.assertEqual(compress_body(b'abc', None), (b'abc', False))
+        data, compressed = compress_body(b'abc' * 1000, 1024)
+        self.assertTrue(compressed)
+        self.assertEqual(gunzip(data), b'abc' * 1000)
+
+    def test_chunks(self):
+        data, compressed = compress_body(iter([b'a', b'b']), 1024)
+        self.assertEqual((data, compressed), (b'ab', False))
+        chunks = [b'abc' * 100] * 100
+        data, compressed = compress_body(iter(chunks), 1024)
+        self.assertTrue(compressed)
+        self.assertEqual(gunzip(b''.join(data)), b''.join(chunks))
+
+    def test_json_update(self):
+        documents = [{'id': str(i)} for i in range(100)]
+        self.solr.update(documents, commit=False)
+        self.solr.update(documents[:2], commit=False)
+        compressed, small = [call[3] for call in self.fake.calls]
+        self.assertEqual(compressed['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['headers']['Content-Length'],
+                         str(len(compressed['data'])))
+        body = gunzip(compressed['data']).decode('utf-8')
+        self.assertEqual(json.loads(body), documents)
+        self.assertFalse('Content-Encoding' in small['headers'])
+
+    def test_streamed_xml_update(self):
+        documents = [{'id': str(i), 'name': 'doc'} for i in range(200)]
+        self.solr.update((d for d in documents), 'xml', commit=False)
+        kwargs = self.fake.calls[0][3]
+        self.assertEqual(kwargs['headers']['Content-Encoding'], 'gzip')
+        self.assertFalse('Content-Length' in kwargs['headers'])
+        self.assertEqual(gunzip(b''.join(kwargs['data'])),
+                         b''.join(_iter_add_xml(documents)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mysolr import Solr
+from mysolr.mysolr import _get_add_xml, _iter_add_xml
+from tests.fakes import FakeRequests
+
+
+DOCS = [{'id': 1, 'name': u'Ñandú & <co>'}, {'id': 2, 'cat': ['a', 'b']}]
+
+
+class UpdateXMLTestCase(unittest.TestCase):
+
+    def test_add_xml(self):
+        xml = _get_add_xml(DOCS)
+        self.assertEqual(xml, u'<add overwrite="true">'
+                              u'<doc><field name="id">1</field>'
+                              u'<field name="name">Ñandú &amp; &lt;co&gt;'
+                              u'</field></doc>'
+                              u'<doc><field name="id">2</field>'
+                              u'<field name="cat">a</field>'
+                              u'<field name="cat">b</field></doc></add>')
+
+    def test_chunks(self):
+        chunks = list(_iter_add_xml(DOCS * 100, chunk_size=512))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(b''.join(chunks).decode('utf-8'),
+                         _get_add_xml(DOCS * 100))
+
+    def test_generator_is_streamed(self):
+        fake = FakeRequests(lambda method, url, params:
+                            {'responseHeader': {'status': 0, 'QTime': 1}})
+        solr = Solr('http://localhost:8983/solr/', make_request=fake,
+                    version=3)
+        documents = (doc for doc in DOCS)
+        solr.update(documents, input_type='xml', commit=False)
+        kwargs = fake.calls[0][3]
+        self.assertFalse('Content-Length' in kwargs['headers'])
+        body = b''.join(kwargs['data'])
+        self.assertEqual(body.decode('utf-8'), _get_add_xml(DOCS))
+
+
+if __name__ == '__main__':
+    unittest.main()